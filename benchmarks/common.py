@@ -0,0 +1,174 @@
+"""Shared helpers for the benchmark scripts (run them from the repository root)."""
+
+from __future__ import annotations
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+
+def camelot_frame(rows: int, columns: int = 5, seed: int = 0) -> pd.DataFrame:
+    """
+    A frame shaped like Camelot output: integer column labels and string
+    cells only, with the blanks and amount formats real statements have.
+    """
+    payees = ["NTUC FAIRPRICE", "GRAB RIDES", "SHOPEE", "PAYNOW TRANSFER", ""]
+    data = {
+        0: [f"{(i + seed) % 28 + 1:02d} SEP" for i in range(rows)],
+        1: [f"{payees[i % 5]} {i}".strip() for i in range(rows)],
+        2: [
+            f"{(i * 7 + seed) % 9999 / 100:,.2f}" if i % 3 else "" for i in range(rows)
+        ],
+    }
+    for c in range(3, columns):
+        data[c] = [
+            f"{i * c % 5000:,}.{i % 100:02d}" if i % 4 else "" for i in range(rows)
+        ]
+    return pd.DataFrame(data)
+
+
+def timeit(func, repeat: int = 5) -> float:
+    """Median wall time of ``func()`` in seconds."""
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - began)
+    return statistics.median(samples)
+
+
+def print_table(headers: list, rows: list) -> None:
+    widths = [max(len(str(x)) for x in column) for column in zip(headers, *rows)]
+    for line in (headers, *rows):
+        print("  ".join(str(x).rjust(w) for x, w in zip(line, widths)))
+
+
+STATEMENT_DATE = pd.Timestamp("2025-10-14")
+_MONTHS = ["SEP", "OCT"]
+_PAYEES = ["NTUC FAIRPRICE", "GRAB RIDES", "SHOPEE", "PAYNOW TRANSFER", "AMAZE* KLOOK"]
+
+
+def _amount(i: int) -> str:
+    return f"{(i * 37) % 250_000 / 100:,.2f}"
+
+
+def statement_frame(reader: str, rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    One table of ``rows`` transactions as Camelot returns it for ``reader``.
+
+    The frame starts at the reader's header row and ends with its closing
+    total, and carries the continuation lines, summary rows and credit
+    markers each reader has to clean up, so it goes through the reader's
+    ``is_table_end``/``row_filter``/``process`` hooks like a real page.
+    """
+    lines = []
+    for n in range(rows):
+        i = n + seed
+        day = f"{i % 27 + 1:02d}"
+        month = _MONTHS[i % 2]
+        payee = f"{_PAYEES[i % 5]} {i}"
+        amount = _amount(i)
+        credit = i % 7 == 3
+        if reader == "CITI_CC":
+            if n == 0:
+                lines.append(["DATE", "DESCRIPTION", "AMOUNT (SGD)"])
+                lines.append(["", "BALANCE PREVIOUS STATEMENT", "100.00"])
+            if i % 5 == 4:
+                payee = f"PAYALL - RENT {i}"
+            lines.append([f"{day} {month}", payee, f"({amount})" if credit else amount])
+            if i % 50 == 49:
+                lines.append(["", "SUB-TOTAL:", "1,234.00"])
+        elif reader == "DBS_ACC":
+            if n == 0:
+                lines.append(
+                    ["Date", "Description", "Withdrawal", "Deposit", "Balance"]
+                )
+                lines.append(["", "Balance Brought Forward", "", "", "1,000.00"])
+            date = f"{day}/{10 - i % 2:02d}/2025"
+            out, inflow = ("", amount) if credit else (amount, "")
+            lines.append([date, "FAST PAYMENT", out, inflow, "9,999.00"])
+            if i % 5 == 2:
+                lines.append(["", f"VALUE DATE : {day}/10/2025", "", "", ""])
+            if i % 6 == 5:
+                lines.append(["", "Ref:", "", "", ""])
+            if i % 9 != 8:
+                lines.append(["", f"to {payee}", "", "", ""])
+            if i % 3 == 0:
+                lines.append(["", f"VALUE DATE : {day}/10/2025", "", "", ""])
+            if i % 4 == 1:
+                lines.append(["", "PIB0000" + str(i), "", "", ""])
+            if i % 11 == 10:
+                lines.append(["", "Balance Carried Forward", "", "", "9,999.00"])
+        elif reader == "UOB_ACC":
+            if n == 0:
+                lines.append(
+                    ["Date", "Description", "Withdrawals", "Deposits", "Balance"]
+                )
+                lines.append(["", "BALANCE B/F", "", "", "1,000.00"])
+            out, inflow = ("", amount) if credit else (amount, "")
+            lines.append(
+                [
+                    f"{day} {month.title()}",
+                    "Inward Credit-FAST",
+                    out,
+                    inflow,
+                    "9,999.00",
+                ]
+            )
+            lines.append(["", f"REF {i:06d}", "", "", ""])
+            if i % 3:
+                lines.append(["", payee, "", "", ""])
+            if i % 13 == 12:
+                lines.append(["", "", "", "", ""])
+            if i % 97 == 96:
+                lines.append(["", "stray amount", "1.00", "", ""])
+        elif reader == "UOB_CC":
+            if n == 0:
+                lines.append(
+                    [
+                        "Post",
+                        "Trans",
+                        "Description of Transaction",
+                        "Transaction Amount",
+                    ]
+                )
+                lines.append(["Date", "Date", "", "SGD"])
+                lines.append(["", "", "PREVIOUS BALANCE", "1,234.00"])
+            post = f"{(i + 1) % 27 + 1:02d} {month}"
+            lines.append(
+                [post, f"{day} {month}", payee, f"{amount} CR" if credit else amount]
+            )
+            if i % 5 != 2:
+                lines.append(["", "", "SINGAPORE SG", ""])
+            if i % 2:
+                lines.append(["", "", f"Ref No. : {i:023d}", ""])
+        elif reader == "DBS_CC":
+            if n == 0:
+                lines.append(["DATE", "DESCRIPTION", "AMOUNT (S$)"])
+                lines.append(["", "PREVIOUS BALANCE", "1,234.00"])
+            lines.append(
+                [f"{day} {month}", payee, f"{amount} CR" if credit else amount]
+            )
+        else:
+            raise ValueError(f"No synthetic layout for reader {reader}")
+    closing = {
+        "CITI_CC": ["", "GRAND TOTAL", "12,345.67"],
+        "DBS_ACC": ["", "Total Balance Carried Forward:", "", "", "9,999.00"],
+        "UOB_ACC": ["", "Total", "1.00", "2.00", "9,999.00"],
+        "UOB_CC": ["", "", "SUB TOTAL", "12,345.67"],
+        "DBS_CC": ["", "TOTAL", "12,345.67"],
+    }
+    lines.append(closing[reader])
+    return pd.DataFrame(lines)
+
+
+def run_reader(reader, frame: pd.DataFrame, date=STATEMENT_DATE):
+    """Apply the table hooks the way the pipeline does for one table."""
+    finished, balance = reader.is_table_end(frame)
+    processed = reader.apply_rules(reader.process(reader.row_filter(frame), date))
+    return finished, balance, processed
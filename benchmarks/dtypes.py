@@ -0,0 +1,60 @@
+"""
+Reader cost with object vs ``string[pyarrow]`` cells, with copy-on-write.
+
+Runs each reader's table hooks on a synthetic Camelot table and reports the
+median time and the tracemalloc peak. The pipeline uses the last
+configuration (copy-on-write, Arrow strings) whenever pyarrow is installed.
+
+    python benchmarks/dtypes.py [rows]
+"""
+
+from __future__ import annotations
+
+import sys
+import tracemalloc
+
+import pandas as pd
+from common import print_table, run_reader, statement_frame, timeit
+
+from bsutils.logger import logger
+from classes import bank_settings
+
+READERS = ("CITI_CC", "DBS_ACC", "DBS_CC", "UOB_ACC", "UOB_CC")
+
+
+def peak_bytes(func) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(rows: int) -> None:
+    logger.remove()
+    configs = [("object", object, False), ("object+CoW", object, True)]
+    if bank_settings.TEXT_DTYPE is not object:
+        configs.append(("arrow+CoW", bank_settings.TEXT_DTYPE, True))
+    else:
+        print("pyarrow is not installed; Arrow-backed strings are not measured.")
+    table = []
+    for name in READERS:
+        reader = getattr(bank_settings, name)()
+        line = [name]
+        for _, dtype, cow in configs:
+            with pd.option_context("mode.copy_on_write", cow):
+                frame = statement_frame(name, rows).astype(dtype)
+                seconds = timeit(lambda: run_reader(reader, frame))
+                peak = peak_bytes(lambda: run_reader(reader, frame))
+            line += [f"{seconds * 1e3:.1f}", f"{peak / 2**20:.1f}"]
+        table.append(line)
+    headers = ["reader"]
+    for label, _, _ in configs:
+        headers += [f"{label} ms", "MiB"]
+    print(f"{rows:,} transactions per table")
+    print_table(headers, table)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
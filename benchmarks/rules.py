@@ -0,0 +1,115 @@
+"""
+Payee rule matching with hundreds of rules.
+
+Times :meth:`RuleSet.outcomes` on distinct payees, with a fresh rule set each
+round so nothing comes from its cache. It screens values with one unnamed
+alternation and then tries each rule's regex in turn. That is compared with a
+single combined scan that gives each rule a named group and applies only the
+rules whose groups matched. The named-group scan does fewer searches, but each
+one is much slower: capturing groups stop ``re`` from optimising the
+alternation.
+
+    python benchmarks/rules.py [rules] [payees]
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+from functools import lru_cache
+
+from common import print_table, timeit
+
+from classes.bank_settings.rules import Rule, RuleSet
+
+MERCHANTS = ["GRAB", "SHOPEE", "NTUC", "KOPITIAM", "LAZADA", "STARBUCKS", "DON DON"]
+
+
+def make_rules(count: int) -> list:
+    rules = [
+        Rule("AMAZE*", match="prefix", strip=True, memo="AMAZE*"),
+        Rule("PAYALL", match="prefix", strip=True, memo="PAYALL"),
+    ]
+    for n in range(count - len(rules)):
+        merchant = f"{MERCHANTS[n % len(MERCHANTS)]} {n}"
+        if n % 3 == 0:
+            rules.append(Rule(merchant, match="prefix", payee=merchant.title()))
+        elif n % 3 == 1:
+            rules.append(Rule(merchant, memo=f"Category {n % 12}"))
+        else:
+            rules.append(Rule(re.escape(merchant) + r"\b.*SG$", match="regex"))
+    return rules
+
+
+def make_payees(count: int, rules: int) -> list:
+    return [
+        f"{'AMAZE* ' if n % 4 == 0 else ''}{MERCHANTS[n % len(MERCHANTS)]}"
+        f" {n % rules} SINGAPORE SG {n}"
+        for n in range(count)
+    ]
+
+
+def named_groups(rules: list, payees: list) -> list:
+    """Apply ``rules`` with one pass per rule that can still match."""
+
+    @lru_cache(maxsize=None)
+    def tail(first: int) -> re.Pattern:
+        return re.compile(
+            "|".join(
+                f"(?P<r{n}>{rule.expression})"
+                for n, rule in enumerate(rules[first:], first)
+            )
+        )
+
+    strippers = [re.compile(rule.strip_expression) for rule in rules]
+    results = []
+    for value in payees:
+        text, memo, first = value, None, 0
+        while first < len(rules):
+            # Overlapping matches hide later groups, so rescan past each hit.
+            hits = [
+                int(name[1:])
+                for match in tail(first).finditer(text)
+                for name, group in match.groupdict().items()
+                if group is not None
+            ]
+            if not hits:
+                break
+            n = min(hits)
+            rule = rules[n]
+            if rule.strip:
+                text = strippers[n].sub("", text).strip(" -")
+            if rule.payee is not None:
+                text = rule.payee
+            if rule.memo is not None:
+                memo = rule.memo
+            first = n + 1
+        results.append((text, memo))
+    return results
+
+
+def main(rules: int, payees: int) -> None:
+    rule_list = make_rules(rules)
+    values = make_payees(payees, rules)
+    expected = [
+        (value, None) if outcome is None else (outcome.text or value, outcome.memo)
+        for value, outcome in zip(values, RuleSet(rule_list).outcomes("Payee", values))
+    ]
+    assert named_groups(rule_list, values) == expected
+    each = timeit(lambda: RuleSet(rule_list).outcomes("Payee", values))
+    combined = timeit(lambda: named_groups(rule_list, values))
+    print(f"{rules} rules, {payees} distinct payees")
+    print_table(
+        ["engine", "ms", "us/payee"],
+        [
+            ["rule by rule", f"{each * 1e3:.1f}", f"{each / payees * 1e6:.1f}"],
+            ["named groups", f"{combined * 1e3:.1f}", f"{combined / payees * 1e6:.1f}"],
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+    )
@@ -0,0 +1,128 @@
+"""
+How each reader's table hooks scale with the number of rows in a table.
+
+Times ``header_locator``, ``is_table_end``, ``row_filter``, ``segments`` (all
+three in one pass over the page), ``process`` and ``apply_rules`` on
+synthetic Camelot tables from 100 to 100,000 transactions (continuation
+lines, summary rows and credit markers included), with the cell dtype and
+copy-on-write setting the pipeline uses. The growth exponent is the slope
+between the two largest sizes on a log-log scale, where fixed per-call
+overhead no longer hides it: 1.0 is linear. The script exits with status 1 when any
+hook grows faster than ``--max-exponent``, so it can be run before a
+change is merged.
+
+    python benchmarks/scaling.py [--sizes 100 1000 10000 100000]
+                                 [--readers UOB_ACC ...] [--max-exponent 1.25]
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+
+import pandas as pd
+from common import STATEMENT_DATE, print_table, statement_frame, timeit
+
+from bsutils.logger import logger
+from classes import bank_settings
+from classes.bank_settings import as_text_frame
+
+READERS = ("CITI_CC", "DBS_ACC", "DBS_CC", "UOB_ACC", "UOB_CC")
+HOOKS = (
+    "header_locator",
+    "is_table_end",
+    "row_filter",
+    "segments",
+    "process",
+    "apply_rules",
+)
+SIZES = (100, 1_000, 10_000, 100_000)
+
+
+def hook_calls(reader, frame: pd.DataFrame) -> dict:
+    """One zero-argument call per hook, fed the way the pipeline feeds them."""
+    filtered = reader.row_filter(frame)
+    processed = reader.process(filtered, STATEMENT_DATE)
+    return {
+        "header_locator": lambda: reader.header_locator(frame),
+        "is_table_end": lambda: reader.is_table_end(frame),
+        "row_filter": lambda: reader.row_filter(frame),
+        "segments": lambda: reader.segments(frame),
+        "process": lambda: reader.process(filtered, STATEMENT_DATE),
+        "apply_rules": lambda: reader.apply_rules(processed),
+    }
+
+
+def exponent(rows: list, seconds: list) -> float:
+    """Slope of log(time) against log(rows) between the two largest tables."""
+    (r0, r1), (s0, s1) = rows[-2:], seconds[-2:]
+    return math.log(max(s1, 1e-9) / max(s0, 1e-9)) / math.log(r1 / r0)
+
+
+def measure(name: str, sizes: list) -> dict:
+    """Median seconds per hook and size, plus the frame's row counts."""
+    reader = getattr(bank_settings, name)()
+    timings = {hook: [] for hook in HOOKS}
+    rows = []
+    for size in sizes:
+        frame = as_text_frame(statement_frame(name, size))
+        rows.append(len(frame))
+        calls = hook_calls(reader, frame)
+        repeat = 5 if size <= 10_000 else 3
+        for hook in HOOKS:
+            timings[hook].append(timeit(calls[hook], repeat=repeat))
+    return {"rows": rows, **timings}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--readers", nargs="+", choices=READERS, default=READERS)
+    parser.add_argument(
+        "--max-exponent",
+        type=float,
+        default=1.25,
+        help="Fail when a hook's fitted growth exponent is above this (default: 1.25).",
+    )
+    args = parser.parse_args(argv)
+    logger.remove()
+    pd.set_option("mode.copy_on_write", True)
+    sizes = sorted(set(args.sizes))
+    if len(sizes) < 2:
+        parser.error("--sizes needs at least two sizes")
+
+    table = []
+    failures = []
+    for name in args.readers:
+        result = measure(name, sizes)
+        for hook in HOOKS:
+            slope = exponent(result["rows"], result[hook])
+            verdict = "ok" if slope <= args.max_exponent else "SUPER-LINEAR"
+            if verdict != "ok":
+                failures.append(f"{name}.{hook}")
+            table.append(
+                [name, hook]
+                + [f"{s * 1e3:.2f}" for s in result[hook]]
+                + [f"{slope:.2f}", verdict]
+            )
+
+    print(
+        f"cells: {bank_settings.TEXT_DTYPE}, copy-on-write on; "
+        f"exponent from {sizes[-2]:,} to {sizes[-1]:,} transactions"
+    )
+    print_table(
+        ["reader", "hook"] + [f"{s:,} ms" for s in sizes] + ["exponent", ""],
+        table,
+    )
+    if failures:
+        print(
+            f"Growth above {args.max_exponent:g} in: {', '.join(failures)}",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Cost of returning Camelot frames from a worker process.
+
+Each round trip serialises one page's frames the way ProcessPoolExecutor
+does, then rebuilds them in the parent. Object cells are pickled one Python
+string at a time. The IPC column encodes every object frame as an Arrow IPC
+stream first, keeping the integer column labels aside because Arrow only
+allows string field names. ``string[pyarrow]`` cells (what workers return
+when pyarrow is installed) pickle as whole Arrow buffers; the last column
+includes the ``astype`` the worker performs first.
+
+    python benchmarks/transport.py
+"""
+
+from __future__ import annotations
+
+import pickle
+
+from common import camelot_frame, print_table, timeit
+
+from classes.bank_settings import as_text_frame
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def encode(frame):
+    table = pa.table(
+        {
+            str(i): pa.array(frame.iloc[:, i].tolist(), pa.string())
+            for i in range(frame.shape[1])
+        }
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return list(frame.columns), sink.getvalue().to_pybytes()
+
+
+def decode(payload):
+    columns, stream = payload
+    frame = pa.ipc.open_stream(stream).read_all().to_pandas()
+    frame.columns = columns
+    return frame
+
+
+def round_trip(frames):
+    return pickle.loads(pickle.dumps(frames))
+
+
+def ipc_round_trip(frames):
+    return [decode(payload) for payload in round_trip([encode(f) for f in frames])]
+
+
+def main() -> None:
+    rows = []
+    for n in (100, 1_000, 10_000, 100_000):
+        frames = [camelot_frame(n)]
+        line = [
+            n,
+            f"{len(pickle.dumps(frames)) / 1024:,.0f}",
+            f"{timeit(lambda: round_trip(frames)) * 1e3:.2f}",
+        ]
+        if pa is not None:
+            assert all(a.equals(b) for a, b in zip(ipc_round_trip(frames), frames))
+            text = [as_text_frame(frame) for frame in frames]
+
+            def convert():
+                return round_trip([as_text_frame(frame) for frame in frames])
+
+            line += [
+                f"{len(pickle.dumps([encode(f) for f in frames])) / 1024:,.0f}",
+                f"{timeit(lambda: ipc_round_trip(frames)) * 1e3:.2f}",
+                f"{len(pickle.dumps(text)) / 1024:,.0f}",
+                f"{timeit(lambda: round_trip(text)) * 1e3:.2f}",
+                f"{timeit(convert) * 1e3:.2f}",
+            ]
+        rows.append(line)
+    headers = ["rows", "object KiB", "object ms"]
+    if pa is not None:
+        headers += ["IPC KiB", "IPC ms", "arrow KiB", "arrow ms", "astype+arrow ms"]
+    else:
+        print("pyarrow is not installed; only object cells are measured.")
+    print_table(headers, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import bz2
+import errno
+import gzip
+import json
+import lzma
+import os
+import shutil
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+from bsutils.commit import (
+    _CHUNK,
+    _NO_LINKS,
+    copy_file,
+    file_digest,
+    locked,
+    write_file,
+)
+from bsutils.logger import logger
+
+INDEX_FILENAME = "BalanceParser_archive.json"
+BLOB_DIRNAME = "blobs"
+
+# Stream compressors by name, with the suffix their blobs carry. PDFs are
+# mostly compressed already, so expect modest savings on top of dedup.
+COMPRESSORS = {
+    "none": (None, ""),
+    "gzip": (gzip.open, ".gz"),
+    "bz2": (bz2.open, ".bz2"),
+    "xz": (lzma.open, ".xz"),
+}
+_OPENERS = {suffix: opener for opener, suffix in COMPRESSORS.values() if suffix}
+
+
+class ArchiveStore:
+    """
+    Content-addressed archive of processed statements under ``root``.
+
+    Each distinct PDF is stored once as ``blobs/<ab>/<sha256>.pdf``, plus the
+    compressor's suffix when ``compression`` is set. The index,
+    ``BalanceParser_archive.json``, maps the readable archive names
+    (``{Reader}_{account}_{YYYYMM}.pdf``) to blobs. A statement downloaded
+    twice keeps one blob, and an archive name that is already taken by other
+    content gets a numbered suffix instead of being overwritten. Blobs are
+    hard-linked into place when the PDF is on the same filesystem and copied
+    by the kernel when it is not. The PDF itself is only removed once its
+    index entry is written, so a run that stops in between leaves it where
+    it was; adding it again reuses the blob. The index is changed under a
+    lock on ``BalanceParser_archive.lock``, so runs sharing the store keep
+    each other's names.
+    """
+
+    def __init__(
+        self, root: Path, compression: str = "none", durability: str = "file"
+    ) -> None:
+        if compression not in COMPRESSORS:
+            raise ValueError(
+                f"Unknown compression '{compression}'; expected {tuple(COMPRESSORS)}"
+            )
+        self.root = Path(root)
+        self.compression = compression
+        self.durability = durability
+        self.path = self.root / INDEX_FILENAME
+        self.lock_path = self.path.with_suffix(".lock")
+        self.entries = self._load()
+
+    def _load(self) -> dict:
+        try:
+            entries = json.loads(self.path.read_text())
+            if isinstance(entries, dict):
+                return entries
+        except FileNotFoundError:
+            pass
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Ignoring unreadable archive index {}: {}", self.path, e)
+        return {}
+
+    def _write(self) -> None:
+        write_file(self.path, self._dump, self.durability)
+
+    def _dump(self, tmp: Path) -> None:
+        with open(tmp, "w") as fh:
+            json.dump(self.entries, fh, indent=2, sort_keys=True)
+
+    def find_blob(self, digest: str) -> Optional[Path]:
+        """The stored blob with ``digest``, whatever it was compressed with."""
+        for _, suffix in COMPRESSORS.values():
+            blob = self.root / BLOB_DIRNAME / digest[:2] / f"{digest}.pdf{suffix}"
+            if blob.exists():
+                return blob
+        return None
+
+    def add(self, file: Path, name: str) -> str:
+        """
+        Move ``file`` into the store under ``name`` and return the name it
+        was indexed as.
+        """
+        file = Path(file)
+        digest = file_digest(file)
+        blob = self.find_blob(digest)
+        if blob is None:
+            blob = self._store(file, digest)
+        else:
+            logger.debug("{} is already archived as {}", file.name, blob.name)
+        with locked(self.lock_path):
+            self.entries = self._load()
+            name = self._free_name(name, digest)
+            self.entries[name] = {
+                "blob": blob.relative_to(self.root).as_posix(),
+                "sha256": digest,
+                "size": blob.stat().st_size,
+                "archived": date.today().isoformat(),
+            }
+            self._write()
+        file.unlink()
+        return name
+
+    def _store(self, file: Path, digest: str) -> Path:
+        opener, suffix = COMPRESSORS[self.compression]
+        blob = self.root / BLOB_DIRNAME / digest[:2] / f"{digest}.pdf{suffix}"
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        if opener is None:
+            try:
+                os.link(file, blob)
+                return blob
+            except FileExistsError:
+                # Stored meanwhile by another run.
+                return blob
+            except OSError as e:
+                if e.errno != errno.EXDEV and e.errno not in _NO_LINKS:
+                    raise
+            write_file(blob, lambda tmp: copy_file(file, tmp), self.durability)
+        else:
+
+            def compress(tmp: Path) -> None:
+                with open(file, "rb") as src, opener(tmp, "wb") as dst:
+                    shutil.copyfileobj(src, dst, _CHUNK)
+
+            write_file(blob, compress, self.durability)
+        return blob
+
+    def _free_name(self, name: str, digest: str) -> str:
+        stem, suffix = os.path.splitext(name)
+        candidate, number = name, 1
+        while candidate in self.entries:
+            if self.entries[candidate].get("sha256") == digest:
+                return candidate
+            number += 1
+            candidate = f"{stem}_{number}{suffix}"
+        return candidate
+
+    def open(self, name: str):
+        """A binary file object with the PDF archived as ``name``."""
+        try:
+            blob = self.root / self.entries[name]["blob"]
+        except KeyError:
+            raise KeyError(f"No archived statement named '{name}'") from None
+        opener = _OPENERS.get(blob.suffix)
+        return opener(blob, "rb") if opener is not None else open(blob, "rb")
+
+    def extract(self, name: str, target: Path) -> Path:
+        """Write the PDF archived as ``name`` to ``target``, a file or directory."""
+        target = Path(target)
+        if target.is_dir():
+            target = target / name
+        with self.open(name) as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst, _CHUNK)
+        return target
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import math
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from bsutils.layout import DocumentLayout, PageLayout
+from bsutils.logger import logger
+from bsutils.reader import auto_assign_reader
+from bsutils.source import PdfSource, open_pdf
+
+# Blank runs narrower than this, in points, are spacing inside a column.
+MIN_GAP = 3.0
+# Share of the text lines allowed to cross a boundary: descriptions that
+# wrap wide, footers that span the page.
+NOISE = 0.03
+
+
+class LayoutSample:
+    """Where text sits across the page, summed over the sampled pages of one layout."""
+
+    def __init__(self, reader: str, fingerprint: str, boundaries: int, width: float):
+        self.reader = reader
+        self.fingerprint = fingerprint
+        self.boundaries = boundaries
+        self.coverage = np.zeros(math.ceil(width) + 2, dtype=int)
+        self.lines = 0
+        self.pages = 0
+
+    def add(self, page: PageLayout, top: float) -> None:
+        """Count the text lines below the header row that starts at ``top``."""
+        for line in page.horizontal_text:
+            if line.y1 < top - 1 and line.get_text().strip():
+                self.coverage[int(line.x0) : math.ceil(line.x1) + 1] += 1
+                self.lines += 1
+        self.pages += 1
+
+    def columns(self) -> Optional[str]:
+        """
+        Boundaries in the middle of the widest blank runs between text, as
+        many as the reader's own ``columns``; ``None`` if too few are blank.
+        """
+        covered = np.flatnonzero(self.coverage)
+        if not len(covered):
+            return None
+        blank = self.coverage <= max(1, int(NOISE * self.lines))
+        blank[: covered[0]] = blank[covered[-1] + 1 :] = False
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], blank.astype(int), [0]))))
+        runs = [
+            (stop - start, (start + stop - 1) / 2)
+            for start, stop in zip(edges[::2], edges[1::2])
+            if stop - start >= MIN_GAP
+        ]
+        if len(runs) < self.boundaries:
+            return None
+        widest = sorted(runs, reverse=True)[: self.boundaries]
+        return ",".join(
+            f"{middle:.0f}" for _, middle in sorted(widest, key=lambda r: r[1])
+        )
+
+
+def sample_file(file, samples: dict, reader_cls=None, sample: int = 20, passwords=()):
+    """
+    Add the kept pages of one statement to ``samples``, keyed by reader name
+    and :meth:`BankSettings.layout_fingerprint`, up to ``sample`` pages each.
+    """
+    source, _ = open_pdf(PdfSource.coerce(file), passwords)
+    reader = reader_cls() if reader_cls is not None else None
+    with DocumentLayout(source) as document:
+        for page in document.pages():
+            if reader is None:
+                reader = auto_assign_reader(page.text)
+                if reader is None:
+                    logger.warning("No reader matched '{}'; skipped", Path(file).name)
+                    return
+            analysis = reader.analyse_page(page.text, need_date=False)
+            if analysis.trailing:
+                break
+            if analysis.keep:
+                _sample_page(reader, page, samples, sample)
+            if analysis.last_page:
+                break
+
+
+def _sample_page(reader, page: PageLayout, samples: dict, sample: int) -> None:
+    name = type(reader).__name__
+    spec = reader.column_spec()
+    fingerprint = reader.layout_fingerprint(page.text)
+    if spec is None or fingerprint is None:
+        return
+    key = (name, fingerprint)
+    if key not in samples:
+        boundaries = len(spec.split(","))
+        samples[key] = LayoutSample(name, fingerprint, boundaries, page.dimensions[0])
+    if samples[key].pages < sample:
+        samples[key].add(page, reader.header_anchor(page.text).top)
+
+
+def calibrate(
+    files: Iterable[Path], reader_cls=None, sample: int = 20, passwords=()
+) -> dict:
+    """
+    Infer column boundaries for every reader and page layout in ``files``.
+
+    Returns ``{reader: {fingerprint: entry}}`` ready for
+    :func:`classes.bank_settings.calibration.save_calibration`. Layouts whose
+    boundaries cannot be inferred are left out with a warning.
+    """
+    samples = {}
+    for file in files:
+        try:
+            sample_file(file, samples, reader_cls, sample, passwords)
+        except Exception as e:
+            logger.warning("Could not sample '{}': {}", Path(file).name, e)
+    entries = {}
+    for (name, fingerprint), layout in samples.items():
+        columns = layout.columns()
+        if columns is None:
+            logger.warning(
+                "{}: no {} column gaps on layout '{}' ({} pages); kept the defaults",
+                name,
+                layout.boundaries,
+                fingerprint,
+                layout.pages,
+            )
+            continue
+        entries.setdefault(name, {})[fingerprint] = {
+            "columns": columns,
+            "pages": layout.pages,
+            "calibrated": date.today().isoformat(),
+        }
+    return entries
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from bsutils.logger import logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+_CHUNK = 1 << 20
+
+# mkstemp creates files readable by their owner only; outputs get the
+# permissions a plain open() would have given them.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# errnos meaning the filesystem cannot hard-link, e.g. FAT or some SMB shares.
+_NO_LINKS = {errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK}
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of ``path``, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_file(source: Path, target: Path) -> None:
+    """
+    Copy with ``copy_file_range`` where the kernel offers it (reflinks and
+    server-side copies on filesystems that support them), else ``sendfile``
+    through :func:`shutil.copyfile`.
+    """
+    copy_range = getattr(os, "copy_file_range", None)
+    if copy_range is not None:
+        try:
+            with open(source, "rb") as src, open(target, "wb") as dst:
+                while copy_range(src.fileno(), dst.fileno(), _CHUNK):
+                    pass
+            return
+        except OSError:
+            pass
+    shutil.copyfile(source, target)
+
+
+def _fsync_file(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _numbered(path: Path, number: int) -> Path:
+    if number == 1:
+        return path
+    stem, suffix = os.path.splitext(path.name)
+    return path.with_name(f"{stem}_{number}{suffix}")
+
+
+def _same_content(a: Path, b: Path) -> bool:
+    try:
+        if a.stat().st_size != b.stat().st_size:
+            return False
+    except OSError:
+        return False
+    return file_digest(a) == file_digest(b)
+
+
+def _link_free(source: Path, target: Path, keep_identical: bool) -> Path:
+    """
+    Hard-link ``source`` to ``target`` or, when that name is taken, to
+    ``target_2``, ``target_3``... and return the name used. Creating a link
+    fails if the name exists, so concurrent writers never replace each
+    other's files and need no lock. With ``keep_identical``, a name already
+    holding the same bytes is returned instead of adding another copy.
+    """
+    number = 1
+    while True:
+        candidate = _numbered(target, number)
+        try:
+            os.link(source, candidate)
+            return candidate
+        except FileExistsError:
+            if keep_identical and _same_content(source, candidate):
+                return candidate
+        except OSError as e:
+            if e.errno not in _NO_LINKS:
+                raise
+            # No hard links here: fall back to check-then-rename, which can
+            # still race with another process picking the same name.
+            if not candidate.exists():
+                os.replace(source, candidate)
+                return candidate
+            if keep_identical and _same_content(source, candidate):
+                return candidate
+        number += 1
+
+
+def _lock(fh) -> None:
+    if fcntl is not None:
+        fcntl.lockf(fh, fcntl.LOCK_EX)
+        return
+    fh.seek(0)  # pragma: no cover - Windows
+    while True:  # pragma: no cover
+        try:
+            # LK_LOCK gives up after ten attempts a second apart.
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError as e:
+            if e.errno != errno.EDEADLOCK:
+                raise
+
+
+def _unlock(fh) -> None:
+    if fcntl is not None:
+        fcntl.lockf(fh, fcntl.LOCK_UN)
+    else:  # pragma: no cover - Windows
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def locked(path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive lock on ``path``, a lock file created if missing,
+    while the block runs. Indexes are read, changed and written back under
+    it, so concurrent runs add to them instead of replacing each other's
+    entries. Filesystems that cannot lock get a warning and no lock.
+    """
+    with open(path, "a+b") as fh:
+        try:
+            _lock(fh)
+            held = True
+        except OSError as e:
+            logger.warning(
+                "Could not lock {}: {}; concurrent runs may lose index entries",
+                path,
+                e,
+            )
+            held = False
+        try:
+            yield
+        finally:
+            if held:
+                _unlock(fh)
+
+
+def write_file(
+    target: Path,
+    write: Callable[[Path], None],
+    durability: str = "file",
+    replace: bool = True,
+) -> Path:
+    """
+    Write a file through a temporary sibling and rename it to ``target``.
+
+    ``write`` is called with the temporary path. Readers of ``target`` see
+    either the old file or the complete new one. With ``replace`` an
+    existing file is replaced; otherwise the first numbered name that is
+    free or already holds the same bytes is used (see :func:`_link_free`).
+    Returns the path written.
+    """
+    target = Path(target)
+    fd, tmp = tempfile.mkstemp(
+        dir=target.parent, prefix=f".{target.stem[:40]}-", suffix=".tmp"
+    )
+    os.close(fd)
+    tmp = Path(tmp)
+    try:
+        os.chmod(tmp, 0o666 & ~_UMASK)
+        write(tmp)
+        if durability != "none":
+            _fsync_file(tmp)
+        if replace:
+            os.replace(tmp, target)
+            return target
+        return _link_free(tmp, target, keep_identical=True)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def move_file(source: Path, target: Path, durability: str = "file") -> Path:
+    """
+    Move ``source`` to ``target`` without replacing another file.
+
+    A taken name gets a numbered suffix, unless it already holds the same
+    bytes, in which case ``source`` is simply removed. Across filesystems
+    the file is copied to a temporary sibling of ``target`` first. Returns
+    the path the file ended up at.
+    """
+    source, target = Path(source), Path(target)
+    try:
+        placed = _link_free(source, target, keep_identical=True)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        placed = write_file(
+            target,
+            lambda tmp: copy_file(source, tmp),
+            durability,
+            replace=False,
+        )
+    if source.exists():
+        source.unlink()
+    return placed
+
+
+def sync_directories(roots: Iterable[Path], since_ns: int) -> int:
+    """
+    Fsync ``roots`` and every directory below them changed since
+    ``since_ns``, so the names added during a run are on disk. Called once
+    per run, whichever process wrote the files; returns the count synced.
+    """
+    seen = set()
+    synced = 0
+    for root in roots:
+        if root is None or not Path(root).is_dir():
+            continue
+        for directory, _, _ in os.walk(root):
+            real = os.path.realpath(directory)
+            if real in seen:
+                continue
+            seen.add(real)
+            # A second of slack covers filesystems with coarse timestamps.
+            if os.stat(real).st_mtime_ns < since_ns - 1_000_000_000:
+                continue
+            try:
+                _fsync_file(Path(real))
+                synced += 1
+            except OSError as e:  # pragma: no cover - e.g. Windows directories
+                logger.debug("Could not sync directory {}: {}", real, e)
+    return synced
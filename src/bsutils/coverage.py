@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from bsutils.commit import locked, write_file
+from bsutils.logger import logger
+
+INDEX_FILENAME = "BalanceParser_coverage.json"
+# Prefix of the per-statement entries; no account name is written with it.
+_STATEMENT = "statement:"
+
+# ``ParsedTable.save`` names: ``<account>_<ddMonYYYY>-<ddMonYYYY>[_balance=…].csv``.
+_CSV_NAME = re.compile(
+    r"(?P<account>.+)_(?P<start>\d{2}[A-Za-z]{3}\d{4})-(?P<end>\d{2}[A-Za-z]{3}\d{4})"
+    r"(?:_balance=.*)?\.csv"
+)
+
+
+def _account_name(account: str) -> str:
+    return account.replace(" ", "_")
+
+
+def _key(account: str, month: str) -> str:
+    return f"{_account_name(account)}/{month}"
+
+
+def _statement_key(titles: Iterable[str], month: str) -> str:
+    accounts = "+".join(sorted({_account_name(title) for title in titles}))
+    return f"{_STATEMENT}{month}/{accounts}"
+
+
+class CoverageIndex:
+    """
+    Which account months already have CSVs in ``csv_dir``.
+
+    Entries are keyed by account and statement month, the month the
+    archived PDF is named after, and remember the reader that saved them.
+    Each parsed statement also gets an entry keyed by its month and the
+    accounts titled on its first kept page, listing every account it
+    exported, including those only titled on later pages. A statement is
+    covered when it has such an entry and each of its accounts still has a
+    CSV for the month; files deleted since are ignored.
+
+    When the index is missing it is rebuilt from the CSV names, which only
+    record the month of each table's last transaction and not which
+    statement a CSV came from. Every statement is then parsed again once and
+    recorded properly.
+
+    The index is read, changed and written back under a lock on
+    ``BalanceParser_coverage.lock``, so concurrent jobs keep each other's
+    entries.
+    """
+
+    def __init__(self, csv_dir: Path, durability: str = "file") -> None:
+        self.csv_dir = Path(csv_dir)
+        self.durability = durability
+        self.path = self.csv_dir / INDEX_FILENAME
+        self.lock_path = self.path.with_suffix(".lock")
+        if not self.csv_dir.is_dir():
+            self.entries = {}
+            return
+        with locked(self.lock_path):
+            self.entries = self._load()
+
+    def _load(self) -> dict:
+        try:
+            entries = json.loads(self.path.read_text())
+            if isinstance(entries, dict):
+                return entries
+        except FileNotFoundError:
+            pass
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Rebuilding unreadable coverage index {}: {}", self.path, e)
+        return self._rebuild()
+
+    def rebuild(self) -> dict:
+        """Re-derive the index from the CSV names in ``csv_dir`` and save it."""
+        with locked(self.lock_path):
+            return self._rebuild()
+
+    def _rebuild(self) -> dict:
+        previous = getattr(self, "entries", {})
+        readers = {
+            name: entry.get("reader")
+            for entry in previous.values()
+            for name in entry.get("files", ())
+        }
+        # Statement entries cannot be told from the CSV names; keep those known.
+        entries = {
+            key: entry for key, entry in previous.items() if key.startswith(_STATEMENT)
+        }
+        for csv in sorted(self.csv_dir.glob("*.csv")):
+            match = _CSV_NAME.fullmatch(csv.name)
+            if match is None:
+                continue
+            end = datetime.strptime(match["end"], "%d%b%Y")
+            entry = entries.setdefault(
+                _key(match["account"], end.strftime("%Y%m")),
+                {"reader": readers.get(csv.name), "files": []},
+            )
+            entry["files"].append(csv.name)
+        self.entries = entries
+        self._write()
+        return entries
+
+    def lookup(self, reader, analysis) -> List[str]:
+        """
+        The CSVs covering a statement, found from its first kept page, or an
+        empty list when it has to be parsed.
+        """
+        if analysis.date is None or not analysis.titles:
+            return []
+        month = analysis.date.strftime("%Y%m")
+        name = type(reader).__name__
+        statement = self.entries.get(_statement_key(analysis.titles, month))
+        if statement is None or statement.get("reader") != name:
+            return []
+        files = []
+        for key in statement["accounts"]:
+            entry = self.entries.get(key)
+            if entry is None or entry.get("reader") not in (None, name):
+                return []
+            present = [f for f in entry["files"] if (self.csv_dir / f).exists()]
+            if not present:
+                return []
+            files.extend(present)
+        return files
+
+    def record(
+        self,
+        reader,
+        date,
+        saved: Iterable[Tuple[object, Optional[Path]]],
+        titles: Iterable[str] = (),
+    ) -> None:
+        """
+        Add the ``(ParsedTable, csv path)`` pairs written for one statement
+        dated ``date``, whose first kept page titled ``titles``; without a
+        date, each table's last month is used and the statement itself is
+        not recorded.
+        """
+        name = type(reader).__name__
+        with locked(self.lock_path):
+            # Merge into the file's current state: other jobs may have added to it.
+            self.entries = self._load()
+            accounts = []
+            for table, path in saved:
+                if path is None or table.account == "Unknown":
+                    continue
+                key = _key(table.account, (date or table.end).strftime("%Y%m"))
+                entry = self.entries.setdefault(key, {"reader": name, "files": []})
+                entry["reader"] = name
+                if path.name not in entry["files"]:
+                    entry["files"].append(path.name)
+                if key not in accounts:
+                    accounts.append(key)
+            titles = list(titles)
+            if date is not None and titles and accounts:
+                self.entries[_statement_key(titles, date.strftime("%Y%m"))] = {
+                    "reader": name,
+                    "accounts": accounts,
+                }
+            self._write()
+
+    def _write(self) -> None:
+        write_file(self.path, self._dump, self.durability)
+
+    def _dump(self, tmp: Path) -> None:
+        with open(tmp, "w") as fh:
+            json.dump(self.entries, fh, indent=2, sort_keys=True)
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from bsutils.profiling import observe
+
+PROFILE_FORMATS = ("pstats", "speedscope", "collapsed")
+SUFFIXES = {"pstats": ".prof", "speedscope": ".speedscope.json", "collapsed": ".folded"}
+
+# Reader hooks reported on their own; matched by method name in reader modules.
+READER_HOOKS = (
+    "page_filter",
+    "segments",
+    "header_locator",
+    "table_end_rows",
+    "filtered_rows",
+    "row_filter",
+    "process",
+    "apply_rules",
+    "opening_rows",
+    "reconcile",
+    "is_table_end",
+)
+_READER_MODULE = "classes.bank_settings"
+
+
+class StageClock:
+    """Stage observer that adds up wall time per pipeline stage."""
+
+    def __init__(self) -> None:
+        self.seconds = {}
+        self._open = {}
+
+    def enter(self, name: str) -> None:
+        self._open.setdefault(name, []).append(time.perf_counter())
+
+    def exit(self, name: str) -> None:
+        began = self._open[name].pop()
+        self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - began
+
+
+class StackProfiler:
+    """
+    Deterministic profiler that keeps whole call stacks.
+
+    Every Python and C call is traced with :func:`sys.setprofile` and the time
+    between two events is charged to the stack that was running, so the
+    result is the exact self time of every distinct stack: what flame graph
+    tools expect. Tracing slows small Python functions down more than large
+    C calls, so compare shares within one profile rather than across tools.
+    """
+
+    def __init__(self) -> None:
+        self.stacks = {}
+        self._keys = [()]
+        self._names = {}
+        self._last = 0.0
+
+    def _name(self, frame, event: str, arg) -> str:
+        if event == "c_call":
+            module = getattr(arg, "__module__", None) or "builtins"
+            return f"{module}:{getattr(arg, '__qualname__', repr(arg))}"
+        code = frame.f_code
+        name = self._names.get(code)
+        if name is None:
+            module = frame.f_globals.get("__name__", code.co_filename)
+            qualname = getattr(code, "co_qualname", code.co_name)
+            name = f"{module}:{qualname}:{code.co_firstlineno}"
+            self._names[code] = name
+        return name
+
+    def _event(self, frame, event: str, arg) -> None:
+        now = time.perf_counter()
+        key = self._keys[-1]
+        self.stacks[key] = self.stacks.get(key, 0.0) + now - self._last
+        if event in ("call", "c_call"):
+            self._keys.append(key + (self._name(frame, event, arg),))
+        elif len(self._keys) > 1:
+            self._keys.pop()
+        self._last = time.perf_counter()
+
+    def __enter__(self) -> "StackProfiler":
+        self._last = time.perf_counter()
+        sys.setprofile(self._event)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        sys.setprofile(None)
+        self.stacks.pop((), None)
+
+    def inclusive(self, match) -> dict:
+        """Total time of stacks through each frame name that ``match`` accepts."""
+        totals = {}
+        for key, seconds in self.stacks.items():
+            for name in {name for name in key if match(name)}:
+                totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def write_collapsed(self, target: Path) -> None:
+        """Brendan Gregg's folded format, weighted in microseconds."""
+        with open(target, "w", encoding="utf-8") as fh:
+            for key, seconds in sorted(self.stacks.items()):
+                micros = round(seconds * 1e6)
+                if micros:
+                    fh.write(f"{';'.join(key)} {micros}\n")
+
+    def write_speedscope(self, target: Path, name: str) -> None:
+        """A sampled speedscope profile with one weighted sample per stack."""
+        frames, index = [], {}
+        samples, weights = [], []
+        for key, seconds in self.stacks.items():
+            for frame in key:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame})
+            samples.append([index[frame] for frame in key])
+            weights.append(seconds)
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "balanceparser",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+        Path(target).write_text(json.dumps(document))
+
+
+def _is_hook(module: str, function: str) -> bool:
+    return module.startswith(_READER_MODULE) and function.rsplit(".", 1)[-1] in (
+        READER_HOOKS
+    )
+
+
+class CpuProfile:
+    """
+    Profile a block with ``fmt``'s profiler and summarise stages and hooks.
+
+    ``pstats`` uses :mod:`cProfile`; ``speedscope`` and ``collapsed`` use
+    :class:`StackProfiler`, which keeps the full stacks a flame graph needs.
+    """
+
+    def __init__(self, fmt: str = "speedscope") -> None:
+        if fmt not in PROFILE_FORMATS:
+            raise ValueError(
+                f"Unknown profile format '{fmt}'; expected one of {PROFILE_FORMATS}"
+            )
+        self.fmt = fmt
+        self.clock = StageClock()
+        self.seconds = 0.0
+        self._profiler = None
+
+    @contextmanager
+    def run(self):
+        self._profiler = cProfile.Profile() if self.fmt == "pstats" else StackProfiler()
+        began = time.perf_counter()
+        with observe(self.clock), self._profiler:
+            yield self
+        self.seconds = time.perf_counter() - began
+
+    def hook_seconds(self) -> dict:
+        """Inclusive seconds per reader hook, keyed ``Class.hook``."""
+        totals = {}
+        if self.fmt == "pstats":
+            stats = pstats.Stats(self._profiler)
+            for (filename, _, function), row in stats.stats.items():
+                if "bank_settings" in Path(filename).parts and function in READER_HOOKS:
+                    # cProfile keeps only the bare function name; add the module.
+                    label = f"{Path(filename).stem}.{function}"
+                    totals[label] = totals.get(label, 0.0) + row[3]
+            return totals
+        for name, seconds in self._profiler.inclusive(
+            lambda n: _is_hook(*n.split(":")[:2])
+        ).items():
+            label = name.split(":")[1]
+            totals[label] = totals.get(label, 0.0) + seconds
+        return totals
+
+    def write(self, target: Path, name: str) -> Path:
+        if self.fmt == "pstats":
+            self._profiler.dump_stats(str(target))
+        elif self.fmt == "collapsed":
+            self._profiler.write_collapsed(target)
+        else:
+            self._profiler.write_speedscope(target, name)
+        return target
+
+    def summary_lines(self) -> list:
+        lines = [f"total {self.seconds:.3f}s"]
+        for label, values in (
+            ("stage", self.clock.seconds),
+            ("hook", self.hook_seconds()),
+        ):
+            for key, seconds in sorted(values.items(), key=lambda kv: -kv[1]):
+                share = seconds / self.seconds if self.seconds else 0.0
+                lines.append(f"{label:<5} {key:<28} {seconds:8.3f}s {share:6.1%}")
+        return lines
+
+
+def default_target(pdf: Path, fmt: str) -> Path:
+    """``<pdf stem><suffix>`` in the working directory."""
+    return Path(pdf.stem + SUFFIXES[fmt])
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import math
+import multiprocessing
+import shutil
+import time
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from bsutils.logger import logger
+from bsutils.profiling import current_rss, observe
+
+try:
+    import resource
+except ImportError:  # Windows: limits are enforced by the supervisor only
+    resource = None
+
+# How often the supervisor checks deadlines and memory of running files.
+POLL_INTERVAL = 0.1
+
+
+@dataclass
+class Limits:
+    """
+    Per-file resource limits for isolated parsing.
+
+    ``file_timeout`` bounds the wall-clock time of a whole statement and
+    ``page_timeout`` the time spent on one pipeline stage of one page (a
+    Camelot call, for instance) without progress. ``max_rss`` is in bytes.
+    """
+
+    file_timeout: Optional[float] = None
+    page_timeout: Optional[float] = None
+    max_rss: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return any(
+            value is not None
+            for value in (self.file_timeout, self.page_timeout, self.max_rss)
+        )
+
+
+class _Heartbeat:
+    """Stage observer that stamps a shared clock whenever the pipeline moves on."""
+
+    def __init__(self, value) -> None:
+        self.value = value
+
+    def enter(self, name: str) -> None:
+        self.value.value = time.monotonic()
+
+    exit = enter
+
+
+class _Run:
+    """A statement being parsed in its own process."""
+
+    def __init__(self, item, process, conn, heartbeat) -> None:
+        self.item = item
+        self.process = process
+        self.conn = conn
+        self.heartbeat = heartbeat
+        self.started = time.monotonic()
+        self.result = None
+
+    def receive(self) -> None:
+        if self.conn.closed or not self.conn.poll():
+            return
+        try:
+            self.result = self.conn.recv()
+        except EOFError:
+            pass
+        self.conn.close()
+
+    def violation(self, limits: Limits, now: float) -> Optional[str]:
+        if limits.file_timeout is not None and now - self.started > limits.file_timeout:
+            return f"exceeded the {limits.file_timeout:g}s file timeout"
+        if (
+            limits.page_timeout is not None
+            and now - self.heartbeat.value > limits.page_timeout
+        ):
+            return f"exceeded the {limits.page_timeout:g}s page timeout"
+        if limits.max_rss is not None:
+            rss = current_rss(self.process.pid) or 0
+            if rss > limits.max_rss:
+                return (
+                    f"used {rss / 2**20:.0f} MiB, above the "
+                    f"{limits.max_rss / 2**20:.0f} MiB memory limit"
+                )
+        return None
+
+
+def can_measure_rss() -> bool:
+    """Whether :func:`current_rss` works on this platform."""
+    return current_rss() is not None
+
+
+def _apply_rlimits(limits: Limits) -> None:
+    # CPU time never exceeds wall time, so this only fires if the supervisor
+    # itself stops responding; it keeps a runaway child from living forever.
+    if resource is None or limits.file_timeout is None:
+        return
+    seconds = math.ceil(limits.file_timeout) + 5
+    resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 5))
+
+
+def _child_main(target, args, limits, heartbeat, conn) -> None:
+    _apply_rlimits(limits)
+    with observe(_Heartbeat(heartbeat)):
+        result = target(*args)
+    conn.send(result)
+    conn.close()
+
+
+def quarantine(path: Path, reason: str, directory: Path) -> Optional[Path]:
+    """
+    Move ``path`` into ``directory`` with a ``.error.txt`` note beside it.
+
+    Quarantined files are left out of later runs over the input folder and
+    can be inspected (or moved back) by hand. Returns ``None`` when the file
+    could not be moved, e.g. because the killed child had already archived
+    it; the rest of the batch carries on either way.
+    """
+    if not path.exists():
+        logger.warning(f"Cannot quarantine '{path.name}': it is no longer at {path}")
+        return None
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / path.name
+        counter = 1
+        while target.exists():
+            target = directory / f"{path.stem}_{counter}{path.suffix}"
+            counter += 1
+        shutil.move(str(path), target)
+        target.with_name(target.name + ".error.txt").write_text(reason + "\n")
+    except OSError as e:
+        logger.warning(f"Cannot quarantine '{path.name}': {e}")
+        return None
+    return target
+
+
+def run_isolated(
+    items: Iterable,
+    target: Callable,
+    args: tuple,
+    limits: Limits,
+    quarantine_dir: Path,
+    jobs: int = 1,
+    on_done: Optional[Callable] = None,
+) -> list:
+    """
+    Run ``target(item.path, *args)`` for each item in its own process.
+
+    Up to ``jobs`` files run at once. A file that breaks ``limits`` or whose
+    process dies is killed, moved to ``quarantine_dir`` and reported; its slot
+    is refilled immediately so the rest of the batch keeps going. Returns the
+    values sent back by ``target``, and calls ``on_done(item)`` as each file
+    finishes either way.
+
+    ``max_rss`` needs the resident memory of the children, which is read with
+    ``psutil`` or from ``/proc``; a :class:`ValueError` is raised when
+    neither is available rather than silently not enforcing it.
+    """
+    if limits.max_rss is not None and not can_measure_rss():
+        raise ValueError(
+            "The memory limit cannot be enforced: resident memory is not "
+            "measurable here. Install psutil (the 'rss' extra)."
+        )
+    context = multiprocessing.get_context()
+    queue = deque(items)
+    running = []
+    results = []
+    while queue or running:
+        while queue and len(running) < max(jobs, 1):
+            item = queue.popleft()
+            receiver, sender = context.Pipe(duplex=False)
+            heartbeat = context.Value("d", time.monotonic(), lock=False)
+            process = context.Process(
+                target=_child_main,
+                args=(target, (item.path, *args), limits, heartbeat, sender),
+                name=f"statement-{item.path.name}",
+                daemon=True,
+            )
+            process.start()
+            sender.close()
+            running.append(_Run(item, process, receiver, heartbeat))
+
+        handles = [run.process.sentinel for run in running]
+        handles += [run.conn for run in running if not run.conn.closed]
+        wait(handles, timeout=POLL_INTERVAL)
+        now = time.monotonic()
+        for run in list(running):
+            run.receive()
+            if run.process.is_alive():
+                reason = run.violation(limits, now)
+                if reason is None:
+                    continue
+                run.process.kill()
+                run.process.join()
+            else:
+                run.process.join()
+                # The result may have arrived after the first check.
+                run.receive()
+                code = run.process.exitcode
+                reason = None if code == 0 else _describe_exit(code)
+            running.remove(run)
+            run.conn.close()
+            if reason is None:
+                results.append(run.result)
+            else:
+                target_path = quarantine(run.item.path, reason, quarantine_dir)
+                logger.error(
+                    f"Stopped '{run.item.path.name}': {reason}"
+                    + (f"; moved to {target_path}" if target_path else "")
+                )
+            if on_done is not None:
+                on_done(run.item)
+    return results
+
+
+def _describe_exit(code: int) -> str:
+    if code < 0:
+        return f"worker process died from signal {-code}"
+    return f"worker process exited with status {code}"
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import math
+import warnings
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from camelot.handlers import PARSERS
+from camelot.utils import (
+    get_image_char_and_text_objects,
+    get_rotation,
+    remove_extra,
+    validate_input,
+)
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LAParams
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+from bsutils.profiling import stage
+from bsutils.source import PdfSource
+from classes.bank_settings import PageText, TextChunk, as_text_frame
+
+# Camelot's own pdfminer settings (``camelot.utils.get_page_layout``), so the
+# text objects handed to its parsers are the ones it would have built itself.
+LAYOUT_DEFAULTS = {
+    "line_overlap": 0.5,
+    "char_margin": 1.0,
+    "line_margin": 0.5,
+    "word_margin": 0.1,
+    "boxes_flow": 0.5,
+    "detect_vertical": True,
+    "all_texts": True,
+}
+
+# Flavors that work from text objects alone; lattice and hybrid also render
+# the page to an image and still go through ``camelot.read_pdf``.
+TEXT_FLAVORS = ("stream", "network")
+
+# Stream options :func:`grid_frames` cannot follow; any of them set sends the
+# page to Camelot.
+_GRID_UNSUPPORTED = ("table_regions", "split_text", "flag_size", "strip_text")
+
+# ``read_pdf`` keywords that do not belong to the parsers.
+_READ_PDF_ONLY = ("password", "suppress_stdout", "parallel", "debug", "backend")
+
+
+@dataclass
+class PageLayout:
+    """
+    One page laid out by pdfminer: the objects Camelot parses and the text
+    the reader hooks search.
+    """
+
+    number: int
+    layout: Any
+    dimensions: Tuple[float, float]
+    images: list
+    chars: list
+    horizontal_text: list
+    vertical_text: list
+
+    @cached_property
+    def text(self) -> PageText:
+        """
+        Page text with one line per text object, top to bottom and left to
+        right, which is the shape pypdf's ``extract_text`` gives the hooks.
+        """
+        lines = sorted(self.horizontal_text, key=lambda t: (-t.y1, t.x0))
+        chunks = [TextChunk(t.get_text().strip(), t.x0, t.y1) for t in lines]
+        return PageText.positioned(
+            "".join(chunk.text + "\n" for chunk in chunks), chunks, self.dimensions[0]
+        )
+
+    @cached_property
+    def rotated(self) -> bool:
+        return get_rotation(self.chars, self.horizontal_text, self.vertical_text) != ""
+
+
+class DocumentLayout:
+    """
+    Lay out a statement page by page with one pdfminer interpreter.
+
+    Camelot writes every page it reads to a one-page PDF and parses that from
+    scratch, after pypdf has already interpreted the page for its text. Here
+    the document is opened once and each page is interpreted once; both the
+    page text and the table extraction reuse the result (see
+    :func:`extract_tables`). Pages are produced lazily, so stopping early
+    skips the rest of the document.
+    """
+
+    def __init__(self, source: PdfSource) -> None:
+        self.source = source
+        handle = source.open()
+        self._file = open(handle, "rb") if isinstance(handle, str) else handle
+        document = PDFDocument(PDFParser(self._file))
+        resources = PDFResourceManager()
+        self._device = PDFPageAggregator(
+            resources, laparams=LAParams(**LAYOUT_DEFAULTS)
+        )
+        self._interpreter = PDFPageInterpreter(resources, self._device)
+        self._pages = PDFPage.create_pages(document)
+
+    def __enter__(self) -> "DocumentLayout":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def pages(
+        self, skip: Optional[Callable[[int], bool]] = None
+    ) -> Iterator[PageLayout]:
+        """Lay out each page in turn, leaving out those for which ``skip`` is true."""
+        for number, page in enumerate(self._pages, start=1):
+            if skip is not None and skip(number):
+                continue
+            with stage("layout"):
+                self._interpreter.process_page(page)
+                layout = self._device.get_result()
+                objects = get_image_char_and_text_objects(layout)
+            yield PageLayout(number, layout, layout.bbox[2:4], *objects)
+
+
+def extract_tables(page: PageLayout, options: dict) -> Optional[list]:
+    """
+    Run Camelot's parser on an already laid out ``page``.
+
+    ``options`` are the reader's ``read_pdf`` keywords. Returns ``None`` when
+    they need something the shared layout cannot give (an image-based flavor,
+    other pdfminer settings or a rotated page); the caller then falls back to
+    ``camelot.read_pdf``.
+    """
+    options = dict(options)
+    flavor = options.pop("flavor", "lattice")
+    layout_kwargs = options.pop("layout_kwargs", None) or {}
+    if (
+        flavor not in TEXT_FLAVORS
+        or {**LAYOUT_DEFAULTS, **layout_kwargs} != LAYOUT_DEFAULTS
+        or page.rotated
+    ):
+        return None
+    suppress = options.get("suppress_stdout", False)
+    debug = options.get("debug", False)
+    for key in _READ_PDF_ONLY:
+        options.pop(key, None)
+    with warnings.catch_warnings():
+        if suppress:
+            warnings.simplefilter("ignore")
+        validate_input(options, flavor=flavor)
+        parser = PARSERS[flavor](debug=debug, **remove_extra(options, flavor=flavor))
+        parser.prepare_page_parse(
+            f"page-{page.number}.pdf",
+            page.layout,
+            page.dimensions,
+            page.number,
+            page.images,
+            page.horizontal_text,
+            page.vertical_text,
+            layout_kwargs=layout_kwargs,
+        )
+        return sorted(parser.extract_tables())
+
+
+def grid_frames(page: PageLayout, options: dict) -> Optional[List[pd.DataFrame]]:
+    """
+    Cut the reader's table areas on a laid out ``page`` straight into cells.
+
+    This is Camelot's stream assignment for the case readers use, fixed
+    ``table_areas`` and ``columns``, without building Camelot tables: the
+    text lines centred in an area are grouped into rows within ``row_tol``
+    of each row's first line, and each goes to the column it overlaps most
+    for its width. Lines landing in the same cell are joined with newlines,
+    as Camelot does. Returns ``None`` when ``options`` ask for anything else,
+    or an area holds no text; the caller then runs Camelot.
+    """
+    areas = options.get("table_areas")
+    columns = options.get("columns")
+    if (
+        options.get("flavor", "lattice") != "stream"
+        or not areas
+        or not columns
+        or len(columns) != len(areas)
+        or any(options.get(key) for key in _GRID_UNSUPPORTED)
+        or {**LAYOUT_DEFAULTS, **(options.get("layout_kwargs") or {})}
+        != LAYOUT_DEFAULTS
+        or page.vertical_text
+        or page.rotated
+    ):
+        return None
+    row_tol = options.get("row_tol", 2)
+    frames = []
+    for area, spec in zip(areas, columns):
+        left, top, right, bottom = (float(v) for v in area.split(","))
+        lines = [
+            t
+            for t in page.horizontal_text
+            if left - 2 <= (t.x0 + t.x1) / 2 <= right + 2
+            and bottom - 2 <= (t.y0 + t.y1) / 2 <= top + 2
+            and t.get_text().strip()
+        ]
+        if not lines:
+            return None
+        bounds = [
+            min(t.x0 for t in lines),
+            *(float(v) for v in spec.split(",")),
+            max(t.x1 for t in lines),
+        ]
+        spans = list(zip(bounds, bounds[1:]))
+        if any(start >= stop for start, stop in spans):
+            return None
+        rows, row_y = [], None
+        for t in sorted(lines, key=lambda line: (-line.y0, line.x0)):
+            if row_y is None or not math.isclose(row_y, t.y0, abs_tol=row_tol):
+                rows.append([""] * len(spans))
+                row_y = t.y0
+            overlaps = [
+                (min(stop, t.x1) - max(start, t.x0)) / (stop - start)
+                if start <= t.x1 and stop >= t.x0
+                else -1
+                for start, stop in spans
+            ]
+            # Camelot appends each line's text, newline included, to the
+            # cell's and strips the cell once it is complete.
+            rows[-1][overlaps.index(max(overlaps))] += t.get_text()
+        frames.append(
+            as_text_frame(
+                pd.DataFrame([[cell.strip() for cell in row] for row in rows])
+            )
+        )
+    return frames
@@ -3,57 +3,93 @@ from pathlib import Path
 
 from loguru import logger
 
-
-def info_only(record):
-    return record["level"].name == "INFO"
-
-
 INFO_SUCCESS_LEVELS = {"INFO", "SUCCESS"}
-WARNING_LEVEL_NO = logger.level("WARNING").no
 SUCCESS_LEVEL = logger.level("SUCCESS")
 logger.level("SUCCESS", color="<green>", icon=SUCCESS_LEVEL.icon)
 LEVEL_MESSAGE_FORMAT = "<level><bold>{level}</bold> | {message}</level>"
+DETAILED_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | "
+    "<level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+    "<level>{message}</level>"
+)
+
+_min_level_no = logger.level("SUCCESS").no
+_dispatcher = None
+
+
+def _format_record(record):
+    if record["level"].name in INFO_SUCCESS_LEVELS:
+        return LEVEL_MESSAGE_FORMAT + "\n{exception}"
+    return DETAILED_FORMAT + "\n{exception}"
+
+
+class _Dispatcher:
+    """
+    Single sink that routes each record by level.
+
+    Everything goes to ``stream``; INFO messages are also appended to
+    ``log_path`` when given. One sink with a level threshold lets Loguru drop
+    records below that level before any message is formatted.
+    """
+
+    def __init__(self, stream, log_path=None):
+        self.stream = stream
+        self.log_file = open(log_path, "a", encoding="utf-8") if log_path else None
 
+    def write(self, message):
+        self.stream.write(message)
+        if self.log_file is not None and message.record["level"].name == "INFO":
+            self.log_file.write(message.record["message"] + "\n")
 
-def info_success_only(record):
-    return record["level"].name in INFO_SUCCESS_LEVELS
+    def flush(self):
+        self.stream.flush()
+        if self.log_file is not None:
+            self.log_file.flush()
 
+    def isatty(self):
+        return getattr(self.stream, "isatty", lambda: False)()
 
-def warning_and_above(record):
-    return record["level"].no >= WARNING_LEVEL_NO
+    def close(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
 
 
-def debug_only(record):
-    return record["level"].name == "DEBUG"
+def log_enabled(level: str) -> bool:
+    """
+    Return ``True`` when a message at ``level`` would be emitted.
+
+    Guard diagnostics that are expensive to build (e.g. ``DataFrame.to_string``)
+    with this, or pass them lazily via ``logger.opt(lazy=True)``.
+    """
+    return logger.level(level).no >= _min_level_no
 
 
-def configure_logger(debug_mode: bool = False):
+def configure_logger(debug_mode: bool = False, quiet: bool = False, stream=None):
     """
     Configure global Loguru logger according to mode.
 
     debug_mode=True  -> log INFO to statement.log and DEBUG+ to stdout.
-    debug_mode=False -> disable logging sinks.
+    debug_mode=False -> SUCCESS and WARNING+ to stdout.
+    quiet=True       -> WARNING+ only; lazy log payloads are never built.
+
+    Pass ``stream=sys.stderr`` when stdout carries data.
     """
+    global _dispatcher, _min_level_no
+    stream = stream or sys.stdout
     logger.remove()
-    log_path = Path("statement.log")
+    if _dispatcher is not None:
+        _dispatcher.close()
 
     if debug_mode:
-        logger.add(log_path, filter=info_only, format="{message}")
-        logger.add(sys.stdout, filter=debug_only, level="DEBUG")
-        logger.add(
-            sys.stdout,
-            filter=info_success_only,
-            format=LEVEL_MESSAGE_FORMAT,
-        )
-        logger.add(sys.stdout, filter=warning_and_above, level="WARNING")
+        level = "DEBUG"
+        _dispatcher = _Dispatcher(stream, Path("statement.log"))
     else:
-        logger.add(
-            sys.stdout,
-            filter=info_success_only,
-            level="SUCCESS",
-            format=LEVEL_MESSAGE_FORMAT,
-        )
-        logger.add(sys.stdout, filter=warning_and_above, level="WARNING")
+        level = "WARNING" if quiet else "SUCCESS"
+        _dispatcher = _Dispatcher(stream)
+    _min_level_no = logger.level(level).no
+    logger.add(_dispatcher, level=level, format=_format_record)
 
 
 # Default configuration: silent unless debug mode is explicitly enabled.
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable, Iterator, Optional, Tuple
+
+from pypdf.generic import DictionaryObject
+
+# Simple-font encodings whose codes are (close enough to) Latin-1, so the
+# bytes of a string operand are the text it shows.
+_LATIN_ENCODINGS = {"/WinAnsiEncoding", "/MacRomanEncoding", "/StandardEncoding"}
+
+# Where a string operand or a comment can start, and what ends or nests
+# inside a literal string.
+_OUTSIDE = re.compile(rb"[(<%]")
+_INSIDE = re.compile(rb"[()\\]")
+_HEX = re.compile(rb"<([0-9A-Fa-f\s]*)>")
+_EOL = re.compile(rb"[\r\n]")
+_ESCAPE = re.compile(rb"\\([0-7]{1,3}|\r\n|.)", re.S)
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+_WHITESPACE = re.compile(r"\s+")
+
+# Form XObjects nested deeper than this are not followed.
+_MAX_DEPTH = 3
+
+
+def _unescape(match: re.Match) -> bytes:
+    code = match.group(1)
+    if code[:1].isdigit():
+        return bytes([int(code, 8) & 0xFF])
+    if code in (b"\n", b"\r", b"\r\n"):
+        return b""
+    return _ESCAPES.get(code, code)
+
+
+def _strings(data: bytes) -> Iterator[Tuple[bool, bytes]]:
+    """
+    The literal ``(...)`` and hex ``<...>`` string operands of a content
+    stream, as ``(is_literal, raw bytes)``. Literals may hold balanced
+    parentheses, which PDF allows unescaped, so their nesting is tracked.
+    Strings outside text operators (marked-content properties, say) only
+    add text, which is safe. Raises ``ValueError`` on an unterminated
+    literal, since where the text ends is then unknown.
+    """
+    pos = 0
+    while True:
+        match = _OUTSIDE.search(data, pos)
+        if match is None:
+            return
+        start = match.start()
+        if match.group() == b"%":
+            eol = _EOL.search(data, start)
+            pos = eol.end() if eol is not None else len(data)
+            continue
+        if match.group() == b"<":
+            hexa = _HEX.match(data, start)
+            pos = start + 1
+            if hexa is not None:
+                pos = hexa.end()
+                yield False, hexa.group(1)
+            continue
+        depth, pos = 1, start + 1
+        while depth:
+            match = _INSIDE.search(data, pos)
+            if match is None:
+                raise ValueError("unterminated literal string")
+            pos = match.end()
+            if match.group() == b"\\":
+                pos += 1
+            else:
+                depth += 1 if match.group() == b"(" else -1
+        yield True, data[start + 1 : pos - 1]
+
+
+def _decode(data: bytes) -> str:
+    parts = []
+    for literal, string in _strings(data):
+        if literal:
+            raw = _ESCAPE.sub(_unescape, string)
+        else:
+            digits = re.sub(rb"\s", b"", string)
+            raw = bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode())
+        parts.append(raw.decode("latin-1"))
+    return "".join(parts)
+
+
+def _decodable(font) -> bool:
+    font = font.get_object()
+    if font.get("/Subtype") not in ("/Type1", "/TrueType", "/MMType1"):
+        return False
+    encoding = font.get("/Encoding")
+    if encoding is not None:
+        encoding = encoding.get_object()
+    if isinstance(encoding, DictionaryObject):
+        if "/Differences" in encoding:
+            return False
+        encoding = encoding.get("/BaseEncoding")
+    if encoding is None:
+        # Standard 14 fonts use their built-in Latin encoding; embedded
+        # subsets without one usually map codes through /ToUnicode instead.
+        return "/ToUnicode" not in font
+    return encoding in _LATIN_ENCODINGS
+
+
+def _raw_text(contents, resources, depth: int = 0) -> Optional[str]:
+    """Text shown by a content stream and its forms, or ``None`` if undecodable."""
+    resources = resources.get_object() if resources is not None else {}
+    fonts = resources.get("/Font")
+    fonts = fonts.get_object() if fonts is not None else {}
+    if not all(_decodable(font) for font in fonts.values()):
+        return None
+    text = [_decode(contents.get_data())] if contents is not None else []
+    xobjects = resources.get("/XObject")
+    for xobject in (xobjects.get_object() if xobjects is not None else {}).values():
+        xobject = xobject.get_object()
+        if xobject.get("/Subtype") != "/Form":
+            continue
+        if depth >= _MAX_DEPTH:
+            return None
+        inner = _raw_text(xobject, xobject.get("/Resources", resources), depth + 1)
+        if inner is None:
+            return None
+        text.append(inner)
+    return "".join(text)
+
+
+def raw_page_text(page) -> Optional[str]:
+    """
+    Whitespace-free text of a pypdf ``page``, read straight from its
+    decompressed content streams without laying anything out.
+
+    Returns ``None`` when a font on the page maps codes to glyphs in a way
+    that cannot be decoded without its tables (composite or re-encoded
+    fonts); callers must then treat every marker as possibly present.
+    """
+    try:
+        text = _raw_text(page.get_contents(), page.get("/Resources"))
+    except Exception:
+        return None
+    return None if text is None else _WHITESPACE.sub("", text)
+
+
+def may_contain(page, markers: Iterable[str]) -> bool:
+    """
+    Whether the page's text can contain any of ``markers``.
+
+    ``False`` is definite: none of the markers is shown on the page. ``True``
+    only means the full text has to be extracted to know.
+    """
+    text = raw_page_text(page)
+    if text is None:
+        return True
+    return any(_WHITESPACE.sub("", marker) in text for marker in markers)
+
+
+def can_skip(page, reader) -> bool:
+    """
+    Whether ``reader`` would drop ``page`` before looking at its text.
+
+    Only readers that declare :attr:`BankSettings.PAGE_MARKERS` are
+    prefiltered, and never those with a trailing-page check, which must see
+    every page.
+    """
+    if not reader.PAGE_MARKERS or reader.TRAILING_PAGE_REGEX is not None:
+        return False
+    return not may_contain(page, reader.PAGE_MARKERS)
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Pipeline stages reported by :func:`stage`.
+STAGES = ("pypdf", "layout", "camelot", "process", "save")
+
+_observers = []
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Mark a pipeline stage for the active profilers.
+
+    Costs one empty generator when nothing is observing, so the pipeline
+    keeps these markers in place permanently.
+    """
+    if not _observers:
+        yield
+        return
+    for observer in _observers:
+        observer.enter(name)
+    try:
+        yield
+    finally:
+        for observer in reversed(_observers):
+            observer.exit(name)
+
+
+@contextmanager
+def observe(observer):
+    """Register ``observer`` (``enter(name)``/``exit(name)``) for the block."""
+    _observers.append(observer)
+    try:
+        yield observer
+    finally:
+        _observers.remove(observer)
+
+
+def current_rss(pid: Optional[int] = None) -> Optional[int]:
+    """
+    Resident set size in bytes of this process (or ``pid``), when the
+    platform exposes it.
+    """
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _RssSampler(threading.Thread):
+    """Poll RSS in the background and credit each sample to the open stage."""
+
+    def __init__(self, profiler: "MemoryProfiler", interval: float) -> None:
+        super().__init__(daemon=True)
+        self.profiler = profiler
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.profiler.sample_rss()
+
+
+class MemoryProfiler:
+    """
+    Per-file, per-stage peak memory from :mod:`tracemalloc` (and optional RSS).
+
+    Use :meth:`track` around each statement; stages are picked up from the
+    :func:`stage` markers in the pipeline. Stages that run in worker processes
+    (``--workers``) are not traced.
+    """
+
+    def __init__(self, rss: bool = False, top: int = 10, interval: float = 0.01):
+        self.rss = rss
+        self.top = top
+        self.interval = interval
+        self._stack = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, file: Path):
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        report = {"file": str(file), "stages": {}, "top_allocations": []}
+        self._report = report
+        self._baseline = tracemalloc.take_snapshot()
+        self._file_peak = 0
+        self._stack = [self._frame("file")]
+        sampler = None
+        if self.rss and current_rss() is not None:
+            sampler = _RssSampler(self, self.interval)
+            sampler.start()
+        began = time.perf_counter()
+        try:
+            with observe(self):
+                yield report
+        finally:
+            if sampler is not None:
+                sampler.stopped.set()
+                sampler.join()
+            root = self._stack.pop()
+            self._close_frame(root)
+            report["seconds"] = round(time.perf_counter() - began, 3)
+            report["peak_bytes"] = root["peak"]
+            if self.rss:
+                report["peak_rss_bytes"] = root["rss"]
+            self._stack = []
+            if started:
+                tracemalloc.stop()
+
+    def _frame(self, name: str) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            parent = self._stack[-1]
+            parent["peak"] = max(parent["peak"], peak - parent["base"])
+        tracemalloc.reset_peak()
+        return {"name": name, "base": current, "peak": 0, "rss": current_rss() or 0}
+
+    def _close_frame(self, frame: dict) -> int:
+        _, peak = tracemalloc.get_traced_memory()
+        frame["peak"] = max(frame["peak"], peak - frame["base"])
+        if self._stack:
+            parent = self._stack[-1]
+            parent["peak"] = max(parent["peak"], peak - parent["base"])
+            parent["rss"] = max(parent["rss"], frame["rss"])
+        return frame["peak"]
+
+    def enter(self, name: str) -> None:
+        with self._lock:
+            self._stack.append(self._frame(name))
+
+    def exit(self, name: str) -> None:
+        with self._lock:
+            frame = self._stack.pop()
+            peak = self._close_frame(frame)
+            stats = self._report["stages"].setdefault(
+                name, {"calls": 0, "peak_bytes": 0}
+            )
+            stats["calls"] += 1
+            stats["peak_bytes"] = max(stats["peak_bytes"], peak)
+            if self.rss:
+                stats["peak_rss_bytes"] = max(
+                    stats.get("peak_rss_bytes", 0), frame["rss"]
+                )
+            if peak > self._file_peak:
+                # Snapshot only when a new file peak is reached, so the top
+                # allocation sites describe the heaviest stage.
+                self._file_peak = peak
+                self._report["peak_stage"] = name
+                self._report["top_allocations"] = self._top_allocations()
+
+    def sample_rss(self) -> None:
+        rss = current_rss()
+        with self._lock:
+            for frame in self._stack:
+                frame["rss"] = max(frame["rss"], rss or 0)
+
+    def _top_allocations(self) -> list:
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        diff = snapshot.compare_to(self._baseline, "lineno")[: self.top]
+        return [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_bytes": stat.size_diff,
+                "count": stat.count_diff,
+            }
+            for stat in diff
+        ]
+
+    def write_report(self, report: dict, directory: Path) -> Path:
+        """
+        Write ``report`` as ``<pdf stem>.<folder hash>.memory.json`` into
+        ``directory``. The hash of the PDF's folder keeps statements with the
+        same name in different folders from overwriting each other's reports.
+        """
+        pdf = Path(report["file"]).resolve()
+        folder = hashlib.sha1(str(pdf.parent).encode()).hexdigest()[:8]
+        target = Path(directory) / f"{pdf.stem}.{folder}.memory.json"
+        target.write_text(json.dumps(report, indent=2))
+        return target
+
+
+def summary_lines(reports: list) -> list:
+    """One line per memory report, heaviest first."""
+    lines = []
+    for report in sorted(reports, key=lambda r: -r["peak_bytes"]):
+        line = (
+            f"{_mb(report['peak_bytes'])} peak"
+            f" ({report.get('peak_stage', '-')}) in {report['seconds']}s"
+            f" | {Path(report['file']).name}"
+        )
+        if "peak_rss_bytes" in report:
+            line = f"{_mb(report['peak_rss_bytes'])} RSS, " + line
+        lines.append(line)
+    return lines
+
+
+def _mb(n: int) -> str:
+    return f"{n / 2**20:.1f} MiB"
@@ -1,11 +1,20 @@
 import camelot
-from pypdf import PdfReader
 from pathlib import Path
 import matplotlib.pyplot as plt
+from bsutils.archive import ArchiveStore
+from bsutils.commit import move_file
+from bsutils.coverage import CoverageIndex
+from bsutils.layout import DocumentLayout, extract_tables, grid_frames
 from bsutils.logger import logger
+from bsutils.prefilter import can_skip
+from bsutils.profiling import stage
+from bsutils.source import PdfSource, open_pdf
+from collections import deque
+from contextlib import closing
 from datetime import datetime
 import pandas as pd
-from classes.statement_tables import StatementTables
+from classes.bank_settings import PageText, TextChunk, as_text_frame, compact_text
+from classes.statement_tables import ParsedStatement, StatementTables
 from classes.statement_settings import *
 from config import load_active_config
 import re
@@ -13,91 +22,515 @@ import re
 _APP_CONFIG = load_active_config()
 
 
-def read_statement(file, statement_reader=None):
-    logger.info(f"Reading statement: {file}")
-    reader = PdfReader(file)
-    page = 0
-    current_table = None
-    date = datetime.today()
+def read_statement(
+    file,
+    statement_reader=None,
+    executor=None,
+    buffer="file",
+    single_pass=False,
+    force=False,
+    tiered=False,
+    stream=None,
+):
+    """
+    Parse ``file``, export every table as CSV and archive the PDF.
+
+    Statements whose accounts and month already have CSVs in the configured
+    directory are skipped after their first kept page (see
+    :class:`bsutils.coverage.CoverageIndex`) unless ``force`` is set.
+
+    With a :class:`bsutils.stream.TableStream`, each table is written to
+    ``stream`` as it completes instead. Nothing is written to the CSV
+    directory then, so every statement is parsed and none is recorded as
+    exported.
+    """
+    coverage = None
+    if stream is None:
+        coverage = CoverageIndex(_APP_CONFIG.csv_dir, _APP_CONFIG.durability)
+    saved = []
+    if stream is not None:
+
+        def on_table(table):
+            stream.write(table, file)
+
+    else:
+
+        def on_table(table):
+            saved.append(
+                (table, table.save(_APP_CONFIG.csv_dir, _APP_CONFIG.durability))
+            )
+
+    source = PdfSource.load(file, buffer)
+    try:
+        statement = parse_statement(
+            source,
+            statement_reader,
+            on_table=on_table,
+            executor=executor,
+            passwords=_APP_CONFIG.passwords.values(),
+            single_pass=single_pass,
+            covered=None if force or coverage is None else coverage.lookup,
+            tiered=tiered,
+        )
+    finally:
+        source.close()
+    if statement.reader is None:
+        return
+    if statement.covered:
+        logger.success(
+            "Skipping '{}': already exported as {}; use --force to parse it again.",
+            Path(file).name,
+            ", ".join(statement.covered),
+        )
+        return
+    if saved:
+        coverage.record(statement.reader, statement.date, saved, statement.titles)
+    archive_file(file, statement.reader, statement.accounts, statement.date)
+
+
+def parse_statement(
+    source,
+    reader=None,
+    on_table=None,
+    executor=None,
+    passwords=(),
+    single_pass=False,
+    covered=None,
+    tiered=False,
+) -> ParsedStatement:
+    """
+    Parse a statement PDF into memory without touching the filesystem.
+
+    ``source`` may be a path, raw bytes, a binary stream or a
+    :class:`PdfSource`. Every completed table is returned as a
+    :class:`ParsedTable`; ``on_table`` is called with each one as soon as it
+    completes, which is how writing CSVs is plugged in.
+
+    With a process ``executor``, Camelot runs on upcoming pages in the workers
+    while earlier pages are assembled here. The PDF is then placed in a shared
+    buffer once and every worker reads from it without copying.
+
+    Encrypted PDFs are decrypted once, trying ``passwords`` in turn, and every
+    later stage reads the plaintext copy.
+
+    Once the reader is known, pages whose content streams show none of its
+    ``PAGE_MARKERS`` are skipped before any text is extracted.
+
+    With ``single_pass``, each page is laid out once by pdfminer and both the
+    page text and Camelot's table search reuse that layout, instead of pypdf
+    and Camelot interpreting the page separately. It has no effect together
+    with an ``executor``, whose workers must lay out their own pages.
+
+    ``covered`` is called with the reader and the :class:`PageAnalysis` of
+    the first kept page, before any table is extracted. When it returns the
+    names of files that already hold the statement, reading stops and they
+    are kept in :attr:`ParsedStatement.covered`.
+
+    With ``tiered``, pages are laid out as with ``single_pass`` and first cut
+    into cells straight from their text lines (:func:`grid_frames`). Each
+    table that then reconciles with its closing figure
+    (:meth:`BankSettings.reconcile`) is kept; the pages of every other table
+    are read again with Camelot and the statement is assembled from those.
+    ``on_table`` is only called once every table is settled. It has no
+    effect together with an ``executor``.
+    """
+    source = PdfSource.coerce(source)
+    logger.info("Reading statement: {}", source.name)
+    with stage("pypdf"):
+        readable, pdf = open_pdf(source, passwords)
+    if readable is not source:
+        logger.debug("Decrypted {} into memory", source.name)
+    shared = readable.share() if executor is not None else readable
+    # Readers slice and rebuild frames rather than mutate them; copy-on-write
+    # (the default from pandas 3) lets those slices share memory with their
+    # parent. It is only set while parsing, not for a program embedding us.
+    try:
+        with pd.option_context("mode.copy_on_write", True):
+            return _parse_pages(
+                shared,
+                pdf,
+                reader,
+                on_table,
+                executor,
+                (single_pass or tiered) and executor is None,
+                covered,
+                tiered and executor is None,
+            )
+    finally:
+        if shared is not source:
+            shared.close()
+
+
+def _text_pages(pdf, skip):
+    for page in range(1, len(pdf.pages) + 1):
+        if skip(page):
+            continue
+        with stage("pypdf"):
+            text = _positioned_text(pdf.pages[page - 1])
+        yield page, text, None
+
+
+# Operators that show text; see ``_positioned_text``.
+_SHOW_TEXT = {b"Tj", b"TJ", b"'", b'"'}
+
+
+def _positioned_text(pdf_page):
+    """Page text plus where each piece starts, collected in the same pass."""
+    chunks = []
+    # pypdf hands each piece of text to ``visit`` with the matrices saved at
+    # its last flush, which are those of ``BT`` for text that is not drawn
+    # first on its line. The matrices at the first operator showing the
+    # piece are taken instead.
+    start = None
+
+    def before(operator, operands, cm, tm):
+        nonlocal start
+        if operator in _SHOW_TEXT and start is None:
+            start = (list(cm), list(tm))
+
+    def visit(text, cm, tm, font, size):
+        nonlocal start
+        if start is not None:
+            cm, tm = start
+            start = None
+        text = text.strip()
+        if text:
+            # Text-space origin mapped through the current transformation.
+            x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+            y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+            chunks.append(TextChunk(text, x, y + size * tm[3] * cm[3]))
+
+    text = pdf_page.extract_text(visitor_operand_before=before, visitor_text=visit)
+    return PageText.positioned(text, chunks, float(pdf_page.mediabox.width))
+
+
+def _layout_pages(source, skip):
+    with DocumentLayout(source) as document:
+        for layout in document.pages(skip):
+            yield layout.number, layout.text, layout
+
+
+def _parse_pages(
+    source,
+    pdf,
+    statement_reader,
+    on_table,
+    executor,
+    single_pass,
+    covered=None,
+    tiered=False,
+):
+    statement = ParsedStatement(reader=statement_reader, date=datetime.today())
+    # Tiered tables are only handed on once they are settled.
+    assembler = _TableAssembler(statement, None if tiered else on_table)
+    tiers = _TieredPages(source, assembler) if tiered else None
+    pending = deque()
     statement_date = None
-    processed_table_titles = []
-    while page < len(reader.pages):
-        page += 1
-        page_content = reader.pages[page - 1].extract_text()
-        if statement_reader is None:
-            statement_reader = auto_assign_reader(page_content)
-            if statement_reader is None:
-                logger.error(
-                    "No statement reader matched this document; skipping file."
+    announced = None
+
+    def skip(page):
+        # Every page is read in full until a reader has been chosen.
+        if statement.reader is None:
+            return False
+        with stage("pypdf"):
+            skipped = can_skip(pdf.pages[page - 1], statement.reader)
+        if skipped:
+            logger.debug("Skipping page {}: it shows none of the page markers", page)
+        return skipped
+
+    pages = _layout_pages(source, skip) if single_pass else _text_pages(pdf, skip)
+    with closing(pages):
+        for page, page_content, layout in pages:
+            if statement.reader is None:
+                statement.reader = auto_assign_reader(page_content)
+                if statement.reader is None:
+                    logger.error(
+                        "No statement reader matched this document; skipping file."
+                    )
+                    return statement
+            analysis = statement.reader.analyse_page(
+                page_content, need_date=statement_date is None
+            )
+            if analysis.trailing:
+                logger.debug("Trailing section starts on page {}; stop reading", page)
+                break
+            if not analysis.keep:
+                logger.debug("Skipping page {} after filtering", page)
+                continue
+            if not statement.titles:
+                statement.titles = list(analysis.titles)
+            if covered is not None:
+                statement.covered = covered(statement.reader, analysis)
+                covered = None
+                if statement.covered:
+                    return statement
+            logger.debug("Processing page {}", page)
+            areas = statement.reader.table_areas(page_content, page)
+            if areas:
+                logger.debug("Reading table areas {} on page {}", areas, page)
+            columns = statement.reader.table_columns(page_content)
+            if columns:
+                logger.debug("Using calibrated columns {} on page {}", columns, page)
+            options = camelot_options(statement.reader, page, areas, columns)
+            if statement_date is None:
+                statement_date = analysis.date
+            if announced is None and statement.reader.END_WHEN_TITLES_COMPLETE:
+                announced = set(analysis.titles)
+            # 读取表格
+            if tiers is not None:
+                tiers.read(page, layout, analysis, statement_date, options)
+            elif executor is None:
+                with stage("camelot"):
+                    frames = _read_page_frames(source, page, options, layout)
+                assembler.feed(frames, analysis, statement_date)
+            else:
+                frames = executor.submit(
+                    _read_page_frames_in_worker, source, page, options
                 )
-                return
-        if not statement_reader.page_filter(page_content):
-            logger.debug(f"Skipping page {page} after filtering")
-            continue
-        logger.debug(f"Processing page {page}")
-        if statement_date is None:
-            statement_date = statement_reader.extract_date(page_content)
-        # 读取表格
-        tables = try_read_pdf_table(file, page, statement_reader)
-        if not tables:
-            continue
-        for table in tables:
-            df = table.df
+                pending.append((frames, analysis, statement_date))
+                # Assemble finished pages while later ones are still extracting.
+                while pending and pending[0][0].done():
+                    _feed_pending(assembler, pending, announced)
+            if analysis.last_page or assembler.is_done(announced):
+                if page < len(pdf.pages):
+                    logger.debug("Statement ends on page {}; stop reading", page)
+                break
+    while pending:
+        _feed_pending(assembler, pending, announced)
+    if tiers is not None:
+        return tiers.finish(on_table)
+    return statement
 
-            if statement_date:
-                date = statement_date
-            table_title_list = statement_reader.extract_titles(page_content)
-            table_header_mask = statement_reader.header_locator(df)
-            number_of_tables, table_header_index = get_table_count_and_index(
-                df, table_header_mask, current_table, table_title_list
+
+class _PageRecord:
+    """A kept page in tiered mode: its frames and what re-reading it takes."""
+
+    def __init__(self, page, analysis, statement_date, options, layout):
+        self.page = page
+        self.analysis = analysis
+        self.statement_date = statement_date
+        self.options = options
+        self.layout = layout
+        self.frames = None
+        # Whether ``frames`` were cut from text lines rather than by Camelot.
+        self.grid = False
+
+
+class _TieredPages:
+    """
+    Tiered extraction of one statement.
+
+    Each kept page is cut from its text lines where :func:`grid_frames` can,
+    and by Camelot otherwise. As soon as a table completes it is reconciled
+    (:meth:`BankSettings.reconcile`); if it does not reconcile, or cannot be
+    checked, its pages are read again with Camelot while their layouts are
+    still at hand. Pages left outside any table, or in a table that never
+    closes, are treated the same way. Layouts are kept only for the pages of
+    the table in progress.
+    """
+
+    def __init__(self, source, assembler):
+        self.source = source
+        self.assembler = assembler
+        self.records = []
+        self.settled = 0
+        self.reread = False
+
+    def read(self, page, layout, analysis, statement_date, options):
+        record = _PageRecord(page, analysis, statement_date, options, layout)
+        with stage("grid"):
+            record.frames = grid_frames(layout, options)
+        record.grid = record.frames is not None
+        if not record.grid:
+            with stage("camelot"):
+                record.frames = _read_page_frames(self.source, page, options, layout)
+        self.records.append(record)
+        self.assembler.feed(record.frames, analysis, statement_date, page)
+        self._settle()
+        if not any(page in pages for _, pages in self.assembler.completed) and (
+            page not in self.assembler.current_pages
+        ):
+            self._read_again({page})
+        for record in self.records:
+            if record.page not in self.assembler.current_pages:
+                record.layout = None
+
+    def _settle(self):
+        reader = self.assembler.statement.reader
+        for table, pages in self.assembler.completed[self.settled :]:
+            if table is not None and reader.reconcile(table):
+                logger.debug(
+                    "Table '{}' reconciles with its closing figure", table.account
+                )
+            elif table is not None and self._read_again(pages):
+                logger.info(
+                    "Table '{}' does not reconcile; read pages {} again with Camelot",
+                    table.account,
+                    sorted(pages),
+                )
+            else:
+                self._read_again(pages)
+        self.settled = len(self.assembler.completed)
+
+    def _read_again(self, pages):
+        """Re-read the grid-cut ``pages`` with Camelot; whether there were any."""
+        found = False
+        for record in self.records:
+            if record.page in pages and record.grid:
+                with stage("camelot"):
+                    record.frames = _read_page_frames(
+                        self.source, record.page, record.options, record.layout
+                    )
+                record.grid = False
+                found = self.reread = True
+        return found
+
+    def finish(self, on_table):
+        """
+        Settle the table left open, assemble the statement again if any page
+        was re-read and hand every table to ``on_table``.
+        """
+        self._read_again(self.assembler.current_pages)
+        statement = self.assembler.statement
+        logger.debug(
+            "Tiered extraction: {} of {} pages kept as cut from text lines",
+            sum(record.grid for record in self.records),
+            len(self.records),
+        )
+        if self.reread:
+            statement = ParsedStatement(
+                reader=statement.reader, date=statement.date, titles=statement.titles
             )
-            for tc in range(number_of_tables):
-                current_table, current_df = handle_table_detection(
-                    current_table,
-                    table_title_list,
-                    df,
-                    table_header_mask,
-                    table_header_index,
-                    tc,
-                    date,
+            assembler = _TableAssembler(statement)
+            for record in self.records:
+                assembler.feed(
+                    record.frames, record.analysis, record.statement_date, record.page
                 )
-                if current_table is not None:
-                    (
-                        current_table.is_complete,
-                        current_table.balance,
-                    ) = statement_reader.is_table_end(current_df)
-                    current_df = statement_reader.row_filter(current_df)
-                    current_df = statement_reader.process(current_df, date)
-                    current_table.append(current_df)
-                    if current_table.is_complete == 1:
-                        if (
-                            current_table.account != "Unknown"
-                            and len(current_table) > 0
-                        ):
-                            processed_table_titles.append(current_table.account)
-                        current_table.save()
-                        current_table = None
-    archive_file(file, statement_reader, processed_table_titles, date)
+        if on_table is not None:
+            for table in statement:
+                with stage("save"):
+                    on_table(table)
+        return statement
+
+
+def _feed_pending(assembler, pending, announced):
+    frames, analysis, page_date = pending.popleft()
+    assembler.feed(frames.result(), analysis, page_date)
+    if assembler.is_done(announced):
+        for frames, _, _ in pending:
+            frames.cancel()
+        pending.clear()
+
+
+class _TableAssembler:
+    """Stitch per-page Camelot frames into account tables, in page order."""
+
+    def __init__(self, statement, on_table=None):
+        self.statement = statement
+        self.on_table = on_table
+        self.current_table = None
+        # Pages each table was read from: completed tables (``None`` for
+        # those without transactions) and the one in progress.
+        self.completed = []
+        self.current_pages = set()
+        self.page = None
+
+    def is_done(self, announced):
+        """Whether every announced title has a completed table."""
+        return (
+            bool(announced)
+            and self.current_table is None
+            and announced.issubset(self.statement.accounts)
+        )
+
+    def feed(self, frames, analysis, statement_date, page=None):
+        if not frames:
+            return
+        self.page = page
+        statement_reader = self.statement.reader
+        for df in frames:
+            if statement_date:
+                self.statement.date = statement_date
+            date = self.statement.date
+            # Each frame consumes its own copy of the page's titles.
+            table_title_list = list(analysis.titles)
+            with stage("process"):
+                count = max(bool(self.current_table) + len(table_title_list), 1)
+                segments = statement_reader.segments(df, count)
+            for segment in segments:
+                if self.current_table is None:
+                    self.current_table = start_table(table_title_list, date)
+                    self.current_pages = set()
+                self._append(segment, date)
+
+    def _append(self, segment, date):
+        statement_reader = self.statement.reader
+        current_table = self.current_table
+        with stage("process"):
+            current_table.is_complete = segment.finished
+            current_table.balance = segment.balance
+            if current_table.opening is None:
+                current_table.opening = segment.opening
+            self.current_pages.add(self.page)
+            current_df = statement_reader.process(segment.frame, date)
+            current_df = statement_reader.apply_rules(current_df)
+            current_table.append(current_df)
+            if current_table.is_complete != 1:
+                return
+            if current_table.account != "Unknown" and len(current_table) > 0:
+                self.statement.accounts.append(current_table.account)
+            parsed = current_table.to_parsed()
+            self.completed.append((parsed, self.current_pages))
+            self.current_table = None
+            self.current_pages = set()
+        if parsed is not None:
+            self.statement.append(parsed)
+            if self.on_table is not None:
+                with stage("save"):
+                    self.on_table(parsed)
 
 
 def auto_assign_reader(page_content):
-    page_content = page_content.replace(" ", "")
+    page_content = compact_text(page_content)
     for patterns, reader_cls in SETTING_DICT:
-        if all(re.findall(pattern, page_content) for pattern in patterns):
+        if all(re.search(pattern, page_content) for pattern in patterns):
             reader = reader_cls()
             logger.debug(
-                f"Automatically selected reader '{reader.__class__.__name__}'."
+                "Automatically selected reader '{}'.", reader.__class__.__name__
             )
             return reader
     logger.debug("No reader matched the page content automatically.")
     return None
 
 
-def try_read_pdf_table(file, page, statement_reader):
+def _read_page_frames(source, page, options, layout=None):
+    tables = None
+    if layout is not None:
+        tables = try_read_layout_table(layout, options)
+    if tables is None:
+        tables = try_read_pdf_table(source, page, options)
+    if not tables:
+        return None
+    return [as_text_frame(table.df) for table in tables]
+
+
+def _read_page_frames_in_worker(source, page, options):
+    """
+    Read a page in a worker process. The frames come back as
+    :data:`TEXT_DTYPE` cells, which pickle as whole Arrow buffers when
+    pyarrow is installed rather than one Python string per cell
+    (``benchmarks/transport.py``).
+    """
     try:
-        tables = camelot.read_pdf(
-            str(file), pages=str(page), **statement_reader.reader_options(page)
-        )
+        return _read_page_frames(source, page, options)
+    finally:
+        source.close()
+
+
+def try_read_pdf_table(file, page, options):
+    source = PdfSource.coerce(file)
+    try:
+        tables = camelot.read_pdf(source.open(), pages=str(page), **options)
         return tables
     except Exception as e:
         logger.warning(
@@ -106,41 +539,45 @@ def try_read_pdf_table(file, page, statement_reader):
         return None
 
 
-def get_table_count_and_index(df, table_header_mask, current_table, table_title_list):
-    if isinstance(table_header_mask, (pd.DataFrame, pd.Series)):
-        number_of_tables = table_header_mask.sum()
-        table_header_index = df[table_header_mask].index
-    else:
-        number_of_tables = max(bool(current_table) + len(table_title_list), 1)
-        table_header_index = None
-    return number_of_tables, table_header_index
+def camelot_options(statement_reader, page, areas=None, columns=None):
+    """
+    The reader's Camelot options for ``page``, limited to ``areas`` and with
+    calibrated ``columns`` if given.
+    """
+    options = dict(statement_reader.reader_options(page))
+    if columns:
+        options["columns"] = list(columns)
+    if areas:
+        options["table_areas"] = list(areas)
+        columns = options.get("columns")
+        if columns and len(columns) != len(areas):
+            # Camelot wants one column spec per area; readers give one.
+            options["columns"] = columns[:1] * len(areas)
+    return options
 
 
-def handle_table_detection(
-    current_table, table_title_list, df, table_header_mask, table_header_index, tc, date
-):
-    # 没有正在读取的表格：新表格检测
-    if current_table is None:
-        if len(table_title_list):
-            logger.debug("Detected start of a new table")
-            account = table_title_list.pop(0)
-            logger.success(f"Processing account table: {account}")
-        else:
-            logger.debug("Starting unnamed table capture")
-            account = "Unknown"
-            logger.info(f"Processing table with placeholder account '{account}'")
-        current_table = StatementTables(account=account, date=date)
-    # 已有表格，选择表格数据
-    if current_table is not None and isinstance(
-        table_header_mask, (pd.DataFrame, pd.Series)
-    ):
-        if tc == len(table_header_index) - 1:  # 最后一个表
-            current_df = df.loc[table_header_index[tc] :]
-        else:
-            current_df = df.loc[table_header_index[tc] : table_header_index[tc + 1] - 1]
+def try_read_layout_table(layout, options):
+    """Tables from an already laid out page, or ``None`` to use Camelot as usual."""
+    try:
+        return extract_tables(layout, options)
+    except Exception as e:
+        logger.warning(
+            f"Camelot failed to parse tables on page {layout.number}: {e}; continuing."
+        )
+        return []
+
+
+def start_table(table_title_list, date):
+    # 新表格检测
+    if len(table_title_list):
+        logger.debug("Detected start of a new table")
+        account = table_title_list.pop(0)
+        logger.success("Processing account table: {}", account)
     else:
-        current_df = df
-    return current_table, current_df
+        logger.debug("Starting unnamed table capture")
+        account = "Unknown"
+        logger.info("Processing table with placeholder account '{}'", account)
+    return StatementTables(account=account, date=date)
 
 
 def archive_file(file, statement_reader, processed_table_titles, date):
@@ -152,7 +589,15 @@ def archive_file(file, statement_reader, processed_table_titles, date):
                 processed_table_titles[0] if len(processed_table_titles) else "Unknown"
             )
             target_name = f"{type(statement_reader).__name__}_{account}_{date.strftime('%Y%m')}.pdf"
-            file.rename(archive_dir / target_name)
+            if _APP_CONFIG.archive == "store":
+                store = ArchiveStore(
+                    archive_dir, _APP_CONFIG.compression, _APP_CONFIG.durability
+                )
+                target_name = store.add(file, target_name)
+            else:
+                target_name = move_file(
+                    file, archive_dir / target_name, _APP_CONFIG.durability
+                ).name
             logger.info(f"PDF file is archived as: {target_name}")
     except Exception as e:
         logger.warning(f"Failed to archive processed file: {e}")
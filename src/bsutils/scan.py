@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional, TextIO
+
+from pypdf import PdfReader
+
+from bsutils.logger import logger
+from bsutils.prefilter import can_skip
+from bsutils.reader import auto_assign_reader
+from bsutils.source import unlock
+from config import load_config
+
+INVENTORY_COLUMNS = [
+    "file",
+    "reader",
+    "pages",
+    "kept_pages",
+    "statement_date",
+    "titles",
+    "estimated_cost",
+    "error",
+]
+
+
+def scan_file(path: Path) -> dict:
+    """
+    Inventory one PDF using only pypdf text and the reader's page hooks.
+
+    Pages are counted the way the pipeline would read them: filtered pages
+    are skipped (without extracting their text when the reader's page markers
+    are absent from the content stream) and reading stops at the reader's
+    end-of-statement markers.
+    No tables are extracted.
+    """
+    row = dict.fromkeys(INVENTORY_COLUMNS, "")
+    row.update(file=str(path), pages=0, kept_pages=0, estimated_cost=0.0)
+    try:
+        pdf = PdfReader(str(path), strict=False)
+        unlock(pdf, load_config().passwords.values(), str(path))
+        row["pages"] = len(pdf.pages)
+        reader = None
+        titles = []
+        for page in pdf.pages:
+            if reader is not None and can_skip(page, reader):
+                continue
+            text = page.extract_text()
+            if reader is None:
+                reader = auto_assign_reader(text)
+                if reader is None:
+                    row["error"] = "no matching reader"
+                    break
+                row["reader"] = type(reader).__name__
+            analysis = reader.analyse_page(text, need_date=not row["statement_date"])
+            if analysis.trailing:
+                break
+            if not analysis.keep:
+                continue
+            row["kept_pages"] += 1
+            titles.extend(t for t in analysis.titles if t not in titles)
+            if analysis.date is not None and not row["statement_date"]:
+                row["statement_date"] = analysis.date.strftime("%Y-%m-%d")
+            if analysis.last_page:
+                break
+        row["titles"] = "; ".join(titles)
+        if reader is not None:
+            row["estimated_cost"] = row["kept_pages"] * reader.COST_PER_PAGE
+    except Exception as exc:
+        row["error"] = f"{type(exc).__name__}: {exc}"
+    return row
+
+
+def scan(files: Iterable[Path], jobs: Optional[int] = None) -> list:
+    """Scan ``files`` in ``jobs`` processes (all CPUs by default), keeping input order."""
+    files = list(files)
+    if jobs == 1 or len(files) < 2:
+        return [scan_file(path) for path in files]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(scan_file, files, chunksize=8))
+
+
+def write_inventory(rows: list, fmt: str = "csv", stream: TextIO = None) -> None:
+    """Write the scan rows as CSV or JSON to ``stream`` (stdout by default)."""
+    stream = stream or sys.stdout
+    if fmt == "json":
+        json.dump(rows, stream, indent=2)
+        stream.write("\n")
+        return
+    writer = csv.DictWriter(stream, fieldnames=INVENTORY_COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def log_summary(rows: list) -> None:
+    readers = {}
+    for row in rows:
+        key = row["reader"] or "unmatched"
+        readers[key] = readers.get(key, 0) + 1
+    cost = sum(row["estimated_cost"] for row in rows)
+    logger.success(
+        f"Scanned {len(rows)} files: "
+        + ", ".join(f"{name}={n}" for name, n in sorted(readers.items()))
+        + f"; {sum(r['kept_pages'] for r in rows)} pages to extract,"
+        + f" estimated cost {cost:g}"
+    )
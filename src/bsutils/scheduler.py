@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from pypdf import PdfReader
+
+from bsutils.logger import logger
+
+# Fallback when the page count cannot be read (broken file or unknown password).
+BYTES_PER_PAGE_GUESS = 60_000
+
+
+@dataclass
+class StatementCost:
+    """Cheap up-front estimate of how expensive a statement is to parse."""
+
+    path: Path
+    size: int
+    pages: int
+    reader: Optional[str]
+    cost: float
+
+
+def discover(
+    directories: Iterable[Path],
+    pattern: str = "*.pdf",
+    recursive: bool = False,
+    manifest: Optional[Path] = None,
+) -> list:
+    """
+    Collect statement files from ``directories`` and an optional ``manifest``.
+
+    Manifest files list one path per line (relative paths are resolved
+    against the manifest's folder; blank lines and ``#`` comments are
+    ignored). Duplicates are dropped, keeping the first occurrence.
+    """
+    found = []
+    for directory in directories:
+        if not directory.exists() or not directory.is_dir():
+            logger.error(f"Directory missing or not a folder: {directory}")
+            continue
+        matches = directory.rglob(pattern) if recursive else directory.glob(pattern)
+        matched = sorted(p for p in matches if p.is_file())
+        if not matched:
+            logger.warning(f"No files matched pattern '{pattern}' in {directory}")
+        found.extend(matched)
+    if manifest is not None:
+        for line in manifest.read_text().splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = Path(line).expanduser()
+            if not path.is_absolute():
+                path = manifest.parent / path
+            if path.is_file():
+                found.append(path)
+            else:
+                logger.warning(f"Manifest entry not found: {path}")
+    unique = {}
+    for path in found:
+        unique.setdefault(path.resolve(), path)
+    return list(unique.values())
+
+
+def estimate_cost(path: Path, detect_reader: bool = True) -> StatementCost:
+    """
+    Estimate the parsing cost of ``path`` without extracting any tables.
+
+    The page count comes from the document's page tree root, and the reader
+    (detected from the first page's text) scales it by its ``COST_PER_PAGE``.
+    Encrypted files are costed by size (:func:`size_cost`): decrypting them
+    here would repeat the decryption the worker parsing them does anyway.
+    """
+    from bsutils.reader import auto_assign_reader
+
+    size = path.stat().st_size
+    pages = 0
+    reader = None
+    try:
+        pdf = PdfReader(str(path), strict=False)
+        if pdf.is_encrypted:
+            return size_cost(path)
+        pages = int(pdf.trailer["/Root"]["/Pages"]["/Count"])
+        if detect_reader and pages:
+            reader = auto_assign_reader(pdf.pages[0].extract_text())
+    except Exception as exc:
+        logger.debug("Could not inspect {} for scheduling: {}", path, exc)
+    if not pages:
+        pages = max(1, size // BYTES_PER_PAGE_GUESS)
+    weight = reader.COST_PER_PAGE if reader is not None else 1.0
+    return StatementCost(
+        path=path,
+        size=size,
+        pages=pages,
+        reader=type(reader).__name__ if reader is not None else None,
+        cost=pages * weight,
+    )
+
+
+def size_cost(path: Path) -> StatementCost:
+    """A cost from the file size alone, for runs that gain nothing from order."""
+    size = path.stat().st_size
+    pages = max(1, size // BYTES_PER_PAGE_GUESS)
+    return StatementCost(path=path, size=size, pages=pages, reader=None, cost=pages)
+
+
+def plan(files: Iterable[Path], executor=None, estimate: bool = True) -> list:
+    """
+    Estimate every file (in ``executor`` when given), most expensive first.
+
+    Without ``estimate``, files keep their order and are costed by size only
+    (enough for the ETA), so no PDF is opened, let alone decrypted, twice.
+    """
+    files = list(files)
+    if not estimate:
+        return [size_cost(path) for path in files]
+    if executor is not None:
+        costs = list(executor.map(estimate_cost, files, chunksize=16))
+    else:
+        costs = [estimate_cost(path) for path in files]
+    # Longest-processing-time-first keeps the tail of a parallel run short.
+    return sorted(costs, key=lambda c: (-c.cost, -c.size))
+
+
+class Progress:
+    """Track completed cost and project the remaining time from the observed rate."""
+
+    def __init__(self, costs: list) -> None:
+        self.total = sum(c.cost for c in costs) or 1.0
+        self.count = len(costs)
+        self.done_cost = 0.0
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def complete(self, item: StatementCost) -> str:
+        self.done += 1
+        self.done_cost += item.cost
+        elapsed = time.perf_counter() - self.started
+        remaining = (self.total - self.done_cost) * elapsed / self.done_cost
+        return (
+            f"[{self.done}/{self.count}] {item.path.name} done;"
+            f" {self.done_cost / self.total:.0%} of estimated work,"
+            f" ETA {_duration(remaining)}"
+        )
+
+
+def _duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    return f"{minutes}m{seconds:02d}s"
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import io
+import mmap
+import os
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional, Tuple, Union
+
+from pypdf import PasswordType, PdfReader, PdfWriter
+from pypdf.errors import FileNotDecryptedError
+
+PdfInput = Union[bytes, bytearray, memoryview, BinaryIO, Path, str]
+
+BUFFER_MODES = ("file", "memory", "mmap")
+
+
+class _BufferRaw(io.RawIOBase):
+    """Read-only, seekable raw stream over a buffer; reads copy only the slice asked for."""
+
+    def __init__(self, view: memoryview) -> None:
+        super().__init__()
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos : self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+class PdfSource:
+    """
+    A statement PDF given either as a file path or as an in-memory buffer.
+
+    pypdf and Camelot both accept a path or a binary stream, so the pipeline
+    asks the source for a fresh handle via :meth:`open` instead of assuming a
+    file exists on disk. Buffers may be plain bytes, a read-only memory map of
+    the file, or a shared-memory block (see :meth:`share`); every handle reads
+    from the same buffer, so the file is read from storage at most once.
+    """
+
+    def __init__(
+        self, path: Optional[Path] = None, data: Optional[bytes] = None
+    ) -> None:
+        if path is None and data is None:
+            raise ValueError("PdfSource needs a path or data.")
+        self.path = path
+        self.data = data
+        self._mmap = None
+        self._shm = None
+        self._owner = False
+
+    @classmethod
+    def coerce(cls, source: Union["PdfSource", PdfInput]) -> "PdfSource":
+        if isinstance(source, PdfSource):
+            return source
+        if isinstance(source, (str, Path)):
+            return cls(path=Path(source))
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return cls(data=bytes(source))
+        if hasattr(source, "read"):
+            name = getattr(source, "name", None)
+            return cls(
+                path=Path(name) if isinstance(name, str) else None,
+                data=source.read(),
+            )
+        raise TypeError(f"Unsupported PDF source: {type(source).__name__}")
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mode: str = "memory") -> "PdfSource":
+        """
+        Open ``path`` according to ``mode``.
+
+        ``"file"`` keeps the path (each stage opens the file itself),
+        ``"memory"`` reads the file once into bytes and ``"mmap"`` maps it
+        read-only so the OS page cache is the only copy.
+        """
+        path = Path(path)
+        if mode == "file":
+            return cls(path=path)
+        if mode == "mmap":
+            source = cls(path=path, data=b"")
+            source._attach_mmap()
+            return source
+        if mode == "memory":
+            return cls(path=path, data=path.read_bytes())
+        raise ValueError(
+            f"Unknown buffer mode '{mode}'; expected one of {BUFFER_MODES}"
+        )
+
+    @property
+    def name(self) -> str:
+        return str(self.path) if self.path is not None else "<memory>"
+
+    @property
+    def is_shared(self) -> bool:
+        return self._mmap is not None or self._shm is not None
+
+    def open(self) -> Union[str, BinaryIO]:
+        """Return a handle that pypdf and Camelot can both read from."""
+        if self.data is None:
+            return str(self.path)
+        if isinstance(self.data, bytes):
+            # BytesIO shares the bytes object until it is written to.
+            return io.BytesIO(self.data)
+        return io.BufferedReader(_BufferRaw(self.data))
+
+    def share(self) -> "PdfSource":
+        """
+        Return a source that worker processes can attach to without copying.
+
+        Memory-mapped sources are already shareable (workers map the same
+        file). Anything else is placed in a :mod:`multiprocessing.shared_memory`
+        block, reading the file straight into it when it is not loaded yet.
+        The caller owns the returned source and must :meth:`close` it.
+        """
+        if self.is_shared:
+            return self
+        size = len(self.data) if self.data is not None else self.path.stat().st_size
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        if self.data is not None:
+            shm.buf[:size] = self.data
+        else:
+            with open(self.path, "rb") as fh:
+                filled = 0
+                while filled < size:
+                    n = fh.readinto(shm.buf[filled:size])
+                    if not n:
+                        break
+                    filled += n
+        shared = PdfSource(path=self.path, data=shm.buf[:size])
+        shared._shm = shm
+        shared._owner = True
+        return shared
+
+    def close(self) -> None:
+        """Release the buffer; shared-memory blocks are unlinked by their owner."""
+        if isinstance(self.data, memoryview):
+            self.data.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                # A stream still references the block; it is unmapped once
+                # that stream is garbage collected.
+                pass
+            if self._owner:
+                self._shm.unlink()
+            self._shm = None
+
+    def _attach_mmap(self) -> None:
+        with open(self.path, "rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.data = memoryview(self._mmap)
+
+    # Pickling sends workers a reference to the buffer, never the bytes.
+    def __getstate__(self) -> dict:
+        if self._shm is not None:
+            return {"path": self.path, "shm": self._shm.name, "size": len(self.data)}
+        if self._mmap is not None:
+            return {"path": self.path, "mmap": True}
+        return {"path": self.path, "data": self.data}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(path=state["path"], data=state.get("data", b""))
+        if "shm" in state:
+            # Pool workers share the parent's resource tracker, which unlinks
+            # the block once the owner closes it.
+            self._shm = shared_memory.SharedMemory(name=state["shm"])
+            self.data = self._shm.buf[: state["size"]]
+        elif state.get("mmap"):
+            self._attach_mmap()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name})"
+
+
+def unlock(pdf: PdfReader, passwords: Iterable[str] = (), name: str = "PDF") -> None:
+    """
+    Decrypt ``pdf`` in place when it is encrypted.
+
+    The empty password is tried first (many statements only restrict
+    printing), then each of ``passwords``. Raises
+    :class:`~pypdf.errors.FileNotDecryptedError` when none fits.
+    """
+    if not pdf.is_encrypted:
+        return
+    for password in ("", *passwords):
+        if pdf.decrypt(password) != PasswordType.NOT_DECRYPTED:
+            return
+    raise FileNotDecryptedError(
+        f"None of the configured passwords opens {name}; "
+        "add one with 'config set --password LABEL=PASSWORD'."
+    )
+
+
+def open_pdf(
+    source: PdfSource, passwords: Iterable[str] = ()
+) -> Tuple[PdfSource, PdfReader]:
+    """
+    Open ``source`` with pypdf, decrypting it once when it is encrypted.
+
+    An encrypted document is rewritten to an in-memory plaintext copy and the
+    returned source points at that copy, so later stages (Camelot, worker
+    processes) never decrypt again. Unencrypted sources are returned as is.
+    """
+    pdf = PdfReader(source.open())
+    if not pdf.is_encrypted:
+        return source, pdf
+    unlock(pdf, passwords, source.name)
+    buffer = io.BytesIO()
+    PdfWriter(clone_from=pdf).write(buffer)
+    plain = PdfSource(path=source.path, data=buffer.getvalue())
+    return plain, PdfReader(plain.open())
+
+
+def ensure_shared_memory_tracker() -> None:
+    """
+    Start the resource tracker before forking workers.
+
+    Workers then inherit it instead of starting their own, which would
+    unlink shared buffers as soon as a worker exits.
+    """
+    if os.name == "posix":
+        resource_tracker.ensure_running()
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+import pandas as pd
+
+from const import OUTPUT_COLUMNS
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+STREAM_FORMATS = ("ndjson", "arrow")
+# Written in front of every transaction, so records from several statements
+# and accounts can share one stream.
+TAG_COLUMNS = ["source", "account", "period", "balance"]
+
+
+class TableStream:
+    """
+    Completed tables written as transaction records to one binary stream.
+
+    ``ndjson`` writes a JSON object per transaction; ``arrow`` writes an
+    Arrow IPC stream with one record batch per table, which needs
+    ``pyarrow``. Every record carries the source PDF's name, the account,
+    the table's period (as in the CSV names) and its balance. Each table is
+    flushed as soon as it is written so a consumer on the other end of a pipe
+    sees it straight away. Cells are kept as the text the CSVs would hold;
+    empty cells become ``null``.
+    """
+
+    def __init__(self, fmt: str = "ndjson", target: Optional[BinaryIO] = None):
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(
+                f"Unknown stream format '{fmt}'; expected one of {STREAM_FORMATS}"
+            )
+        if fmt == "arrow" and pyarrow is None:
+            raise ImportError("--format arrow needs pyarrow installed")
+        self.fmt = fmt
+        self.target = target if target is not None else sys.stdout.buffer
+        self.tables = 0
+        self.records = 0
+        self._writer = None
+
+    def write(self, table, source) -> None:
+        """Write the transactions of ``table``, read from the PDF ``source``."""
+        frame = table.frame[OUTPUT_COLUMNS]
+        frame = frame.mask(frame.eq(""))
+        tags = {
+            "source": Path(source).name,
+            "account": table.account,
+            "period": table.period,
+            "balance": None if table.balance is None else str(table.balance),
+        }
+        if self.fmt == "arrow":
+            self._write_batch(frame, tags)
+        else:
+            self._write_lines(frame, tags)
+        self.target.flush()
+        self.tables += 1
+        self.records += len(frame)
+
+    def _write_lines(self, frame: pd.DataFrame, tags: dict) -> None:
+        values = frame.astype(object).where(frame.notna(), None)
+        lines = [
+            json.dumps({**tags, **dict(zip(OUTPUT_COLUMNS, row))}, ensure_ascii=False)
+            for row in values.itertuples(index=False, name=None)
+        ]
+        if lines:
+            self.target.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+    def _schema(self):
+        return pyarrow.schema(
+            [(name, pyarrow.string()) for name in TAG_COLUMNS + OUTPUT_COLUMNS]
+        )
+
+    def _write_batch(self, frame: pd.DataFrame, tags: dict) -> None:
+        if self._writer is None:
+            self._writer = pyarrow.ipc.new_stream(self.target, self._schema())
+        rows = len(frame)
+        columns = [
+            pyarrow.array([tags[name]] * rows, pyarrow.string()) for name in TAG_COLUMNS
+        ]
+        columns += [
+            pyarrow.array(
+                frame[name].astype(object), pyarrow.string(), from_pandas=True
+            )
+            for name in OUTPUT_COLUMNS
+        ]
+        self._writer.write_batch(pyarrow.record_batch(columns, schema=self._schema()))
+
+    def close(self) -> None:
+        """End the stream; an Arrow stream gets its schema even when empty."""
+        if self.fmt == "arrow":
+            if self._writer is None:
+                self._writer = pyarrow.ipc.new_stream(self.target, self._schema())
+            self._writer.close()
+        self.target.flush()
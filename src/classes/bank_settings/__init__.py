@@ -1,4 +1,14 @@
-from .base import BankSettings
+from .base import (
+    TEXT_DTYPE,
+    BankSettings,
+    PageAnalysis,
+    PageText,
+    Segment,
+    TextChunk,
+    as_text_frame,
+    compact_text,
+)
+from .rules import Rule, RuleSet, load_rules
 from .dbs_acc import DBS_ACC
 from .dbs_cc import DBS_CC
 from .uob_acc import UOB_ACC
@@ -7,6 +17,16 @@ from .citi_cc import CITI_CC
 
 __all__ = [
     "BankSettings",
+    "PageAnalysis",
+    "PageText",
+    "Segment",
+    "TextChunk",
+    "Rule",
+    "RuleSet",
+    "load_rules",
+    "compact_text",
+    "TEXT_DTYPE",
+    "as_text_frame",
     "DBS_ACC",
     "DBS_CC",
     "UOB_ACC",
@@ -1,17 +1,177 @@
 from __future__ import annotations
 
 import re
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, Optional, Tuple, Union
+from functools import cached_property
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
 from datetime import timedelta
 
+import numpy as np
 import pandas as pd
 
+from const import DATE_FORMATTER, OUTPUT_COLUMNS
+
+from .calibration import calibrated_columns, load_calibration
+from .rules import Rule, reader_rules
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
 TableEnd = Tuple[bool, Optional[Union[str, float, int]]]
 CamelotOptions = Dict[str, Any]
 # Required schema for processed statement dataframes
 StatementFrame = pd.DataFrame
 
+# Cell dtype of the Camelot frames handed to readers. Arrow-backed strings
+# keep each column in one buffer instead of one Python object per cell.
+TEXT_DTYPE = "string[pyarrow]" if pyarrow is not None else object
+
+
+class TextChunk(NamedTuple):
+    """A piece of page text and where it starts, in PDF points."""
+
+    text: str
+    x: float
+    top: float
+
+
+class PageText(str):
+    """Page text that computes its space-stripped form only once."""
+
+    # Positioned pieces of the text and the page width, when the extractor
+    # reports them (see :meth:`BankSettings.table_areas`).
+    chunks: Tuple[TextChunk, ...] = ()
+    width: float = 0.0
+
+    @classmethod
+    def positioned(cls, text: str, chunks, width: float) -> "PageText":
+        page = cls(text)
+        page.chunks = tuple(chunks)
+        page.width = width
+        return page
+
+    @cached_property
+    def compact(self) -> str:
+        return self.replace(" ", "")
+
+
+def compact_text(p: str) -> str:
+    """Return ``p`` without spaces, reusing the cached form of a :class:`PageText`."""
+    if isinstance(p, PageText):
+        return p.compact
+    return p.replace(" ", "")
+
+
+def describe_rows(df: pd.DataFrame) -> str:
+    """Render rows on one line for log messages; pass lazily, it is costly."""
+    return df.to_string(index=False, header=False).replace("\n", "; ").strip()
+
+
+def as_text_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert a Camelot frame to :data:`TEXT_DTYPE` cells."""
+    if TEXT_DTYPE is object:
+        return df
+    return df.astype(TEXT_DTYPE)
+
+
+def empty_statement() -> StatementFrame:
+    """A processed table without transactions."""
+    return pd.DataFrame(columns=OUTPUT_COLUMNS)
+
+
+def format_dates(dates: pd.Series) -> pd.Series:
+    """
+    Format ``dates`` as ``DATE_FORMATTER`` strings.
+
+    A statement repeats a few dozen dates, so each distinct date is
+    formatted once rather than once per row.
+    """
+    codes, distinct = pd.factorize(dates, use_na_sentinel=False)
+    text = pd.DatetimeIndex(distinct).strftime(DATE_FORMATTER).to_numpy()
+    return pd.Series(text[codes], index=dates.index, dtype=object)
+
+
+def join_lines(text: pd.Series, entry: pd.Series) -> pd.DataFrame:
+    """
+    Gather each entry's text lines into columns ``0..n``.
+
+    ``entry`` numbers the rows of ``text`` by transaction, in order. The
+    result has one row per entry, labelled like the entry's first row.
+    Missing cells are skipped, so an entry with fewer lines than the longest
+    one is padded with missing values on the right.
+    """
+    present = text.notna()
+    # Summing "line\n" strings joins each group in one vectorised pass.
+    joined = (text[present] + "\n").groupby(entry[present]).sum()
+    joined = joined.reindex(entry.unique(), fill_value="")
+    joined.index = entry.index[~entry.duplicated()]
+    return joined.str.strip("\n").str.split("\n", expand=True)
+
+
+def join_columns(frame: pd.DataFrame, sep: str = " - ") -> pd.Series:
+    """Join the columns of ``frame`` row by row, treating missing cells as ``""``."""
+    frame = frame.fillna("")
+    if not len(frame.columns):
+        return pd.Series("", index=frame.index)
+    joined = frame.iloc[:, 0]
+    for column in range(1, len(frame.columns)):
+        joined = joined + sep + frame.iloc[:, column]
+    return joined
+
+
+def table_ends(
+    df: pd.DataFrame, mask: pd.Series, column: Optional[int] = None
+) -> pd.Series:
+    """
+    :meth:`BankSettings.table_end_rows` for rows flagged by ``mask``: the
+    balance in ``column`` without thousands separators, or ``0`` when the
+    table states none, and missing on every other row.
+    """
+    ends = pd.Series(None, index=df.index, dtype=object)
+    if mask.any():
+        if column is None:
+            ends[mask] = 0
+        else:
+            ends[mask] = df.loc[mask, column].str.replace(",", "").to_numpy(object)
+    return ends
+
+
+def parse_amounts(values: pd.Series) -> np.ndarray:
+    """
+    Amount cells as floats: thousands separators are ignored, ``(x)`` and
+    ``x CR`` are negative and blank cells are ``0``. Cells that are not
+    amounts become NaN.
+    """
+    text = values.astype(object).fillna("").astype(str).str.replace(",", "").str.strip()
+    negative = text.str.startswith("(") | text.str.endswith("CR")
+    text = text.str.strip("()").str.removesuffix("CR").str.strip()
+    amounts = pd.to_numeric(text.replace("", "0"), errors="coerce").to_numpy(float)
+    return np.where(negative.to_numpy(dtype=bool), -amounts, amounts)
+
+
+class Segment(NamedTuple):
+    """The rows of one table on a page, as :meth:`BankSettings.segments` splits them."""
+
+    frame: pd.DataFrame
+    finished: bool
+    balance: Optional[Union[str, float, int]]
+    opening: Optional[str] = None
+
+
+@dataclass
+class PageAnalysis:
+    """Everything the pipeline needs from one page's text, computed in one pass."""
+
+    text: PageText
+    keep: bool = False
+    titles: list = field(default_factory=list)
+    date: Optional[datetime] = None
+    trailing: bool = False
+    last_page: bool = False
+
 
 class BankSettings:
     """
@@ -23,10 +183,52 @@ class BankSettings:
     """
 
     PAGE_FILTER_REGEX = None
+    # Strings of which :meth:`page_filter` needs at least one before it can
+    # keep a page. Pages that show none of them are skipped without text
+    # extraction (see :mod:`bsutils.prefilter`); leave empty to read them all.
+    PAGE_MARKERS: Tuple[str, ...] = ()
+    # First cell of the transaction table's header row; anchors the part of
+    # the page Camelot reads (see :meth:`table_areas`).
+    TABLE_HEADER_REGEX = None
 
     TITLE_REGEX = None
     DATE_REGEX = None
 
+    # End-of-statement conditions (see :meth:`is_statement_end`).
+    STATEMENT_END_REGEX = None
+    TRAILING_PAGE_REGEX = None
+    END_WHEN_TITLES_COMPLETE = False
+
+    # Clean-up of this bank's payee and memo formatting, applied after
+    # :meth:`process` and before the user's rules (see :meth:`apply_rules`).
+    PAYEE_RULES: Tuple[Rule, ...] = ()
+
+    # Relative extraction cost per page, used to schedule large batches.
+    COST_PER_PAGE = 1.0
+
+    # What the balance on a table's closing row states, which lets
+    # :meth:`reconcile` check the extracted transactions against it: "total"
+    # for their sum, "owed" for a card balance and "held" for an account
+    # balance, both reached from the opening balance (see
+    # :meth:`opening_rows`). ``None`` when the table cannot be checked.
+    CLOSING_FIGURE: Optional[str] = None
+
+    _COMPILED_PATTERNS = (
+        "TITLE_REGEX",
+        "DATE_REGEX",
+        "STATEMENT_END_REGEX",
+        "TRAILING_PAGE_REGEX",
+        "TABLE_HEADER_REGEX",
+    )
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        # Compile pattern strings once per reader class rather than per page.
+        super().__init_subclass__(**kwargs)
+        for name in cls._COMPILED_PATTERNS:
+            pattern = cls.__dict__.get(name)
+            if isinstance(pattern, str):
+                setattr(cls, name, re.compile(pattern))
+
     def __init__(self) -> None:
         """
         Store default keyword arguments passed to :func:`camelot.read_pdf`.
@@ -40,6 +242,30 @@ class BankSettings:
             "flavor": "stream",
         }
 
+    def analyse_page(self, p: str, need_date: bool = True) -> PageAnalysis:
+        """
+        Run the page-level hooks once over the page text.
+
+        The pipeline calls this for every page and never re-scans the text:
+        the trailing-section check, :meth:`page_filter`, :meth:`extract_titles`,
+        :meth:`extract_date` (only while ``need_date``) and
+        :meth:`is_statement_end` all see the same :class:`PageText`, so hooks
+        can share its cached :attr:`PageText.compact` form.
+        """
+        if not isinstance(p, PageText):
+            p = PageText(p)
+        if self.is_trailing_page(p):
+            return PageAnalysis(text=p, trailing=True)
+        if not self.page_filter(p):
+            return PageAnalysis(text=p)
+        return PageAnalysis(
+            text=p,
+            keep=True,
+            titles=self.extract_titles(p),
+            date=self.extract_date(p) if need_date else None,
+            last_page=self.is_statement_end(p),
+        )
+
     def page_filter(self, p: str) -> bool:
         """
         Return ``True`` when the current PDF page should be processed.
@@ -59,8 +285,10 @@ class BankSettings:
         will apply that pattern. Most concrete readers override this method to
         build cleaner names (see :mod:`classes.bank_settings.dbs_acc`).
         """
+        if self.TITLE_REGEX is None:
+            return []
         find = re.findall(self.TITLE_REGEX, p)
-        return ["-".join(s) for s in find]
+        return ["-".join(s) if isinstance(s, tuple) else s for s in find]
 
     def extract_date(self, p: str) -> Optional[datetime]:
         """
@@ -70,7 +298,8 @@ class BankSettings:
         transaction years. Returning ``None`` tells the pipeline to fall back to
         other heuristics.
         """
-
+        if self.DATE_REGEX is None:
+            return None
         datestr = re.search(self.DATE_REGEX, p)
         if datestr:
             return pd.to_datetime(
@@ -78,6 +307,34 @@ class BankSettings:
             )
         return None
 
+    def is_trailing_page(self, p: str) -> bool:
+        """
+        Return ``True`` when this page starts the trailing section of the PDF.
+
+        Trailing pages (terms and conditions, rewards summaries, marketing)
+        never hold transactions, so the pipeline stops before reading this
+        page or any later one. Uses :data:`TRAILING_PAGE_REGEX` by default.
+        """
+        if self.TRAILING_PAGE_REGEX is not None:
+            return re.search(self.TRAILING_PAGE_REGEX, p) is not None
+        return False
+
+    def is_statement_end(self, p: str) -> bool:
+        """
+        Return ``True`` when this page is the last one holding transactions.
+
+        Typically a statement-wide closing row such as ``GRAND TOTAL``. The
+        page itself is still processed; later pages are not read. Uses
+        :data:`STATEMENT_END_REGEX` by default.
+
+        Readers whose first transaction page lists every account can set
+        :data:`END_WHEN_TITLES_COMPLETE` instead: the pipeline then stops as
+        soon as each title seen on that page has a completed table.
+        """
+        if self.STATEMENT_END_REGEX is not None:
+            return re.search(self.STATEMENT_END_REGEX, p) is not None
+        return False
+
     def reader_options(self, page: Optional[int] = None) -> CamelotOptions:
         """
         Provide the Camelot options for the current page.
@@ -89,27 +346,191 @@ class BankSettings:
         """
         return self._reader_options
 
+    def table_areas(self, p: str, page: Optional[int] = None) -> Optional[List[str]]:
+        """
+        Camelot ``table_areas`` for a kept page, or ``None`` to search it all.
+
+        Areas are ``"x1,y1,x2,y2"`` strings in PDF points, with ``(x1, y1)`` the
+        top-left corner. The default reads from the top of the highest text
+        chunk that fully matches :data:`TABLE_HEADER_REGEX` down to the bottom
+        of the page, so letterheads, logos and summary boxes above the table
+        never become rows. Rows above the first header are dropped anyway when
+        tables are split at :meth:`header_locator`. Override for fixed areas
+        per page type.
+        """
+        anchor = self.header_anchor(p)
+        if anchor is None or not p.width:
+            return None
+        return [f"0,{anchor.top:.1f},{p.width:.1f},0"]
+
+    def header_anchor(self, p: str) -> Optional[TextChunk]:
+        """The highest chunk that fully matches :data:`TABLE_HEADER_REGEX`."""
+        if self.TABLE_HEADER_REGEX is None or not isinstance(p, PageText):
+            return None
+        anchors = [
+            chunk for chunk in p.chunks if self.TABLE_HEADER_REGEX.fullmatch(chunk.text)
+        ]
+        return max(anchors, key=lambda chunk: chunk.top, default=None)
+
+    def layout_fingerprint(self, p: str) -> Optional[str]:
+        """
+        Identify the table layout of a page by where its header starts.
+
+        The fingerprint is the page width and the header anchor's position to
+        the nearest 10 points. Pages that share it share column boundaries;
+        ``None`` when the page has no header. It leaves out the rest of the
+        header row, whose chunks differ between pypdf and pdfminer text, so
+        layouts calibrated from one are found when parsing with the other.
+        """
+        anchor = self.header_anchor(p)
+        if anchor is None:
+            return None
+        return f"{p.width:.0f}/{round(anchor.x / 10) * 10}"
+
+    def column_spec(self) -> Optional[str]:
+        """The reader's own Camelot ``columns`` boundaries, if it sets them."""
+        columns = self._reader_options.get("columns")
+        return columns[0] if columns else None
+
+    def table_columns(self, p: str) -> Optional[List[str]]:
+        """
+        Calibrated Camelot ``columns`` for a kept page, or ``None`` to keep
+        those of :meth:`reader_options`.
+
+        ``balanceparser calibrate`` infers boundaries from sample statements
+        for each :meth:`layout_fingerprint` and caches them in the config
+        directory; here they are only looked up, so no page pays for
+        inferring them. The file is loaded once per reader instance, i.e.
+        once per statement, not once per page.
+        """
+        name = type(self).__name__
+        calibration = getattr(self, "_calibration", None)
+        if calibration is None:
+            calibration = self._calibration = load_calibration()
+        if not calibration.get(name):
+            return None
+        fingerprint = self.layout_fingerprint(p)
+        columns = fingerprint and calibrated_columns(name, fingerprint, calibration)
+        return [columns] if columns else None
+
+    def table_end_rows(self, df: pd.DataFrame) -> Optional[pd.Series]:
+        """
+        Mark the rows that close a table.
+
+        Return a series aligned with ``df`` holding the closing balance (see
+        :meth:`is_table_end`) on every such row and missing values elsewhere;
+        :func:`table_ends` builds one from a mask. Readers that return
+        ``None`` (the default) must override :meth:`is_table_end` instead,
+        which is then called once per table rather than once per page.
+        """
+        return None
+
     def is_table_end(self, df: pd.DataFrame) -> TableEnd:
         """
         Decide whether the current table is complete.
 
-        Subclasses **must** return a tuple ``(finished, balance)``:
+        Returns a tuple ``(finished, balance)``:
 
         - ``finished`` (bool): ``True`` when the current table has reached its
           end.
         - ``balance`` (str | float | int | None): closing balance extracted from
           the table, used to label the CSV; ``None`` if no balance is available.
+
+        The base implementation reads the first row marked by
+        :meth:`table_end_rows`.
+        """
+        ends = self.table_end_rows(df)
+        if ends is None:
+            raise NotImplementedError
+        ends = ends.dropna()
+        if len(ends):
+            return True, ends.iloc[0]
+        return False, 0
+
+    def opening_rows(self, df: pd.DataFrame) -> Optional[pd.Series]:
+        """
+        Mark the rows that state a table's opening balance.
+
+        Return a series aligned with ``df`` holding the balance on every such
+        row and missing values elsewhere, as :func:`table_ends` builds, or
+        ``None`` (the default) when tables carry none. Only used to
+        :meth:`reconcile` tables whose :data:`CLOSING_FIGURE` is a balance.
+        """
+        return None
+
+    def filtered_rows(self, df: pd.DataFrame) -> Optional[pd.Series]:
         """
-        raise NotImplementedError
+        Mark the rows that are not part of the transaction details.
+
+        Many readers drop running totals or empty spacer rows. Return a
+        boolean series aligned with ``df``, or ``None`` (the default) to keep
+        every row, or when :meth:`row_filter` is overridden instead.
+        """
+        return None
 
     def row_filter(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Drop the rows :meth:`filtered_rows` marks."""
+        if not len(df.columns):
+            return df
+        mask = self.filtered_rows(df)
+        return df if mask is None else df.loc[~mask]
+
+    def segments(self, df: pd.DataFrame, count: int = 1) -> List[Segment]:
         """
-        Drop rows that are not part of the transaction details.
+        Split one Camelot frame into table segments in a single pass.
 
-        Many readers remove running totals or empty spacer rows here. The base
-        implementation returns the dataframe unchanged.
+        Headers (:meth:`header_locator`), table ends (:meth:`table_end_rows`)
+        and filtered rows (:meth:`filtered_rows`) are located once over the
+        whole page. Each segment runs from one header to the next and carries
+        its end flag, balance, opening balance (:meth:`opening_rows`) and
+        kept rows, ready for :meth:`process`. Rows above the first header
+        belong to no table. Without a header mask the whole page is handed to
+        each of the ``count`` tables it may hold.
         """
-        return df
+        header = self.header_locator(df)
+        if isinstance(header, pd.Series):
+            starts = np.flatnonzero(header.fillna(False).to_numpy(dtype=bool))
+            stops = np.append(starts[1:], len(df))
+        else:
+            starts = np.zeros(count, dtype=int)
+            stops = np.full(count, len(df))
+        if not len(starts):
+            return []
+
+        ends = self.table_end_rows(df)
+        if ends is not None:
+            end_at = np.flatnonzero(ends.notna().to_numpy(dtype=bool))
+            balances = ends.to_numpy(dtype=object)
+        opens = self.opening_rows(df) if len(df.columns) else None
+        if opens is not None:
+            open_at = np.flatnonzero(opens.notna().to_numpy(dtype=bool))
+            openings = opens.to_numpy(dtype=object)
+        first = starts[0]
+        dropped = self.filtered_rows(df.iloc[first:]) if len(df.columns) else None
+        if dropped is not None:
+            keep = np.ones(len(df), dtype=bool)
+            keep[first:] = ~dropped.fillna(False).to_numpy(dtype=bool)
+
+        segments = []
+        for start, stop in zip(starts, stops):
+            frame = df.iloc[start:stop]
+            if ends is None:
+                finished, balance = self.is_table_end(frame)
+            else:
+                hit = np.searchsorted(end_at, start)
+                finished = bool(hit < len(end_at) and end_at[hit] < stop)
+                balance = balances[end_at[hit]] if finished else 0
+            opening = None
+            if opens is not None:
+                hit = np.searchsorted(open_at, start)
+                if hit < len(open_at) and open_at[hit] < stop:
+                    opening = openings[open_at[hit]]
+            if dropped is None:
+                frame = self.row_filter(frame)
+            else:
+                frame = frame[keep[start:stop]]
+            segments.append(Segment(frame, finished, balance, opening))
+        return segments
 
     def header_locator(self, df: pd.DataFrame) -> Optional[pd.Series]:
         """
@@ -135,3 +556,46 @@ class BankSettings:
               detected.
         """
         return df
+
+    def reconcile(self, table) -> Optional[bool]:
+        """
+        Check a completed :class:`ParsedTable` against its closing figure.
+
+        The transactions' net charge (outflows less inflows) must match the
+        table's ``balance`` to the cent: directly for a "total", from the
+        opening balance up for "owed" and down for "held" (see
+        :data:`CLOSING_FIGURE`). Returns ``None`` when the reader or the
+        table gives nothing to check against.
+        """
+        if self.CLOSING_FIGURE is None or table.balance in (None, 0, ""):
+            return None
+        closing = parse_amounts(pd.Series([table.balance]))[0]
+        opening = 0.0
+        if self.CLOSING_FIGURE != "total":
+            if table.opening is None:
+                return None
+            opening = parse_amounts(pd.Series([table.opening]))[0]
+        outflow = parse_amounts(table.frame["Outflow"])
+        inflow = parse_amounts(table.frame["Inflow"])
+        if not (np.isfinite(outflow).all() and np.isfinite(inflow).all()):
+            return False
+        charged = outflow.sum() - inflow.sum()
+        expected = {
+            "total": charged,
+            "owed": opening + charged,
+            "held": opening - charged,
+        }[self.CLOSING_FIGURE]
+        return bool(np.isfinite(closing) and round(expected - closing, 2) == 0)
+
+    def apply_rules(self, df: StatementFrame) -> StatementFrame:
+        """
+        Normalise the payees and memos of a processed table.
+
+        Applies :attr:`PAYEE_RULES`, then the user's rules from the config
+        directory (see :mod:`classes.bank_settings.rules`). Each rule set is
+        compiled into one pattern per column and matched once per distinct
+        value, so subclasses declare rules rather than overriding this.
+        """
+        for rules in reader_rules(type(self).__name__, self.PAYEE_RULES):
+            df = rules.apply(df)
+        return df
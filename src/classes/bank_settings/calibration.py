@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from bsutils.commit import write_file
+from bsutils.logger import logger
+
+from config import get_columns_path
+
+
+@lru_cache(maxsize=None)
+def _read_calibration(path: Path, mtime: int) -> dict:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning("Ignoring column calibration in {}: {}", path, e)
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_calibration(path: Optional[Path] = None) -> dict:
+    """
+    Calibrated column boundaries, ``{reader: {fingerprint: entry}}``, read
+    from ``BalanceParser_columns.json`` in the config directory unless
+    ``path`` is given. The file is re-read only when it changes.
+    """
+    path = Path(path) if path is not None else get_columns_path()
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return {}
+    return _read_calibration(path, mtime)
+
+
+def calibrated_columns(
+    reader: str, fingerprint: str, calibration: Optional[dict] = None
+) -> Optional[str]:
+    """
+    The boundaries calibrated for ``reader`` on this page layout, if any,
+    looked up in ``calibration`` when given instead of the cached file.
+    """
+    if calibration is None:
+        calibration = load_calibration()
+    entry = calibration.get(reader, {}).get(fingerprint)
+    return entry.get("columns") if isinstance(entry, dict) else None
+
+
+def save_calibration(
+    entries: dict, path: Optional[Path] = None, durability: str = "file"
+) -> Path:
+    """
+    Merge ``{reader: {fingerprint: entry}}`` into the calibration file,
+    replacing it whole so a crash never leaves it truncated.
+    """
+    path = Path(path) if path is not None else get_columns_path()
+    data = {reader: dict(layouts) for reader, layouts in load_calibration(path).items()}
+    for reader, layouts in entries.items():
+        data.setdefault(reader, {}).update(layouts)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    text = json.dumps(data, indent=2, sort_keys=True)
+    return write_file(path, lambda tmp: tmp.write_text(text), durability)
@@ -2,13 +2,30 @@ import re
 
 import pandas as pd
 
-from const import DATE_FORMATTER
-from .base import BankSettings, timedelta
+from .base import (
+    BankSettings,
+    Rule,
+    compact_text,
+    format_dates,
+    table_ends,
+    timedelta,
+)
 
 
 class CITI_CC(BankSettings):
     TITLE_REGEX = r"\n(CITI.+CARD)(\d+)-\w+"
     DATE_REGEX = r"Date:(.+\d+,\d{4})"
+    # The grand total closes the last card table of the statement.
+    STATEMENT_END_REGEX = r"GRAND TOTAL"
+    PAGE_MARKERS = ("CARD",)
+    TABLE_HEADER_REGEX = r"DATE"
+    # The grand total is the new balance, carried on from the previous one.
+    CLOSING_FIGURE = "owed"
+    # Payment-app prefixes move from the payee to the memo.
+    PAYEE_RULES = tuple(
+        Rule(word, match="prefix", strip=True, memo=word)
+        for word in ("AMAZE*", "PAYALL")
+    )
 
     def __init__(self):
         super().__init__()
@@ -20,7 +37,7 @@ class CITI_CC(BankSettings):
 
     @staticmethod
     def page_filter(p):
-        p = p.replace(" ", "")
+        p = compact_text(p)
         return (
             "CARD" in p and "Detailedtransactionscanbefoundonthefollowingpages" not in p
         )
@@ -33,55 +50,47 @@ class CITI_CC(BankSettings):
         ]
 
     def extract_date(self, p):
-        datestr = re.search(self.DATE_REGEX, p.replace(" ", ""))
+        datestr = re.search(self.DATE_REGEX, compact_text(p))
         if datestr:
             date = pd.to_datetime(datestr[1], format="%B%d,%Y")
             return date - timedelta(weeks=4)
         return None
 
-    def is_table_end(self, df):
-        mask = df.iloc[:, 1].str.startswith("GRAND TOTAL")
-        if mask.any():
-            total = df.loc[mask, 2].iloc[0].replace(",", "")
-            return (True, total)
-        return (False, 0)
+    def table_end_rows(self, df):
+        return table_ends(df, df.iloc[:, 1].str.startswith("GRAND TOTAL"), 2)
+
+    def opening_rows(self, df):
+        return table_ends(
+            df, df.iloc[:, 1].str.startswith("BALANCE PREVIOUS STATEMENT"), 2
+        )
 
     def header_locator(self, df):
         return (df.iloc[:, 0] == "DATE") & (df.iloc[:, 1] == "Description".upper())
 
-    def row_filter(self, df):
-        if not len(df.columns):
-            return df
-        mask = df[1].str.contains(
+    def filtered_rows(self, df):
+        return df[1].str.contains(
             r"(?:SUB-TOTAL|TRANSACTIONS FOR CITI|BALANCE PREVIOUS STATEMENT)"
         )
-        return df.loc[~mask]
 
     def process(self, df, date):
         if len(df.columns) < 3 or len(df) <= 1:
             return df
-        df = df.reset_index()
-        Date = pd.to_datetime(
-            df[0].str.replace("$", f" {date.year}", regex=True),
-            format="%d %b %Y",
-            errors="coerce",
-        ).apply(lambda x: x.replace(year=date.year - 1) if x > date else x)
-
-        df.loc[:, 0] = Date.dt.strftime(DATE_FORMATTER)
-        df = df.loc[~Date.isna()]
-
-        mask = df[2].str.endswith(")")
-        df["Inflow"] = ""
-        df.loc[mask, "Inflow"] = df.loc[mask, 2].str.strip("()")
-        df.loc[mask, 2] = "0"
-
-        df["Memo"] = ""
-        cleaned_words = ["AMAZE*", "PAYALL"]
-        for word in cleaned_words:
-            word_mask = df[1].str.startswith(word)
-            df.loc[word_mask, 1] = (
-                df.loc[word_mask, 1].str.replace(word, "").str.strip(" -")
-            )
-            df.loc[word_mask, "Memo"] = word
-
-        return df.rename(columns={0: "Date", 1: "Payee", 2: "Outflow"})
+        statement_date = pd.Timestamp(date)
+        dates = pd.to_datetime(
+            df[0] + f" {statement_date.year}", format="%d %b %Y", errors="coerce"
+        )
+        dates = dates.mask(dates > statement_date, dates - pd.DateOffset(years=1))
+        dated = dates.notna()
+        df, dates = df[dated], dates[dated]
+
+        amount = df[2]
+        credit = amount.str.endswith(")")
+        return pd.DataFrame(
+            {
+                "Date": format_dates(dates),
+                "Payee": df[1],
+                "Memo": "",
+                "Outflow": amount.mask(credit, "0"),
+                "Inflow": amount.str.strip("()").where(credit, ""),
+            }
+        )
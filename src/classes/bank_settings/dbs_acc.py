@@ -4,12 +4,22 @@ import pandas as pd
 
 from bsutils.logger import logger
 from const import DATE_FORMATTER
-from .base import BankSettings
+from .base import (
+    BankSettings,
+    describe_rows,
+    empty_statement,
+    join_columns,
+    join_lines,
+    table_ends,
+)
 import re
 
 
 class DBS_ACC(BankSettings):
     PAGE_FILTER_REGEX = r"Transaction Details"
+    PAGE_MARKERS = (PAGE_FILTER_REGEX,)
+    TABLE_HEADER_REGEX = r"Date"
+    CLOSING_FIGURE = "held"
     TITLE_REGEX = re.compile(
         r"(?P<account>(?P<name>.+Account)\s+Account No\. (?P<number>[\d+-]+))"
         r"|CURRENCY:\s*(?P<currency>.+)"
@@ -61,20 +71,20 @@ class DBS_ACC(BankSettings):
 
         return ["-".join(s).replace("SINGAPORE DOLLAR", "").strip("-") for s in results]
 
-    def is_table_end(self, df):
+    def table_end_rows(self, df):
         # crcid = df[df[0].str.contains("CURRENCY:")].index
-        mask = df.iloc[:, 1].str.startswith("Total Balance")
-        if mask.any():
-            return True, df.loc[mask, 4].iloc[0].replace(",", "")
         # return ((len(crcid) and df.loc[crcid[0], 0] != "CURRENCY: SINGAPORE DOLLAR"), 0)
-        return False, 0
+        return table_ends(df, df.iloc[:, 1].str.startswith("Total Balance"), 4)
+
+    def opening_rows(self, df):
+        return table_ends(
+            df, df.iloc[:, 1].str.startswith("Balance Brought Forward"), 4
+        )
 
     def header_locator(self, df):
         return (df.iloc[:, 0] == "Date") & (df.iloc[:, 1] == "Description")
 
-    def row_filter(self, df):
-        if not len(df.columns):
-            return df
+    def filtered_rows(self, df):
         # crcid = df[df[0].str.contains("CURRENCY:")].index
         # if len(crcid) and df.loc[crcid[0], 0] != "CURRENCY: SINGAPORE DOLLAR":
         #    return pd.DataFrame(index=df.index)
@@ -82,45 +92,47 @@ class DBS_ACC(BankSettings):
             r"(?:Balance Brought Forward|Balance Carried Forward)"
         )
         if mask.any():
-            summary = (
-                df.loc[mask, [1, 4]]
-                .to_string(index=False, header=False)
-                .replace("\n", "; ")
-                .strip()
+            logger.opt(lazy=True).success(
+                "\tBalance summary rows retained: {}",
+                lambda: describe_rows(df.loc[mask, [1, 4]]),
             )
-            logger.success(f"\tBalance summary rows retained: {summary}")
-        return df.loc[~mask]
+        return mask
 
     def process(self, df, date):
         if len(df.columns) < 4 or len(df) <= 1:
-            return pd.DataFrame(columns=["Date", "Payee", "Memo", "Outflow", "Inflow"])
-        df = df.reset_index()
-        Date = pd.to_datetime(df[0], errors="coerce", format=DATE_FORMATTER)
-        mask = ~Date.isna()
-        id_series = df["index"].where(mask)
-        df["id"] = id_series.ffill().astype("Int64")
-        if df.loc[~mask][[0, 2, 3, 4]].any(axis=1).any():
-            rm_entries = df[~mask][df[~mask][[0, 2, 3, 4]].any(axis=1)]
-            df = df.drop(rm_entries.index)
+            return empty_statement()
+        dated = pd.to_datetime(df[0], errors="coerce", format=DATE_FORMATTER).notna()
+        # Undated rows may only continue the description above them.
+        stray = ~dated & df[[0, 2, 3, 4]].ne("").any(axis=1)
+        if stray.any():
+            df, dated = df[~stray], dated[~stray]
             if len(df) <= 1:
-                return pd.DataFrame(
-                    columns=["Date", "Payee", "Memo", "Outflow", "Inflow"]
-                )
-        description = (
-            df.groupby("id")[1]
-            .apply(lambda x: x.str.cat(sep="\n").strip("\n"))
-            .str.split("\n", expand=True)
-        )
-        mask = description[1].str.startswith("VALUE DATE", na=False)
-        description[1].loc[mask] = None
-        description[1] = description[1].fillna(description[0]).infer_objects(copy=False)
-        mask = description[1].str.endswith(":", na=False)
+                return empty_statement()
+        if not dated.any():
+            return empty_statement()
+        entry = dated.cumsum()
+        in_entry = entry > 0
+        df, dated, entry = df[in_entry], dated[in_entry], entry[in_entry]
+
+        description = join_lines(df[1], entry)
+        if 1 not in description.columns:
+            description[1] = None
+        value_date = description[1].str.startswith("VALUE DATE", na=False)
+        description[1] = description[1].mask(value_date).fillna(description[0])
         if description.shape[1] > 2:
-            description.loc[mask, 1] = description.loc[mask, 1].str.cat(
-                description.loc[mask, 2], na_rep="", sep=" "
+            label = description[1].str.endswith(":", na=False)
+            description[1] = description[1].mask(
+                label, description[1].str.cat(description[2], na_rep="", sep=" ")
             )
-            description.loc[mask, 2] = None
-        df = df.groupby("id").sum()
-        df["Payee"] = description.pop(1)
-        df["Memo"] = description.fillna("").agg(" - ".join, axis=1).str.strip(" -")
-        return df.rename(columns={0: "Date", 2: "Outflow", 3: "Inflow"})
+            description[2] = description[2].mask(label)
+
+        payee = description.pop(1)
+        return pd.DataFrame(
+            {
+                "Date": df.loc[dated, 0],
+                "Payee": payee,
+                "Memo": join_columns(description).str.strip(" -"),
+                "Outflow": df.loc[dated, 2],
+                "Inflow": df.loc[dated, 3],
+            }
+        )
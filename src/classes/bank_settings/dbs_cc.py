@@ -3,8 +3,7 @@ from datetime import datetime
 
 import pandas as pd
 
-from const import DATE_FORMATTER
-from .base import BankSettings
+from .base import BankSettings, empty_statement, format_dates, table_ends
 
 
 class DBS_CC(BankSettings):
@@ -19,36 +18,35 @@ class DBS_CC(BankSettings):
             "row_tol": 5,
         }
 
-    def is_table_end(self, df):
-        return (df.iloc[:, 1].str.startswith("TOTAL").any(), 0)
+    def table_end_rows(self, df):
+        return table_ends(df, df.iloc[:, 1].str.startswith("TOTAL"))
 
     def header_locator(self, df):
         return None
 
     def process(self, df, date):
         today_year = datetime.today().year
-        Date = pd.to_datetime(
-            df[0].str.replace("$", f" {today_year}", regex=True),
-            format="%d %b %Y",
-            errors="coerce",
-        ).dt.strftime(DATE_FORMATTER)
-
-        df[0] = Date
-        df = df.loc[~Date.isna()].copy()
-        if df.empty:
-            return pd.DataFrame(columns=["Date", "Payee", "Memo", "Outflow", "Inflow"])
-
-        mask = df[2].fillna("").str.endswith("CR")
-        df["Inflow"] = ""
-        if mask.any():
-            inflow_values = (
-                df.loc[mask, 2]
-                .astype(str)
-                .str.replace("CR", "", regex=False)
-                .str.replace(",", "", regex=False)
-                .str.strip()
-            )
-            df.loc[mask, "Inflow"] = inflow_values
-            df.loc[mask, 2] = 0
-        df["Memo"] = ""
-        return df.rename(columns={0: "Date", 2: "Outflow", 1: "Payee"})
+        dates = pd.to_datetime(
+            df[0] + f" {today_year}", format="%d %b %Y", errors="coerce"
+        )
+        dated = dates.notna()
+        if not dated.any():
+            return empty_statement()
+        df, dates = df[dated], dates[dated]
+
+        amount = df[2]
+        credit = amount.fillna("").str.endswith("CR")
+        inflow = (
+            amount.str.replace("CR", "", regex=False)
+            .str.replace(",", "", regex=False)
+            .str.strip()
+        )
+        return pd.DataFrame(
+            {
+                "Date": format_dates(dates),
+                "Payee": df[1],
+                "Memo": "",
+                "Outflow": amount.mask(credit, "0"),
+                "Inflow": inflow.where(credit, ""),
+            }
+        )
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from bsutils.logger import logger
+
+from config import get_rules_path
+
+MATCH_KINDS = ("prefix", "substring", "regex")
+RULE_COLUMNS = ("Payee", "Memo")
+
+# Distinct raw values remembered per column before the cache starts over.
+_CACHE_LIMIT = 1 << 17
+_UNSEEN = object()
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    One payee or memo normalisation rule.
+
+    ``pattern`` is looked for in ``column`` as a literal prefix, a literal
+    substring or a regular expression (``match``). When found, ``strip``
+    removes every occurrence of the pattern (anywhere in the text, for a
+    prefix too) and the spaces and dashes left at either end, ``payee``
+    replaces the payee and ``memo`` goes in front of the memo, which is where
+    categories belong in the output schema. Rules without ``readers`` apply
+    to every reader.
+    """
+
+    pattern: str
+    match: str = "substring"
+    column: str = "Payee"
+    strip: bool = False
+    payee: Optional[str] = None
+    memo: Optional[str] = None
+    ignore_case: bool = False
+    readers: Tuple[str, ...] = ()
+
+    def __post_init__(self) -> None:
+        if self.match not in MATCH_KINDS:
+            raise ValueError(f"Unknown match '{self.match}'; expected {MATCH_KINDS}")
+        if self.column not in RULE_COLUMNS:
+            raise ValueError(f"Unknown column '{self.column}'; expected {RULE_COLUMNS}")
+        readers = (self.readers,) if isinstance(self.readers, str) else self.readers
+        object.__setattr__(self, "readers", tuple(readers))
+        re.compile(self.expression)
+
+    @property
+    def expression(self) -> str:
+        body = self.strip_expression
+        return f"^{body}" if self.match == "prefix" else body
+
+    @property
+    def strip_expression(self) -> str:
+        """The pattern without its prefix anchor: what ``strip`` removes."""
+        body = self.pattern if self.match == "regex" else re.escape(self.pattern)
+        return f"(?i:{body})" if self.ignore_case else f"(?:{body})"
+
+    def applies_to(self, reader: str) -> bool:
+        return not self.readers or reader in self.readers
+
+
+class Outcome(NamedTuple):
+    """What a rule does to one value; ``None`` fields leave things unchanged."""
+
+    text: Optional[str]
+    payee: Optional[str]
+    memo: Optional[str]
+
+
+class RuleSet:
+    """
+    Rules of one set, applied in the order they are listed.
+
+    Each rule sees the value as the rules before it left it: a rule that
+    strips a prefix exposes the next prefix to the following rule, and a
+    later rule's ``payee`` or ``memo`` replaces an earlier one's. The rules
+    of a column are also compiled into one alternation that screens values
+    first, so a value no rule matches is searched once however many rules
+    there are. A value the screen lets through is then searched by each
+    rule in turn: a named group per rule would tell which rules matched,
+    but capturing groups stop ``re`` from optimising the alternation and
+    cost far more than they save (``benchmarks/rules.py``). Outcomes are
+    cached by raw value, and a frame is matched per
+    distinct value, so a payee that recurs across rows and statements is
+    only worked out the first time.
+    """
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        self.rules = tuple(rules)
+        self._patterns = {}
+        self._compiled = {}
+        self._cache = {column: {} for column in RULE_COLUMNS}
+        for column in RULE_COLUMNS:
+            chosen = [rule for rule in self.rules if rule.column == column]
+            if not chosen:
+                continue
+            self._patterns[column] = re.compile(
+                "|".join(rule.expression for rule in chosen)
+            )
+            self._compiled[column] = [
+                (rule, re.compile(rule.expression), re.compile(rule.strip_expression))
+                for rule in chosen
+            ]
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def outcome(self, column: str, value) -> Optional[Outcome]:
+        """The matching rules' combined effect on ``value``, or ``None``."""
+        return self.outcomes(column, [value])[0]
+
+    def outcomes(self, column: str, values: list) -> list:
+        """:meth:`outcome` of each of ``values``, searching only uncached ones."""
+        cache = self._cache[column]
+        screen = self._patterns[column].search
+        results = []
+        for value in values:
+            result = cache.get(value, _UNSEEN)
+            if result is _UNSEEN:
+                result = None
+                if isinstance(value, str) and screen(value) is not None:
+                    result = self._run(column, value)
+                if len(cache) >= _CACHE_LIMIT:
+                    cache.clear()
+                cache[value] = result
+            results.append(result)
+        return results
+
+    def _run(self, column: str, value: str) -> Optional[Outcome]:
+        text, payee, memo = value, None, None
+        for rule, pattern, stripper in self._compiled[column]:
+            if pattern.search(text) is None:
+                continue
+            if rule.strip:
+                text = stripper.sub("", text).strip(" -")
+            if rule.payee is not None:
+                if column == "Payee":
+                    text = rule.payee
+                else:
+                    payee = rule.payee
+            if rule.memo is not None:
+                memo = rule.memo
+        if text == value and payee is None and memo is None:
+            return None
+        return Outcome(None if text == value else text, payee, memo)
+
+    def apply(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Return ``frame`` with the rules applied to its Payee and Memo columns."""
+        if not self.rules or frame.empty:
+            return frame
+        values = {
+            column: frame[column].to_numpy(dtype=object, copy=True)
+            for column in RULE_COLUMNS
+            if column in frame
+        }
+        tags = np.full(len(frame), None, dtype=object)
+        changed = False
+        for column in self._patterns:
+            if column not in values:
+                continue
+            codes, uniques = pd.factorize(frame[column])
+            outcomes = self.outcomes(column, uniques.tolist())
+            if not any(outcomes):
+                continue
+            changed = True
+            # Code -1 marks missing values, which no rule matches.
+            outcomes.append(None)
+            for field, target in enumerate((column, "Payee", "Memo")):
+                update = np.array(
+                    [None if o is None else o[field] for o in outcomes], dtype=object
+                )[codes]
+                rows = np.flatnonzero(pd.notna(update))
+                if target == "Memo" and field == 2:
+                    tags[rows] = _prefix(tags[rows], update[rows])
+                elif target in values:
+                    values[target][rows] = update[rows]
+        if not changed:
+            return frame
+        rows = np.flatnonzero(pd.notna(tags))
+        if len(rows) and "Memo" in values:
+            values["Memo"][rows] = _prefix(values["Memo"][rows], tags[rows])
+        return frame.assign(
+            **{
+                column: pd.array(column_values, dtype=frame[column].dtype)
+                for column, column_values in values.items()
+            }
+        )
+
+
+def _prefix(text: np.ndarray, tag: np.ndarray) -> np.ndarray:
+    """``tag - text`` per element, or just ``tag`` where ``text`` is empty."""
+    joined = tag.copy()
+    rows = np.flatnonzero(pd.notna(text) & (text != ""))
+    joined[rows] = tag[rows] + " - " + text[rows]
+    return joined
+
+
+@lru_cache(maxsize=None)
+def _read_rules(path: Path, mtime: int) -> Tuple[Rule, ...]:
+    try:
+        entries = json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning("Ignoring payee rules in {}: {}", path, e)
+        return ()
+    if not isinstance(entries, list):
+        logger.warning("Ignoring payee rules in {}: expected a list of rules", path)
+        return ()
+    rules = []
+    for number, entry in enumerate(entries, start=1):
+        try:
+            rules.append(Rule(**entry))
+        except (TypeError, ValueError, re.error) as e:
+            logger.warning("Skipping payee rule {} in {}: {}", number, path, e)
+    logger.debug("Loaded {} payee rules from {}", len(rules), path)
+    return tuple(rules)
+
+
+def load_rules(path: Optional[Path] = None) -> Tuple[Rule, ...]:
+    """
+    The user's rules, read from ``BalanceParser_rules.json`` in the config
+    directory unless ``path`` is given. The file is a JSON list of
+    :class:`Rule` fields and is re-read only when it changes.
+    """
+    path = Path(path) if path is not None else get_rules_path()
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return ()
+    return _read_rules(path, mtime)
+
+
+@lru_cache(maxsize=None)
+def _rule_set(rules: Tuple[Rule, ...]) -> RuleSet:
+    return RuleSet(rules)
+
+
+def reader_rules(reader: str, builtin: Tuple[Rule, ...]) -> Tuple[RuleSet, ...]:
+    """
+    The rule sets ``reader`` applies, in order: its own clean-up rules, then
+    the user's rules, which therefore see the cleaned payee. Compiled sets
+    are shared by every reader instance, along with their caches.
+    """
+    user = tuple(rule for rule in load_rules() if rule.applies_to(reader))
+    return tuple(_rule_set(rules) for rules in (builtin, user) if rules)
@@ -1,11 +1,81 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union
+
 import pandas as pd
+from bsutils.commit import write_file
 from bsutils.logger import logger
-from datetime import datetime
 
-from const import DATE_FORMATTER
+from const import DATE_FORMATTER, OUTPUT_COLUMNS
 from config import load_active_config
 
 
+@dataclass
+class ParsedTable:
+    """A completed account table held in memory."""
+
+    account: str
+    start: datetime
+    end: datetime
+    balance: Optional[Union[str, float, int]]
+    frame: pd.DataFrame
+    # Balance the table opens with, when the reader reports it.
+    opening: Optional[str] = None
+
+    @property
+    def period(self) -> str:
+        return self.start.strftime("%d%b%Y") + "-" + self.end.strftime("%d%b%Y")
+
+    def save(
+        self, csv_dir: Optional[Path] = None, durability: Optional[str] = None
+    ) -> Path:
+        """
+        Write the table as CSV into ``csv_dir`` (configured directory by default).
+
+        The CSV is written under a temporary name and renamed into place once
+        complete (see :func:`bsutils.commit.write_file`). It replaces an
+        earlier export of the same account and period, but tables of unknown
+        accounts get a numbered name rather than replace one another.
+        """
+        logger.success(f"\tStatement period: {self.period}")
+        account = self.account
+        unknown = account == "Unknown"
+        if unknown:
+            account += f"_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        filename = f"{account}_{self.period}".replace(" ", "_")
+        if self.balance:
+            filename += f"_balance={self.balance}.csv"
+        if csv_dir is None or durability is None:
+            config = load_active_config()
+            csv_dir = csv_dir or config.csv_dir
+            durability = durability or config.durability
+        filename = write_file(
+            (csv_dir / filename).with_suffix(".csv"),
+            lambda tmp: self.frame.to_csv(tmp, index=False),
+            durability,
+            replace=not unknown,
+        )
+        logger.success(f"Exported CSV to {filename}\n" + "=" * 80)
+        return filename
+
+
+class ParsedStatement(list):
+    """Completed tables of one statement, plus what is needed to archive it."""
+
+    def __init__(self, *args, reader=None, date=None, titles=()):
+        super().__init__(*args)
+        self.reader = reader
+        self.date = date
+        self.accounts = []
+        # Accounts titled on the first kept page, which identify the statement.
+        self.titles = list(titles)
+        # CSVs that already cover the statement when it was not read.
+        self.covered = []
+
+
 class StatementTables(list):
     def __init__(self, *args, account="", date=datetime.today()):
         super().__init__(*args)
@@ -13,37 +83,33 @@ class StatementTables(list):
         self.date = date
         self.is_complete = False
         self.balance = 0
+        self.opening = None
 
     def set_account(self, account):
         self.account = account
 
-    def save(self):
-        if self.is_complete:
-            statement = (pd.concat(self, axis=0))[
-                ["Date", "Payee", "Memo", "Outflow", "Inflow"]
-            ]
-            if len(statement) <= 0:
-                logger.info(
-                    "Skipping CSV export because no transaction rows were extracted."
-                )
-                return
-            Date = pd.to_datetime(
-                statement.Date, errors="coerce", format=DATE_FORMATTER
+    def to_parsed(self) -> Optional[ParsedTable]:
+        """Concatenate the collected frames into a :class:`ParsedTable`."""
+        if not self.is_complete:
+            return None
+        statement = (pd.concat(self, axis=0))[OUTPUT_COLUMNS]
+        if len(statement) <= 0:
+            logger.info(
+                "Skipping CSV export because no transaction rows were extracted."
             )
+            return None
+        Date = pd.to_datetime(statement.Date, errors="coerce", format=DATE_FORMATTER)
+        return ParsedTable(
+            account=self.account,
+            start=Date.min(),
+            end=Date.max(),
+            balance=self.balance,
+            frame=statement,
+            opening=self.opening,
+        )
 
-            periods = (
-                Date.min().strftime("%d%b%Y") + "-" + Date.max().strftime("%d%b%Y")
-            )
-            logger.success(f"\tStatement period: {periods}")
-            if self.account == "Unknown":
-                self.account += f"_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            filename = f"{self.account}_{periods}".replace(" ", "_")
-            if self.balance:
-                filename += f"_balance={self.balance}.csv"
-            csv_dir = load_active_config().csv_dir
-            filename = (csv_dir / filename).with_suffix(".csv")
-            statement.to_csv(filename, index=False)
-            logger.success(f"Exported CSV to {filename}\n" + "=" * 80)
-            return filename
-        else:
+    def save(self):
+        table = self.to_parsed()
+        if table is None:
             return
+        return table.save()
@@ -2,14 +2,26 @@ from __future__ import annotations
 
 import argparse
 import logging
+import os
 import sys
+import time
 import traceback
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, Optional, Union
 
+from bsutils.commit import sync_directories
+from bsutils.cpuprofile import PROFILE_FORMATS
+from bsutils.isolation import Limits, can_measure_rss, run_isolated
 from bsutils.logger import configure_logger
+from bsutils.profiling import MemoryProfiler, summary_lines
 from bsutils.reader import read_statement
+from bsutils.scheduler import Progress, discover, plan
+from bsutils.source import BUFFER_MODES, ensure_shared_memory_tracker
+from bsutils.stream import STREAM_FORMATS, TableStream
+from classes.statement_settings import SETTING_DICT
+from config import load_active_config
 from loguru import logger
 
 try:
@@ -43,13 +55,309 @@ def build_parser() -> argparse.ArgumentParser:
         default="*Statement*.pdf",
         help="Glob pattern for selecting PDFs (default: *Statement*.pdf).",
     )
-    path_parser.add_argument(
+    verbosity = path_parser.add_mutually_exclusive_group()
+    verbosity.add_argument(
         "--debug",
         action="store_true",
         help="Enable verbose logging to stdout and statement.log.",
     )
+    verbosity.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Production profile: only warnings and errors are logged.",
+    )
+    path_parser.add_argument(
+        "-r",
+        "--recursive",
+        action="store_true",
+        help="Also search subdirectories for matching PDFs.",
+    )
+    path_parser.add_argument(
+        "--dir",
+        dest="extra_dirs",
+        type=Path,
+        action="append",
+        default=[],
+        metavar="DIRECTORY",
+        help="Additional directory to scan (repeatable).",
+    )
+    path_parser.add_argument(
+        "--manifest",
+        type=Path,
+        help="Text file listing statement PDFs, one path per line.",
+    )
+    path_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "Statements parsed in parallel processes, most expensive first "
+            "(default: 1)."
+        ),
+    )
+    path_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for table extraction (default: 1, in-process).",
+    )
+    path_parser.add_argument(
+        "--buffer",
+        choices=BUFFER_MODES,
+        default="file",
+        help=(
+            "How each PDF is held while parsing: 'file' lets every stage open "
+            "the file, 'memory' reads it once, 'mmap' maps it read-only "
+            "(default: file). Workers always share one buffer per PDF."
+        ),
+    )
+    path_parser.add_argument(
+        "--single-pass",
+        action="store_true",
+        help=(
+            "Lay out each page once with pdfminer and reuse it for the page "
+            "text and the table search, instead of reading it with pypdf and "
+            "again with Camelot. Ignored with --workers."
+        ),
+    )
+    path_parser.add_argument(
+        "--tiered",
+        action="store_true",
+        help=(
+            "Cut tables straight from each page's text lines and re-read with "
+            "Camelot only those that do not reconcile with their closing "
+            "balance or total. Implies --single-pass; ignored with --workers."
+        ),
+    )
+    path_parser.add_argument(
+        "--force",
+        action="store_true",
+        help=(
+            "Parse statements even when their accounts and month already have "
+            "CSVs in the output directory."
+        ),
+    )
+    path_parser.add_argument(
+        "-o",
+        "--output",
+        metavar="TARGET",
+        help=(
+            "Stream every transaction to TARGET ('-' for stdout) as each table "
+            "completes, tagged with its source PDF, account and period, "
+            "instead of writing CSVs. Runs one statement at a time."
+        ),
+    )
+    path_parser.add_argument(
+        "--format",
+        choices=STREAM_FORMATS,
+        default="ndjson",
+        help=(
+            "Format of --output: one JSON object per line, or an Arrow IPC "
+            "stream with a record batch per table (needs pyarrow; "
+            "default: ndjson)."
+        ),
+    )
+    path_parser.add_argument(
+        "--memory-profile",
+        nargs="?",
+        const="tracemalloc",
+        choices=("tracemalloc", "rss"),
+        help=(
+            "Report peak memory per file and stage with tracemalloc ('rss' "
+            "also samples resident memory). Reports are written as JSON next "
+            "to the CSVs."
+        ),
+    )
+    isolation = path_parser.add_argument_group(
+        "isolation",
+        "Setting any limit parses each file in its own process; files that "
+        "break a limit or crash are killed and moved to the quarantine folder.",
+    )
+    isolation.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Wall-clock limit per statement.",
+    )
+    isolation.add_argument(
+        "--page-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Limit for a single page stage (e.g. one Camelot call).",
+    )
+    isolation.add_argument(
+        "--max-rss",
+        type=int,
+        metavar="MB",
+        help="Resident memory limit per statement process, in MiB.",
+    )
+    isolation.add_argument(
+        "--quarantine",
+        type=Path,
+        metavar="DIRECTORY",
+        help="Where offending PDFs are moved (default: <csv dir>/quarantine).",
+    )
     path_parser.set_defaults(func=_handle_path)
 
+    scan_parser = subparsers.add_parser(
+        "scan",
+        help="Inventory statement PDFs without extracting tables.",
+    )
+    scan_parser.add_argument(
+        "directory",
+        type=Path,
+        help="Directory containing statement PDFs.",
+    )
+    scan_parser.add_argument(
+        "pattern",
+        nargs="?",
+        default="*Statement*.pdf",
+        help="Glob pattern for selecting PDFs (default: *Statement*.pdf).",
+    )
+    scan_parser.add_argument(
+        "-r",
+        "--recursive",
+        action="store_true",
+        help="Also search subdirectories for matching PDFs.",
+    )
+    scan_parser.add_argument(
+        "--format",
+        choices=("csv", "json"),
+        default="csv",
+        help="Inventory format (default: csv).",
+    )
+    scan_parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="Write the inventory to this file instead of stdout.",
+    )
+    scan_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Processes used for scanning (default: all CPUs).",
+    )
+    scan_parser.set_defaults(func=_handle_scan)
+
+    profile_parser = subparsers.add_parser(
+        "profile",
+        help="Profile the pipeline on one statement and write a flame graph.",
+    )
+    profile_parser.add_argument(
+        "file",
+        type=Path,
+        help="Statement PDF to profile. It is not archived and no CSV is kept.",
+    )
+    profile_parser.add_argument(
+        "--reader",
+        choices=[reader.__name__ for _, reader in SETTING_DICT],
+        help="Use this reader instead of detecting one from the first page.",
+    )
+    profile_parser.add_argument(
+        "--format",
+        choices=PROFILE_FORMATS,
+        default="speedscope",
+        help=(
+            "'pstats' for cProfile tools (snakeviz, pstats), 'speedscope' for "
+            "https://www.speedscope.app, 'collapsed' for flamegraph.pl "
+            "(default: speedscope)."
+        ),
+    )
+    profile_parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="Profile file to write (default: <pdf name>.prof/.speedscope.json/.folded).",
+    )
+    profile_parser.add_argument(
+        "--single-pass",
+        action="store_true",
+        help="Profile the single-pass layout path (see 'parse --single-pass').",
+    )
+    profile_parser.add_argument(
+        "--tiered",
+        action="store_true",
+        help="Profile tiered extraction (see 'parse --tiered').",
+    )
+    profile_parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Show debug logs while profiling.",
+    )
+    profile_parser.set_defaults(func=_handle_profile)
+
+    calibrate_parser = subparsers.add_parser(
+        "calibrate",
+        help="Infer each reader's table column boundaries from sample statements.",
+    )
+    calibrate_parser.add_argument(
+        "directory",
+        type=Path,
+        help="Directory containing sample statement PDFs.",
+    )
+    calibrate_parser.add_argument(
+        "pattern",
+        nargs="?",
+        default="*Statement*.pdf",
+        help="Glob pattern for selecting PDFs (default: *Statement*.pdf).",
+    )
+    calibrate_parser.add_argument(
+        "-r",
+        "--recursive",
+        action="store_true",
+        help="Also search subdirectories for matching PDFs.",
+    )
+    calibrate_parser.add_argument(
+        "--reader",
+        choices=[reader.__name__ for _, reader in SETTING_DICT],
+        help="Use this reader instead of detecting one from each first page.",
+    )
+    calibrate_parser.add_argument(
+        "--sample",
+        type=int,
+        default=20,
+        metavar="PAGES",
+        help="Pages sampled per reader and page layout (default: 20).",
+    )
+    calibrate_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show the inferred boundaries without saving them.",
+    )
+    calibrate_parser.set_defaults(func=_handle_calibrate)
+
+    archive_parser = subparsers.add_parser(
+        "archive",
+        help="List, extract or import PDFs in the content-addressed archive store.",
+    )
+    archive_commands = archive_parser.add_subparsers(
+        dest="archive_command", required=True
+    )
+    archive_commands.add_parser("list", help="List archived statements by name.")
+    extract_parser = archive_commands.add_parser(
+        "extract", help="Write an archived statement back out as a PDF."
+    )
+    extract_parser.add_argument("name", help="Archive name, as shown by 'list'.")
+    extract_parser.add_argument(
+        "target",
+        nargs="?",
+        type=Path,
+        default=Path.cwd(),
+        help="File or directory to write to (default: current directory).",
+    )
+    import_parser = archive_commands.add_parser(
+        "import",
+        help="Move PDFs already archived as named files into the store.",
+    )
+    import_parser.add_argument(
+        "pattern",
+        nargs="?",
+        default="*.pdf",
+        help="Glob pattern for PDFs in the archive directory (default: *.pdf).",
+    )
+    archive_parser.set_defaults(func=_handle_archive)
+
     config_parser = subparsers.add_parser(
         "config",
         help="Manage BalanceParser configuration (show, set, delete).",
@@ -65,28 +373,371 @@ def build_parser() -> argparse.ArgumentParser:
 
 
 def _handle_path(args: argparse.Namespace) -> int:
-    configure_logger(args.debug)
-    directory = args.directory.expanduser().resolve()
+    stdout = args.output == "-"
+    configure_logger(
+        args.debug, quiet=args.quiet, stream=sys.stderr if stdout else None
+    )
+    if args.max_rss and not can_measure_rss():
+        logger.error(
+            "--max-rss cannot be enforced: resident memory is not measurable "
+            "on this platform without psutil (pip install psutil)."
+        )
+        return 1
+    directories = [args.directory, *args.extra_dirs]
+    directories = [d.expanduser().resolve() for d in directories]
     logging.getLogger("pypdf").setLevel(logging.ERROR)
-    process_statements(directory, args.pattern)
+    if args.output is None:
+        _process_paths(args, directories)
+        return 0
+    target = sys.stdout.buffer if stdout else open(args.output, "wb")
+    try:
+        stream = TableStream(args.format, target)
+    except ImportError as e:
+        logger.error(str(e))
+        if not stdout:
+            target.close()
+        return 1
+    try:
+        _process_paths(args, directories, stream)
+        stream.close()
+    except BrokenPipeError:
+        # The consumer went away. Point stdout at devnull so the interpreter
+        # does not fail again flushing it on exit.
+        logger.warning("Output closed after {} tables; stopping.", stream.tables)
+        if stdout:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if not stdout:
+            target.close()
+    logger.success(
+        "Streamed {} transactions from {} tables", stream.records, stream.tables
+    )
     return 0
 
 
-def process_statements(directory: Path, pattern: str = "*.pdf") -> None:
-    """Process every statement in ``directory`` that matches ``pattern``."""
-    if not directory.exists() or not directory.is_dir():
-        logger.error(f"Directory missing or not a folder: {directory}")
-        return
-    file_list = list(directory.glob(pattern))
+def _process_paths(
+    args: argparse.Namespace, directories: list, stream: Optional[TableStream] = None
+) -> None:
+    process_statements(
+        directories,
+        args.pattern,
+        workers=args.workers,
+        buffer=args.buffer,
+        single_pass=args.single_pass,
+        tiered=args.tiered,
+        force=args.force,
+        memory_profile=args.memory_profile,
+        recursive=args.recursive,
+        manifest=args.manifest,
+        jobs=args.jobs,
+        limits=Limits(
+            file_timeout=args.timeout,
+            page_timeout=args.page_timeout,
+            max_rss=args.max_rss * 2**20 if args.max_rss else None,
+        ),
+        quarantine_dir=args.quarantine,
+        stream=stream,
+    )
+
+
+def process_statements(
+    directory: Union[Path, Iterable[Path]],
+    pattern: str = "*.pdf",
+    workers: int = 1,
+    buffer: str = "file",
+    single_pass: bool = False,
+    tiered: bool = False,
+    force: bool = False,
+    memory_profile: Optional[str] = None,
+    recursive: bool = False,
+    manifest: Optional[Path] = None,
+    jobs: int = 1,
+    limits: Optional[Limits] = None,
+    quarantine_dir: Optional[Path] = None,
+    stream: Optional[TableStream] = None,
+) -> None:
+    """
+    Process every statement in ``directory`` that matches ``pattern``.
+
+    ``directory`` may also be several directories; ``manifest`` adds files
+    listed one per line. With ``jobs`` above one, files are estimated up
+    front and dispatched most expensive first, ``jobs`` at a time; a serial
+    run keeps discovery order. With ``limits``, every file runs in
+    its own process and offenders are quarantined (see
+    :func:`bsutils.isolation.run_isolated`). Statements already exported
+    are skipped unless ``force`` is set, and ``tiered`` reads tables from
+    text lines first (see :func:`read_statement`). With a ``stream``, tables
+    are written to it instead of CSVs, one statement at a time.
+
+    Outputs are renamed into place as they complete, so every job can share
+    the output directories without locking. With the ``full`` durability
+    level, those directories are synced once when the run ends.
+    """
+    directories = [directory] if isinstance(directory, Path) else list(directory)
+    file_list = discover(directories, pattern, recursive=recursive, manifest=manifest)
     if not file_list:
-        logger.warning(f"No files matched pattern '{pattern}' in {directory}")
         return
-    for file in file_list:
-        logger.info(f"Processing statement: {file}")
+    isolated = limits is not None and limits.enabled
+    if stream is not None and jobs > 1:
+        logger.warning("--jobs is ignored when streaming with --output.")
+        jobs = 1
+    if stream is not None and isolated:
+        logger.warning("Resource limits are ignored when streaming with --output.")
+        isolated = False
+    if jobs > 1 and workers > 1:
+        logger.warning("--workers is ignored when --jobs runs files in parallel.")
+        workers = 1
+    if isolated and workers > 1:
+        logger.warning("--workers is ignored when resource limits are set.")
+        workers = 1
+    if single_pass and workers > 1:
+        logger.warning("--single-pass is ignored when --workers extracts tables.")
+    if tiered and workers > 1:
+        logger.warning("--tiered is ignored when --workers extracts tables.")
+    started = time.time_ns()
+    executor = None
+    if workers > 1:
+        ensure_shared_memory_tracker()
+        executor = ProcessPoolExecutor(max_workers=workers)
+    reports = []
+    try:
+        if isolated:
+            costs = plan(file_list, estimate=jobs > 1)
+            progress = Progress(costs)
+            reports = run_isolated(
+                costs,
+                _process_file,
+                (None, buffer, memory_profile, single_pass, force, tiered),
+                limits,
+                quarantine_dir or load_active_config().csv_dir / "quarantine",
+                jobs=jobs,
+                on_done=lambda cost: logger.success(progress.complete(cost)),
+            )
+        elif jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                costs = plan(file_list, pool)
+                progress = Progress(costs)
+                futures = {
+                    pool.submit(
+                        _process_file,
+                        c.path,
+                        None,
+                        buffer,
+                        memory_profile,
+                        single_pass,
+                        force,
+                        tiered,
+                    ): c
+                    for c in costs
+                }
+                for future in as_completed(futures):
+                    reports.append(future.result())
+                    logger.success(progress.complete(futures[future]))
+        else:
+            # One file at a time: order changes nothing, so skip estimation.
+            costs = plan(file_list, estimate=False)
+            progress = Progress(costs)
+            for cost in costs:
+                reports.append(
+                    _process_file(
+                        cost.path,
+                        executor,
+                        buffer,
+                        memory_profile,
+                        single_pass,
+                        force,
+                        tiered,
+                        stream,
+                    )
+                )
+                logger.success(progress.complete(cost))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        _sync_outputs(started, quarantine_dir)
+    reports = [report for report in reports if report]
+    if reports:
+        logger.success("Memory profile (heaviest first):")
+        for line in summary_lines(reports):
+            logger.success("\t{}", line)
+
+
+def _sync_outputs(started: int, *extra_dirs: Optional[Path]) -> None:
+    config = load_active_config()
+    if config.durability != "full":
+        return
+    synced = sync_directories([config.csv_dir, config.pdf_dir, *extra_dirs], started)
+    logger.debug("Synced {} output directories", synced)
+
+
+def _process_file(
+    file: Path,
+    executor,
+    buffer: str,
+    memory_profile: Optional[str] = None,
+    single_pass: bool = False,
+    force: bool = False,
+    tiered: bool = False,
+    stream: Optional[TableStream] = None,
+) -> Optional[dict]:
+    logger.info("Processing statement: {}", file)
+    options = (single_pass, force, tiered, stream)
+    if not memory_profile:
+        _read_statement_safely(file, executor, buffer, *options)
+        return None
+    profiler = MemoryProfiler(rss=memory_profile == "rss")
+    with profiler.track(file) as report:
+        _read_statement_safely(file, executor, buffer, *options)
+    target = profiler.write_report(report, load_active_config().csv_dir)
+    logger.info("Memory report written to {}", target)
+    return report
+
+
+def _read_statement_safely(
+    file: Path,
+    executor,
+    buffer: str,
+    single_pass: bool = False,
+    force: bool = False,
+    tiered: bool = False,
+    stream: Optional[TableStream] = None,
+) -> None:
+    try:
+        read_statement(
+            file,
+            executor=executor,
+            buffer=buffer,
+            single_pass=single_pass,
+            force=force,
+            tiered=tiered,
+            stream=stream,
+        )
+    except BrokenPipeError:
+        raise
+    except Exception as exc:  # pragma: no cover - diagnostic path
+        logger.error(f"Failed to process '{file}': {exc}\n{traceback.format_exc()}")
+
+
+def _handle_scan(args: argparse.Namespace) -> int:
+    from bsutils.scan import log_summary, scan, write_inventory
+
+    configure_logger(stream=sys.stderr)
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+    directory = args.directory.expanduser().resolve()
+    files = discover([directory], args.pattern, recursive=args.recursive)
+    rows = scan(files, jobs=args.jobs)
+    if args.output is None:
+        write_inventory(rows, args.format)
+    else:
+        with open(args.output, "w", newline="", encoding="utf-8") as stream:
+            write_inventory(rows, args.format, stream)
+    log_summary(rows)
+    return 0
+
+
+def _handle_profile(args: argparse.Namespace) -> int:
+    from tempfile import TemporaryDirectory
+
+    from bsutils.cpuprofile import CpuProfile, default_target
+    from bsutils.reader import parse_statement
+
+    configure_logger(args.debug)
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+    file = args.file.expanduser().resolve()
+    readers = {reader.__name__: reader for _, reader in SETTING_DICT}
+    reader = readers[args.reader]() if args.reader else None
+    passwords = load_active_config().passwords.values()
+    profile = CpuProfile(args.format)
+    # Tables are saved into a scratch directory so the save stage is measured.
+    with TemporaryDirectory() as scratch, profile.run():
+        statement = parse_statement(
+            file,
+            reader,
+            on_table=lambda table: table.save(Path(scratch)),
+            passwords=passwords,
+            single_pass=args.single_pass,
+            tiered=args.tiered,
+        )
+    if statement.reader is None:
+        logger.warning(
+            "No reader processed '{}'; the profile covers detection only.", file.name
+        )
+    target = profile.write(args.output or default_target(file, args.format), file.name)
+    logger.success("Profile of '{}' written to {}", file.name, target)
+    for line in profile.summary_lines():
+        logger.success("\t{}", line)
+    return 0
+
+
+def _handle_calibrate(args: argparse.Namespace) -> int:
+    from bsutils.calibrate import calibrate
+    from classes.bank_settings.calibration import save_calibration
+
+    configure_logger()
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+    directory = args.directory.expanduser().resolve()
+    files = discover([directory], args.pattern, recursive=args.recursive)
+    readers = {reader.__name__: reader for _, reader in SETTING_DICT}
+    config = load_active_config()
+    entries = calibrate(
+        files,
+        readers.get(args.reader),
+        sample=args.sample,
+        passwords=config.passwords.values(),
+    )
+    if not entries:
+        logger.warning("No column boundaries could be calibrated.")
+        return 1
+    for reader, layouts in entries.items():
+        for fingerprint, entry in layouts.items():
+            logger.success(
+                "{} [{}]: columns {} from {} pages",
+                reader,
+                fingerprint,
+                entry["columns"],
+                entry["pages"],
+            )
+    if not args.dry_run:
+        target = save_calibration(entries, durability=config.durability)
+        logger.success("Calibration saved to {}", target)
+    return 0
+
+
+def _handle_archive(args: argparse.Namespace) -> int:
+    from bsutils.archive import ArchiveStore
+
+    configure_logger()
+    config = load_active_config()
+    if config.pdf_dir is None:
+        logger.error("No PDF archive directory is configured.")
+        return 1
+    store = ArchiveStore(config.pdf_dir, config.compression, config.durability)
+    if args.archive_command == "list":
+        for name, entry in sorted(store.entries.items()):
+            print(f"{name}\t{entry['size']}\t{entry['sha256'][:12]}")
+        return 0
+    if args.archive_command == "extract":
         try:
-            read_statement(file)
-        except Exception as exc:  # pragma: no cover - diagnostic path
-            logger.error(f"Failed to process '{file}': {exc}\n{traceback.format_exc()}")
+            target = store.extract(args.name, args.target.expanduser())
+        except KeyError as e:
+            logger.error(e.args[0])
+            return 1
+        logger.success("Extracted '{}' to {}", args.name, target)
+        return 0
+    started = time.time_ns()
+    files = sorted(config.pdf_dir.glob(args.pattern))
+    for file in files:
+        name = store.add(file, file.name)
+        logger.info("Archived '{}' as '{}'", file.name, name)
+    _sync_outputs(started)
+    logger.success(
+        "Imported {} PDFs; the store now holds {} names in {} blobs",
+        len(files),
+        len(store.entries),
+        len({entry["sha256"] for entry in store.entries.values()}),
+    )
+    return 0
 
 
 def _handle_config(args: argparse.Namespace) -> int:
@@ -103,7 +754,7 @@ def main(argv: Optional[Iterable[str]] = None) -> int:
     else:
         raw_args = list(argv)
 
-    command_names = {"parse", "config"}
+    command_names = {"parse", "scan", "profile", "calibrate", "archive", "config"}
     if not raw_args:
         raw_args = ["parse"]
     elif raw_args[0] in command_names or raw_args[0].startswith("-"):
@@ -4,11 +4,26 @@ import argparse
 import json
 import os
 import platform
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Optional, Union
 
 CONFIG_FILENAME = "BalanceParser_config.json"
+RULES_FILENAME = "BalanceParser_rules.json"
+COLUMNS_FILENAME = "BalanceParser_columns.json"
+
+# "files" moves each processed PDF to its archive name; "store" keeps one
+# content-addressed copy per distinct PDF (see ``bsutils.archive``).
+ARCHIVE_MODES = ("files", "store")
+COMPRESSIONS = ("none", "gzip", "bz2", "xz")
+# How hard outputs are pushed to disk before they count as written (see
+# ``bsutils.commit``):
+#   "file"  fsyncs each file before it is renamed into place, so a crash never
+#           leaves a truncated file under its final name;
+#   "none"  only renames, which readers see atomically but a crash may undo;
+#   "full"  also fsyncs the output directories, once at the end of each run,
+#           so the new names themselves survive a crash.
+DURABILITY_LEVELS = ("file", "none", "full")
 
 
 Pathish = Union[str, Path]
@@ -18,18 +33,39 @@ Pathish = Union[str, Path]
 class AppConfig:
     csv_dir: Path
     pdf_dir: Path
+    # Statement passwords keyed by a label such as a reader name ("UOB_CC")
+    # or an account. Labels only name the entries: the reader and account are
+    # read from the page text, which is not readable before decryption, so
+    # every stored password is tried on each encrypted PDF.
+    passwords: dict = field(default_factory=dict)
+    archive: str = "files"
+    compression: str = "none"
+    durability: str = "file"
 
     def to_dict(self) -> dict:
-        return {
+        data = {
             "csv_dir": str(self.csv_dir.expanduser()),
             "pdf_dir": str(self.pdf_dir.expanduser()),
         }
+        if self.passwords:
+            data["passwords"] = dict(self.passwords)
+        if self.archive != "files":
+            data["archive"] = self.archive
+        if self.compression != "none":
+            data["compression"] = self.compression
+        if self.durability != "file":
+            data["durability"] = self.durability
+        return data
 
     @classmethod
     def from_dict(cls, data: dict, fallback: "AppConfig") -> "AppConfig":
         return cls(
             csv_dir=_coerce_path(data.get("csv_dir"), fallback.csv_dir),
             pdf_dir=_coerce_path(data.get("pdf_dir"), fallback.pdf_dir),
+            passwords=dict(data.get("passwords") or {}),
+            archive=_coerce_choice(data.get("archive"), ARCHIVE_MODES),
+            compression=_coerce_choice(data.get("compression"), COMPRESSIONS),
+            durability=_coerce_choice(data.get("durability"), DURABILITY_LEVELS),
         )
 
 
@@ -44,6 +80,10 @@ def _coerce_path(value: Optional[Pathish], fallback: Path) -> Path:
         return fallback
 
 
+def _coerce_choice(value: Optional[str], choices: tuple) -> str:
+    return value if value in choices else choices[0]
+
+
 def get_default_config(base_dir: Optional[Path] = None) -> AppConfig:
     root = base_dir or Path.cwd()
     default_dir = root / "BankStatement"
@@ -65,6 +105,14 @@ def get_config_path() -> Path:
     return get_user_config_dir() / CONFIG_FILENAME
 
 
+def get_rules_path() -> Path:
+    return get_user_config_dir() / RULES_FILENAME
+
+
+def get_columns_path() -> Path:
+    return get_user_config_dir() / COLUMNS_FILENAME
+
+
 def load_config() -> AppConfig:
     fallback = get_default_config()
     config_path = get_config_path()
@@ -82,6 +130,9 @@ def save_config(config: AppConfig) -> None:
     config_dir.mkdir(parents=True, exist_ok=True)
     config_path = config_dir / CONFIG_FILENAME
     config_path.write_text(json.dumps(config.to_dict(), indent=2))
+    if config.passwords:
+        # The file now holds statement passwords: keep it private.
+        config_path.chmod(0o600)
 
 
 def delete_config() -> None:
@@ -101,16 +152,29 @@ def ensure_paths(config: AppConfig) -> AppConfig:
         pdf_dir = pdf_dir.expanduser()
         pdf_dir.mkdir(parents=True, exist_ok=True)
 
-    return AppConfig(csv_dir=csv_dir, pdf_dir=pdf_dir)
+    return replace(config, csv_dir=csv_dir, pdf_dir=pdf_dir)
 
 
 def update_config(
-    csv_dir: Optional[Pathish] = None, pdf_dir: Optional[Pathish] = None
+    csv_dir: Optional[Pathish] = None,
+    pdf_dir: Optional[Pathish] = None,
+    passwords: Optional[dict] = None,
+    remove_passwords: Optional[list] = None,
+    archive: Optional[str] = None,
+    compression: Optional[str] = None,
+    durability: Optional[str] = None,
 ) -> AppConfig:
     current = load_config()
+    stored = {**current.passwords, **(passwords or {})}
+    for key in remove_passwords or []:
+        stored.pop(key, None)
     updated = AppConfig(
         csv_dir=_coerce_path(csv_dir, current.csv_dir),
         pdf_dir=_coerce_path(pdf_dir, current.pdf_dir),
+        passwords=stored,
+        archive=archive or current.archive,
+        compression=compression or current.compression,
+        durability=durability or current.durability,
     )
     save_config(updated)
     return ensure_paths(updated)
@@ -129,6 +193,9 @@ def _config_as_lines(config: AppConfig) -> str:
         [
             f"CSV directory: {config.csv_dir}",
             f"PDF directory: {config.pdf_dir}",
+            f"PDF archive: {config.archive} (compression: {config.compression})",
+            f"Durability: {config.durability}",
+            f"Passwords for: {', '.join(config.passwords) or '<none>'}",
         ]
     )
 
@@ -145,10 +212,36 @@ def _command_show(args: argparse.Namespace) -> int:
     return 0
 
 
+def _parse_password(value: str) -> tuple:
+    key, sep, password = value.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError("expected LABEL=PASSWORD")
+    return key, password
+
+
 def _command_set(args: argparse.Namespace) -> int:
-    if args.csv is None and args.pdf is None:
-        raise SystemExit("Nothing to update: provide --csv and/or --pdf.")
-    config = update_config(csv_dir=args.csv, pdf_dir=args.pdf)
+    if (
+        args.csv is None
+        and args.pdf is None
+        and not args.password
+        and not args.remove_password
+        and args.archive is None
+        and args.compression is None
+        and args.durability is None
+    ):
+        raise SystemExit(
+            "Nothing to update: provide --csv, --pdf, --password, "
+            "--remove-password, --archive, --compression and/or --durability."
+        )
+    config = update_config(
+        csv_dir=args.csv,
+        pdf_dir=args.pdf,
+        passwords=dict(args.password),
+        remove_passwords=args.remove_password,
+        archive=args.archive,
+        compression=args.compression,
+        durability=args.durability,
+    )
     print(f"Updated configuration at {get_config_path()}")
     print(_config_as_lines(config))
     return 0
@@ -174,10 +267,48 @@ def build_parser() -> argparse.ArgumentParser:
     show_parser.set_defaults(func=_command_show)
 
     set_parser = subparsers.add_parser(
-        "set", help="Update directories for CSV/PDF outputs."
+        "set", help="Update directories for CSV/PDF outputs and statement passwords."
     )
     set_parser.add_argument("--csv", type=str, help="Directory for exported CSV files.")
     set_parser.add_argument("--pdf", type=str, help="Directory for archived PDFs.")
+    set_parser.add_argument(
+        "--password",
+        type=_parse_password,
+        action="append",
+        default=[],
+        metavar="LABEL=PASSWORD",
+        help=(
+            "Store a statement password under a label (repeatable). The label "
+            "only names the entry: every stored password is tried on each "
+            "encrypted PDF."
+        ),
+    )
+    set_parser.add_argument(
+        "--remove-password",
+        action="append",
+        default=[],
+        metavar="LABEL",
+        help="Forget the password stored under LABEL (repeatable).",
+    )
+    set_parser.add_argument(
+        "--archive",
+        choices=ARCHIVE_MODES,
+        help="Archive PDFs as named files or in a content-addressed store.",
+    )
+    set_parser.add_argument(
+        "--compression",
+        choices=COMPRESSIONS,
+        help="Compress PDFs added to the archive store.",
+    )
+    set_parser.add_argument(
+        "--durability",
+        choices=DURABILITY_LEVELS,
+        help=(
+            "Fsync nothing ('none'), each output file before it is renamed "
+            "into place ('file', the default), or also the output directories "
+            "at the end of each run ('full')."
+        ),
+    )
     set_parser.set_defaults(func=_command_set)
 
     delete_parser = subparsers.add_parser(
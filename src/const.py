@@ -1 +1,2 @@
 DATE_FORMATTER = "%d/%m/%Y"
+OUTPUT_COLUMNS = ["Date", "Payee", "Memo", "Outflow", "Inflow"]
@@ -0,0 +1,14 @@
+import json
+import tempfile
+from pathlib import Path
+
+import config
+
+# Keep the suite away from the user's configuration and output folders:
+# bsutils.reader loads the configuration, and creates its folders, on import.
+_SCRATCH = Path(tempfile.mkdtemp(prefix="balanceparser-tests-"))
+(_SCRATCH / "config").mkdir()
+(_SCRATCH / "config" / config.CONFIG_FILENAME).write_text(
+    json.dumps({"csv_dir": str(_SCRATCH / "csv"), "pdf_dir": str(_SCRATCH / "pdf")})
+)
+config.get_user_config_dir = lambda: _SCRATCH / "config"
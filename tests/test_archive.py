@@ -0,0 +1,104 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import pytest
+
+from bsutils.archive import COMPRESSORS, INDEX_FILENAME, ArchiveStore
+
+# Not a real PDF: the store only looks at the bytes.
+STATEMENT = b"%PDF-1.4\n" + bytes(range(256)) * 64 + b"\n%%EOF\n"
+OTHER = b"%PDF-1.4\nanother statement\n%%EOF\n"
+
+
+def pdf(folder, name, content=STATEMENT):
+    path = folder / name
+    path.write_bytes(content)
+    return path
+
+
+@pytest.fixture
+def inbox(tmp_path):
+    folder = tmp_path / "inbox"
+    folder.mkdir()
+    return folder
+
+
+@pytest.mark.parametrize("compression", COMPRESSORS)
+def test_add_dedup_extract(tmp_path, inbox, compression):
+    store = ArchiveStore(tmp_path / "archive", compression)
+
+    first = store.add(pdf(inbox, "a.pdf"), "CITI_CC_card_202409.pdf")
+    again = store.add(pdf(inbox, "b.pdf"), "CITI_CC_card_202409.pdf")
+    copy = store.add(pdf(inbox, "c.pdf"), "UOB_CC_card_202409.pdf")
+    other = store.add(pdf(inbox, "d.pdf", OTHER), "CITI_CC_card_202409.pdf")
+
+    assert first == again == "CITI_CC_card_202409.pdf"
+    assert copy == "UOB_CC_card_202409.pdf"
+    assert other == "CITI_CC_card_202409_2.pdf"
+    assert not list(inbox.iterdir())
+    suffix = COMPRESSORS[compression][1]
+    blobs = sorted((tmp_path / "archive" / "blobs").rglob("*.pdf*"))
+    assert len(blobs) == 2
+    assert all(blob.name.endswith(".pdf" + suffix) for blob in blobs)
+
+    reopened = ArchiveStore(tmp_path / "archive", compression)
+    assert sorted(reopened.entries) == [first, other, copy]
+    out = tmp_path / "out"
+    out.mkdir()
+    assert reopened.extract(first, out).read_bytes() == STATEMENT
+    assert reopened.extract(copy, out / "copy.pdf").read_bytes() == STATEMENT
+    with reopened.open(other) as fh:
+        assert fh.read() == OTHER
+
+
+def test_blobs_are_shared_across_compressors(tmp_path, inbox):
+    ArchiveStore(tmp_path, "gzip").add(pdf(inbox, "a.pdf"), "first.pdf")
+    store = ArchiveStore(tmp_path, "xz")
+
+    store.add(pdf(inbox, "b.pdf"), "second.pdf")
+
+    assert store.entries["second.pdf"]["blob"].endswith(".pdf.gz")
+    with store.open("second.pdf") as fh:
+        assert fh.read() == STATEMENT
+
+
+def test_extract_unknown_name(tmp_path):
+    with pytest.raises(KeyError):
+        ArchiveStore(tmp_path).extract("missing.pdf", tmp_path)
+
+
+@pytest.mark.parametrize("compression", COMPRESSORS)
+def test_pdf_is_kept_until_indexed(tmp_path, inbox, compression, monkeypatch):
+    store = ArchiveStore(tmp_path / "archive", compression)
+    file = pdf(inbox, "a.pdf")
+
+    def fail():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_write", fail)
+    with pytest.raises(OSError):
+        store.add(file, "statement.pdf")
+
+    assert file.read_bytes() == STATEMENT
+    assert not (tmp_path / "archive" / INDEX_FILENAME).exists()
+    monkeypatch.undo()
+    assert store.add(file, "statement.pdf") == "statement.pdf"
+    assert store.extract("statement.pdf", tmp_path).read_bytes() == STATEMENT
+
+
+def add_all(root, files):
+    store = ArchiveStore(root)
+    return [store.add(file, file.name) for file in files]
+
+
+def test_concurrent_runs_keep_every_name(tmp_path, inbox):
+    files = [pdf(inbox, f"{n:03}.pdf", OTHER + b"%d" % n) for n in range(200)]
+    with ProcessPoolExecutor(8) as pool:
+        added = pool.map(
+            add_all, repeat(tmp_path / "archive"), [files[i::8] for i in range(8)]
+        )
+        added = [name for names in added for name in names]
+
+    store = ArchiveStore(tmp_path / "archive")
+    assert sorted(added) == sorted(store.entries) == [f.name for f in files]
+    assert not list(inbox.iterdir())
@@ -0,0 +1,53 @@
+import warnings
+from pathlib import Path
+
+import pytest
+from test_reader import HEADER, citi_statement
+
+from bsutils.calibrate import calibrate
+from bsutils.reader import parse_statement
+from classes.bank_settings import CITI_CC, calibration
+from classes.bank_settings.calibration import load_calibration, save_calibration
+
+
+def test_calibrated_columns_are_used_by_default(tmp_path, monkeypatch):
+    # A taller last label sits within the header row in pdfminer's text but
+    # not in pypdf's, so the two must not disagree on the page's layout.
+    file = tmp_path / "CITI_Statement.pdf"
+    file.write_bytes(citi_statement([*HEADER[:2], (*HEADER[2], 12.5)]))
+    monkeypatch.setattr(calibration, "get_columns_path", lambda: tmp_path / "c.json")
+    used = []
+    table_columns = CITI_CC.table_columns
+
+    def spy(self, p):
+        used.append(table_columns(self, p))
+        return used[-1]
+
+    monkeypatch.setattr(CITI_CC, "table_columns", spy)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        entries = calibrate([file])
+        save_calibration(entries)
+        tables = parse_statement(file)
+
+    [entry] = load_calibration()["CITI_CC"].values()
+    assert entry["columns"] != CITI_CC().column_spec()
+    assert used == [[entry["columns"]]]
+    assert [len(table.frame) for table in tables] == [5]
+
+
+def test_failed_save_keeps_the_previous_file(tmp_path, monkeypatch):
+    path = tmp_path / "columns.json"
+    save_calibration({"CITI_CC": {"595/40": {"columns": "80,470"}}}, path)
+    write_text = Path.write_text
+
+    def crash(self, text):
+        write_text(self, text[: len(text) // 2])
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Path, "write_text", crash)
+    with pytest.raises(OSError):
+        save_calibration({"CITI_CC": {"595/50": {"columns": "90,480"}}}, path)
+
+    assert load_calibration(path) == {"CITI_CC": {"595/40": {"columns": "80,470"}}}
+    assert [file.name for file in tmp_path.iterdir()] == ["columns.json"]
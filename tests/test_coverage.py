@@ -0,0 +1,140 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+
+import pandas as pd
+import pytest
+
+from bsutils.coverage import INDEX_FILENAME, CoverageIndex
+from classes.bank_settings import PageAnalysis
+from classes.statement_tables import ParsedTable
+from const import OUTPUT_COLUMNS
+
+STATEMENT_DATE = datetime(2024, 3, 5)
+
+
+class CardReader:
+    pass
+
+
+class OtherReader:
+    pass
+
+
+def analysis(*titles, date=STATEMENT_DATE):
+    return PageAnalysis(text=None, keep=True, titles=list(titles), date=date)
+
+
+def export(csv_dir, *accounts):
+    """Save one table per account, as ``read_statement`` does."""
+    saved = []
+    for account in accounts:
+        table = ParsedTable(
+            account=account,
+            start=datetime(2024, 2, 6),
+            end=datetime(2024, 3, 5),
+            balance="10.00",
+            frame=pd.DataFrame(columns=OUTPUT_COLUMNS),
+        )
+        saved.append((table, table.save(csv_dir, "none")))
+    return saved
+
+
+@pytest.fixture
+def index(tmp_path):
+    return CoverageIndex(tmp_path)
+
+
+def test_lookup_finds_recorded_statement(index, tmp_path):
+    saved = export(tmp_path, "CARD 1", "CARD 2")
+    index.record(CardReader(), STATEMENT_DATE, saved, ["CARD 1", "CARD 2"])
+
+    covered = index.lookup(CardReader(), analysis("CARD 2", "CARD 1"))
+
+    assert covered == [path.name for _, path in saved]
+
+
+def test_account_on_a_later_page_must_be_exported(index, tmp_path):
+    # A combined statement: CARD 1 on the first page, SAVINGS further on.
+    saved = export(tmp_path, "CARD 1", "SAVINGS")
+    index.record(CardReader(), STATEMENT_DATE, saved[:1], ["CARD 1"])
+    index.record(CardReader(), STATEMENT_DATE, saved, ["CARD 1"])
+    assert index.lookup(CardReader(), analysis("CARD 1"))
+
+    saved[1][1].unlink()
+    assert index.lookup(CardReader(), analysis("CARD 1")) == []
+
+
+def test_statement_with_other_first_page_is_not_covered(index, tmp_path):
+    # CARD 1 was only exported as a later account of another statement.
+    index.record(
+        CardReader(), STATEMENT_DATE, export(tmp_path, "SAVINGS", "CARD 1"), ["SAVINGS"]
+    )
+
+    assert index.lookup(CardReader(), analysis("CARD 1")) == []
+
+
+def test_lookup_needs_same_reader_and_month(index, tmp_path):
+    index.record(CardReader(), STATEMENT_DATE, export(tmp_path, "CARD 1"), ["CARD 1"])
+
+    assert index.lookup(OtherReader(), analysis("CARD 1")) == []
+    assert (
+        index.lookup(CardReader(), analysis("CARD 1", date=datetime(2024, 4, 5))) == []
+    )
+    assert index.lookup(CardReader(), analysis("CARD 1", date=None)) == []
+
+
+def test_record_merges_with_other_jobs(tmp_path):
+    first, second = CoverageIndex(tmp_path), CoverageIndex(tmp_path)
+    first.record(CardReader(), STATEMENT_DATE, export(tmp_path, "CARD 1"), ["CARD 1"])
+    second.record(CardReader(), STATEMENT_DATE, export(tmp_path, "CARD 2"), ["CARD 2"])
+
+    index = CoverageIndex(tmp_path)
+    assert index.lookup(CardReader(), analysis("CARD 1"))
+    assert index.lookup(CardReader(), analysis("CARD 2"))
+
+
+def test_rebuild_from_csv_names(index, tmp_path):
+    saved = export(tmp_path, "CARD 1")
+    index.record(CardReader(), STATEMENT_DATE, saved, ["CARD 1"])
+    (tmp_path / INDEX_FILENAME).unlink()
+
+    rebuilt = CoverageIndex(tmp_path)
+
+    assert rebuilt.entries["CARD_1/202403"]["files"] == [saved[0][1].name]
+    assert (tmp_path / INDEX_FILENAME).exists()
+    # Which statement the CSV came from is lost: it is parsed once more.
+    assert rebuilt.lookup(CardReader(), analysis("CARD 1")) == []
+
+
+def test_rebuild_keeps_known_statements_and_readers(index, tmp_path):
+    saved = export(tmp_path, "CARD 1")
+    index.record(CardReader(), STATEMENT_DATE, saved, ["CARD 1"])
+
+    index.rebuild()
+
+    assert index.entries["CARD_1/202403"]["reader"] == "CardReader"
+    assert index.lookup(CardReader(), analysis("CARD 1")) == [saved[0][1].name]
+
+
+def test_unreadable_index_is_rebuilt(tmp_path):
+    export(tmp_path, "CARD 1")
+    (tmp_path / INDEX_FILENAME).write_text("{not json")
+
+    assert "CARD_1/202403" in CoverageIndex(tmp_path).entries
+
+
+def record_all(csv_dir, accounts):
+    index = CoverageIndex(csv_dir)
+    for account in accounts:
+        index.record(CardReader(), STATEMENT_DATE, export(csv_dir, account), [account])
+
+
+def test_concurrent_jobs_keep_every_statement(tmp_path):
+    accounts = [f"CARD {n}" for n in range(80)]
+    with ProcessPoolExecutor(8) as pool:
+        list(pool.map(record_all, repeat(tmp_path), [accounts[i::8] for i in range(8)]))
+
+    index = CoverageIndex(tmp_path)
+    assert all(index.lookup(CardReader(), analysis(account)) for account in accounts)
+    assert len(index.entries) == 2 * len(accounts)
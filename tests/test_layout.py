@@ -0,0 +1,93 @@
+import warnings
+
+import pytest
+
+from bsutils.layout import DocumentLayout, extract_tables, grid_frames
+from bsutils.source import PdfSource
+from classes.bank_settings import as_text_frame
+
+# (x, y, text) drawn in 9pt Helvetica. The second transaction's description
+# is two text lines in one cell, as statements print a merchant and its city.
+TRANSACTIONS = [
+    (40, 700, "DATE"),
+    (100, 700, "DESCRIPTION"),
+    (400, 700, "AMOUNT"),
+    (40, 680, "02 SEP"),
+    (100, 680, "NTUC FAIRPRICE"),
+    (400, 680, "2.25"),
+    (40, 660, "05 SEP"),
+    (100, 660, "GRAB*RIDES"),
+    (200, 660, "SINGAPORE SG"),
+    (400, 660, "4.25"),
+    (40, 640, "06 SEP"),
+    (100, 640.5, "SHOPEE"),
+    (160, 640, "3"),
+    (400, 640, "3.25"),
+]
+OPTIONS = {
+    "flavor": "stream",
+    "table_areas": ["30,720,500,620"],
+    "columns": ["90,350"],
+    "row_tol": 5,
+}
+
+
+def text_pdf(lines) -> bytes:
+    """
+    A one-page PDF with each ``(x, y, text)`` in its own text object, in
+    9 point type unless a size follows the text.
+    """
+    stream = "".join(
+        f"BT /F1 {size[0] if size else 9} Tf 1 0 0 1 {x} {y} Tm ({text}) Tj ET\n"
+        for x, y, text, *size in lines
+    ).encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+    ]
+    pdf, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return pdf
+
+
+@pytest.fixture
+def page():
+    with DocumentLayout(PdfSource.coerce(text_pdf(TRANSACTIONS))) as document:
+        yield next(document.pages())
+
+
+def test_grid_frames_match_camelot(page):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        tables = extract_tables(page, OPTIONS)
+    expected = [as_text_frame(table.df) for table in tables]
+
+    frames = grid_frames(page, OPTIONS)
+
+    assert len(frames) == len(expected) == 1
+    assert frames[0].values.tolist() == expected[0].values.tolist()
+
+
+def test_lines_in_one_cell_are_joined(page):
+    frame = grid_frames(page, OPTIONS)[0]
+
+    assert frame.values.tolist()[2] == ["05 SEP", "GRAB*RIDES\nSINGAPORE SG", "4.25"]
+    assert frame.values.tolist()[3] == ["06 SEP", "SHOPEE\n3", "3.25"]
+
+
+def test_unsupported_options_fall_back(page):
+    assert grid_frames(page, {**OPTIONS, "split_text": True}) is None
+    assert grid_frames(page, {**OPTIONS, "table_areas": ["30,100,500,50"]}) is None
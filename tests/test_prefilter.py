@@ -0,0 +1,46 @@
+import pytest
+from pypdf import PdfReader
+from test_layout import text_pdf
+
+from bsutils.prefilter import _decode, can_skip, raw_page_text
+from bsutils.source import PdfSource
+from classes.bank_settings import UOB_CC
+
+
+@pytest.mark.parametrize(
+    "content, text",
+    [
+        (b"BT (Transaction Amount (SGD)) Tj ET", "Transaction Amount (SGD)"),
+        (b"BT (a (b (c)) d) Tj ET", "a (b (c)) d"),
+        (b"BT (Amount \\(SGD) Tj (\\)x\\\\) Tj ET", "Amount (SGD)x\\"),
+        (b"BT (\\101\\102C\\n) Tj (split \\\nline) Tj ET", "ABC\nsplit line"),
+        (b"BT <5472616E73> Tj <61 63 7> Tj ET", "Transacp"),
+        (b"/P <</MCID 0>> BDC BT [(Tr) -20 (ans)] TJ ET EMC", "Trans"),
+        (b"% (not shown\nBT (shown) Tj ET", "shown"),
+    ],
+)
+def test_decode(content, text):
+    assert _decode(content) == text
+
+
+def test_unterminated_literal_is_undecodable():
+    with pytest.raises(ValueError):
+        _decode(b"BT (Transaction (Amount) Tj ET")
+
+
+def page(*lines):
+    pdf = PdfReader(PdfSource.coerce(text_pdf(lines)).open())
+    return pdf.pages[0]
+
+
+def test_marker_next_to_nested_parentheses_is_kept():
+    kept = page((40, 700, "Transaction Amount (SGD)"))
+
+    assert raw_page_text(kept) == "TransactionAmount(SGD)"
+    assert not can_skip(kept, UOB_CC())
+    assert can_skip(page((40, 700, "Rewards (SGD) summary")), UOB_CC())
+
+
+def test_unbalanced_page_is_read_in_full():
+    assert raw_page_text(page((40, 700, "Amount (SGD"))) is None
+    assert not can_skip(page((40, 700, "Amount (SGD")), UOB_CC())
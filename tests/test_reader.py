@@ -0,0 +1,91 @@
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+from pypdf import PdfReader
+from test_layout import OPTIONS, TRANSACTIONS, text_pdf
+
+from bsutils.reader import (
+    _read_page_frames,
+    _positioned_text,
+    _read_page_frames_in_worker,
+    parse_statement,
+)
+from bsutils.source import PdfSource, ensure_shared_memory_tracker
+from classes.bank_settings import CITI_CC, TEXT_DTYPE
+
+
+def test_workers_return_text_frames():
+    source = PdfSource.coerce(text_pdf(TRANSACTIONS))
+    ensure_shared_memory_tracker()
+    shared = source.share()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            expected = _read_page_frames(source, 1, OPTIONS)
+            with ProcessPoolExecutor(1) as pool:
+                frames = pool.submit(
+                    _read_page_frames_in_worker, shared, 1, OPTIONS
+                ).result()
+    finally:
+        shared.close()
+
+    assert len(frames) == len(expected) == 1
+    assert all(dtype == TEXT_DTYPE for dtype in frames[0].dtypes)
+    assert frames[0].equals(expected[0])
+
+
+def test_copy_on_write_is_not_left_set():
+    before = pd.get_option("mode.copy_on_write")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        parse_statement(text_pdf(TRANSACTIONS))
+
+    assert pd.get_option("mode.copy_on_write") == before
+
+
+def citi_statement(header):
+    """A one-card CITI statement page whose header chunks are drawn as given."""
+    rows = [
+        (110, 724, "BALANCE PREVIOUS STATEMENT"),
+        (505, 724, "100.00"),
+    ]
+    for n in range(1, 6):
+        y = 724 - 16 * n
+        rows += [(40, y, f"0{n} SEP"), (110, y, f"SHOPEE {n}"), (505, y, f"{n}.25")]
+    rows += [
+        (110, 628, "SUB-TOTAL"),
+        (505, 628, "15.25"),
+        (110, 612, "GRAND TOTAL"),
+        (505, 612, "115.25"),
+    ]
+    return text_pdf(
+        [
+            (40, 800, "CITIBANK SINGAPORE"),
+            (40, 784, "Statement Date: October 14, 2025"),
+            (40, 760, "CITI REWARDS WORLD MASTERCARD5412345678901234-JOHN"),
+            *header,
+            *rows,
+        ]
+    )
+
+
+HEADER = [(40, 740, "DATE"), (110, 740, "DESCRIPTION"), (505, 740, "AMOUNT (SGD)")]
+
+
+@pytest.mark.parametrize("header", [HEADER, HEADER[::-1], HEADER[1:] + HEADER[:1]])
+def test_header_drawn_out_of_order(header):
+    pdf = citi_statement(header)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        page = PdfReader(PdfSource.coerce(pdf).open()).pages[0]
+        text = _positioned_text(page)
+        default = parse_statement(pdf)
+        single_pass = parse_statement(pdf, single_pass=True)
+
+    assert CITI_CC().table_areas(text) == ["0,749.0,595.0,0"]
+    assert [len(table.frame) for table in default] == [5]
+    assert [t.frame.values.tolist() for t in default] == [
+        t.frame.values.tolist() for t in single_pass
+    ]
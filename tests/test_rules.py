@@ -0,0 +1,145 @@
+import re
+from random import Random
+
+import pandas as pd
+import pytest
+
+from classes.bank_settings import CITI_CC, UOB_CC
+from classes.bank_settings.rules import MATCH_KINDS, RULE_COLUMNS, Rule, RuleSet
+
+CITI_PAYEES = [
+    "AMAZE* GRAB RIDES 4",
+    "AMAZE*GRAB RIDES SINGAPORE SG",
+    "PAYALL - RENT 1",
+    "PAYALL RENT PAYALL",
+    "AMAZE* PAYALL RENT",
+    "AMAZE* SHOPEE AMAZE* SG",
+    "NTUC FAIRPRICE 2",
+    "SHOPEE AMAZE*",
+    "",
+]
+
+UOB_MEMOS = [
+    "02 SEP - GRAB RIDES SINGAPORE",
+    "02 SEP - PAYNOW TRANSFER - Ref No. : 12345678901",
+    "03 SEP - SHOPEE - Ref No. : 1 - Ref No. : 22",
+    "04 SEP - Ref No. : 5",
+    "05 SEP",
+]
+
+
+def baseline_citi(payees: pd.Series) -> pd.DataFrame:
+    """CITI_CC's payee clean-up before it became reader rules."""
+    payee = payees
+    memo = pd.Series("", index=payees.index)
+    for word in ["AMAZE*", "PAYALL"]:
+        word_mask = payee.str.startswith(word)
+        payee = payee.mask(
+            word_mask, payee.str.replace(word, "", regex=False).str.strip(" -")
+        )
+        memo = memo.mask(word_mask, word)
+    return pd.DataFrame({"Payee": payee, "Memo": memo})
+
+
+def baseline_uob(memos: pd.Series) -> pd.Series:
+    """UOB_CC's memo clean-up before it became a reader rule."""
+    return memos.str.replace(r"\s*\- Ref No\. : \d+", "", regex=True).str.strip(" -")
+
+
+def test_citi_rules_match_baseline():
+    payees = pd.Series(CITI_PAYEES)
+    frame = pd.DataFrame({"Payee": payees, "Memo": ""})
+    result = CITI_CC().apply_rules(frame)
+    pd.testing.assert_frame_equal(result, baseline_citi(payees))
+
+
+def test_uob_rules_match_baseline():
+    memos = pd.Series(UOB_MEMOS)
+    frame = pd.DataFrame({"Payee": "X", "Memo": memos.str.strip(" -")})
+    result = UOB_CC().apply_rules(frame)
+    pd.testing.assert_series_equal(
+        result["Memo"], baseline_uob(memos), check_names=False
+    )
+
+
+def test_rules_apply_in_order_to_the_previous_result():
+    rules = RuleSet(
+        [
+            Rule("AMAZE*", match="prefix", strip=True, memo="AMAZE*"),
+            Rule("PAYALL", match="prefix", strip=True, memo="PAYALL"),
+            Rule("RENT", payee="Landlord"),
+        ]
+    )
+    outcome = rules.outcome("Payee", "AMAZE* PAYALL RENT")
+    assert outcome.text == "Landlord"
+    assert outcome.memo == "PAYALL"
+
+
+def test_strip_removes_every_occurrence():
+    rules = RuleSet([Rule("SG", strip=True)])
+    assert rules.outcome("Payee", "SG GRAB SG").text == "GRAB"
+
+
+def test_unmatched_values_are_left_alone():
+    rules = RuleSet([Rule("GRAB", match="prefix", payee="Grab")])
+    assert rules.outcome("Payee", "SHOPEE GRAB") is None
+    frame = pd.DataFrame({"Payee": ["SHOPEE"], "Memo": [""]})
+    assert rules.apply(frame) is frame
+
+
+@pytest.mark.parametrize("kind", ["prefix", "substring", "regex"])
+def test_ignore_case(kind):
+    rules = RuleSet([Rule("grab", match=kind, ignore_case=True, memo="Transport")])
+    assert rules.outcome("Payee", "GRAB RIDES").memo == "Transport"
+
+
+def one_rule_at_a_time(rules, column, value):
+    """Reference: try every rule in turn on the text the earlier ones left."""
+    text, payee, memo = value, None, None
+    for rule in rules:
+        if re.search(rule.expression, text) is None:
+            continue
+        if rule.strip:
+            text = re.sub(rule.strip_expression, "", text).strip(" -")
+        if rule.payee is not None:
+            if column == "Payee":
+                text = rule.payee
+            else:
+                payee = rule.payee
+        if rule.memo is not None:
+            memo = rule.memo
+    return text, payee, memo
+
+
+def test_screened_values_see_every_matching_rule():
+    # Rules that match at the same place as an earlier one, or only once an
+    # earlier one has stripped the text, must still apply in order.
+    words = ["GRAB", "GRAB RIDES", "RIDES", "SG", "AMAZE*", "SHOPEE", "PAY"]
+    random = Random(7)
+    rules = [
+        Rule(
+            word if kind != "regex" else re.escape(word) + r"\b",
+            match=kind,
+            strip=random.random() < 0.4,
+            payee=random.choice([None, None, f"Payee {n}"]),
+            memo=random.choice([None, f"Memo {n}"]),
+        )
+        for n, (word, kind) in enumerate(
+            (random.choice(words), random.choice(MATCH_KINDS)) for _ in range(60)
+        )
+    ]
+    values = [
+        " ".join(random.choice(words) for _ in range(random.randint(1, 4)))
+        for _ in range(300)
+    ]
+    for column in RULE_COLUMNS:
+        chosen = [Rule(**{**rule.__dict__, "column": column}) for rule in rules]
+        rule_set = RuleSet(chosen)
+        for value in values:
+            outcome = rule_set.outcome(column, value)
+            text, payee, memo = one_rule_at_a_time(chosen, column, value)
+            if outcome is None:
+                assert (text, payee, memo) == (value, None, None)
+            else:
+                assert outcome.text == (None if text == value else text)
+                assert (outcome.payee, outcome.memo) == (payee, memo)
@@ -0,0 +1,62 @@
+import io
+import json
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from bsutils.stream import TableStream, pyarrow
+from classes.bank_settings import TEXT_DTYPE
+from classes.statement_tables import ParsedTable
+
+TABLE = ParsedTable(
+    account="CITI_CC_1234",
+    start=datetime(2025, 9, 15),
+    end=datetime(2025, 10, 14),
+    balance="115.25",
+    frame=pd.DataFrame(
+        {
+            "Date": ["2025-09-01", "2025-09-02"],
+            "Payee": ["Shopee", "Refund"],
+            "Memo": ["", None],
+            "Outflow": ["1.25", ""],
+            "Inflow": ["", "2.50"],
+        },
+        dtype=TEXT_DTYPE,
+    ),
+)
+RECORD = {
+    "source": "CITI_Statement.pdf",
+    "account": "CITI_CC_1234",
+    "period": "15Sep2025-14Oct2025",
+    "balance": "115.25",
+    "Date": "2025-09-01",
+    "Payee": "Shopee",
+    "Memo": None,
+    "Outflow": "1.25",
+    "Inflow": None,
+}
+
+
+def test_ndjson_record():
+    target = io.BytesIO()
+    stream = TableStream("ndjson", target)
+    stream.write(TABLE, "/tmp/CITI_Statement.pdf")
+    stream.close()
+
+    lines = target.getvalue().decode().splitlines()
+    assert len(lines) == stream.records == 2
+    assert json.loads(lines[0]) == RECORD
+    assert json.loads(lines[1])["Memo"] is None
+
+
+@pytest.mark.skipif(pyarrow is None, reason="needs pyarrow")
+def test_arrow_record():
+    target = io.BytesIO()
+    stream = TableStream("arrow", target)
+    stream.write(TABLE, "/tmp/CITI_Statement.pdf")
+    stream.close()
+
+    records = pyarrow.ipc.open_stream(target.getvalue()).read_all().to_pylist()
+    assert records[0] == RECORD
+    assert records[1]["Outflow"] is None